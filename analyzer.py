@@ -1,9 +1,161 @@
 import os
-import fnmatch
+import sys
+import tempfile
+import time
+from collections import deque
+from contextlib import nullcontext
 from pathlib import Path
-from flavors import get_analyzer_for_file
+from cache import AnalysisCache, CACHE_DIR_NAME
+from ignore import IGNORE_FILES, IgnoreMatcher, GitIgnoreRules, is_path_ignored
+from flavors import EXTENSION_INDEX, get_analyzer_for_file, timing
+from flavors.base import AnalysisResult
+from flavors.issues import Issue
+from flavors.clones import CloneIndex, NearDuplicateIndex
 from flavors.structure_flavor import ProjectStructureAnalyzer
 
+
+# 超过该大小 (字节) 的文件改用 mmap 流式分析，避免整个读入内存后再多次复制
+LARGE_FILE_BYTES = 20 * 1024 * 1024
+# 超大文件的缓存标记后缀：阈值调整后，同一文件可能切换分析方式，需要区分缓存
+LARGE_STAMP_SUFFIX = ':large'
+# 流式品鉴时文件树在内存中保留的上限 (字节)，超出后转存到临时文件
+FILE_TREE_SPOOL_BYTES = 1024 * 1024
+
+
+class FileTreeSpool:
+    """
+    逐行写入的文件树，超过 FILE_TREE_SPOOL_BYTES 后转存到临时文件，内存占用与文件数量无关。
+    与 list 一样支持 append 与按行迭代，可直接交给报告生成器。
+    """
+
+    def __init__(self):
+        self._file = tempfile.SpooledTemporaryFile(max_size=FILE_TREE_SPOOL_BYTES, mode='w+',
+                                                   encoding='utf-8', newline='\n')
+        self._count = 0
+
+    def append(self, line):
+        self._file.write(line + '\n')
+        self._count += 1
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        self._file.seek(0)
+        try:
+            for line in self._file:
+                yield line[:-1]
+        finally:
+            # 回到末尾，之后的 append 继续追加
+            self._file.seek(0, os.SEEK_END)
+
+    def close(self):
+        self._file.close()
+
+
+def _read_bytes(file_path, large_file_bytes=LARGE_FILE_BYTES):
+    """
+    预读线程入口：读取文件的全部字节。
+    超大文件 (走 mmap 流式分析) 与读取失败的文件返回 None，交由分析器自行处理。
+    """
+    try:
+        with open(file_path, 'rb') as f:
+            if large_file_bytes and os.fstat(f.fileno()).st_size > large_file_bytes:
+                return None
+            return f.read()
+    except OSError:
+        return None
+
+
+def _init_worker():
+    """
+    工作进程初始化：fork 自开启了 tracemalloc (--profile_memory) 的主进程时停止跟踪。
+    内存剖析只统计主进程，跟踪开销不能带进分析计时。
+    """
+    tracemalloc = sys.modules.get('tracemalloc')
+    if tracemalloc and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def _analyze_file(file_path, target_language, large_file_bytes=LARGE_FILE_BYTES, data=None):
+    """
+    分析单个文件，没有匹配的分析器时返回 None。
+    data 为预读取的文件字节，传入后分析器不再自行打开文件。
+    """
+    analyzer = get_analyzer_for_file(file_path, target_language)
+    if not analyzer:
+        return None
+    if data is not None:
+        return analyzer.analyze(file_path, data)
+    try:
+        size = os.path.getsize(file_path)
+    except OSError:
+        size = 0
+    if large_file_bytes and size > large_file_bytes:
+        return analyzer.analyze_large(file_path, size)
+    return analyzer.analyze(file_path)
+
+
+def _profile_file(file_path, target_language, large_file_bytes=LARGE_FILE_BYTES, data=None):
+    """带计时地分析单个文件，返回 (AnalysisResult, 计时记录)"""
+    timing.begin_file()
+    start = time.perf_counter()
+    result = _analyze_file(file_path, target_language, large_file_bytes, data)
+    seconds = time.perf_counter() - start
+    phases = timing.end_file()
+    if data is not None:
+        size = len(data)
+    else:
+        try:
+            size = os.path.getsize(file_path)
+        except OSError:
+            size = 0
+    record = {
+        'path': str(file_path),
+        'language': result.language if result else 'Unknown',
+        'size': size,
+        'seconds': seconds,
+        'phases': phases,
+    }
+    return result, record
+
+
+def _analyze_batch(file_paths, target_language, large_file_bytes=LARGE_FILE_BYTES, profile=False, datas=None):
+    """
+    工作进程入口：按顺序分析一批文件。
+    必须定义在模块顶层，才能被 ProcessPoolExecutor pickle 到子进程中。
+    返回列表与输入一一对应 (分发前已过滤掉不支持的文件)；
+    profile 为 True 时每一项为 (AnalysisResult, 计时记录)。
+    datas 为与 file_paths 对应的预读取字节 (可含 None)，未开启预读时为 None。
+    """
+    analyze = _profile_file if profile else _analyze_file
+    if datas is None:
+        datas = [None] * len(file_paths)
+    return [analyze(file_path, target_language, large_file_bytes, data)
+            for file_path, data in zip(file_paths, datas)]
+
+
+def _analyze_task(task, target_language, large_file_bytes=LARGE_FILE_BYTES, profile=False):
+    """看门狗工作进程入口：task 为 (路径, 预读取的字节或 None)"""
+    file_path, data = task
+    analyze = _profile_file if profile else _analyze_file
+    return analyze(file_path, target_language, large_file_bytes, data)
+
+
+def warm_analyzers():
+    """预热：导入并实例化全部分析器 (也用作工作进程的预热任务)"""
+    for ext in EXTENSION_INDEX:
+        get_analyzer_for_file(Path('warm' + ext))
+    return os.getpid()
+
+
+def warm_pool(executor, workers):
+    """同时提交 workers 个预热任务，让进程池一次性拉起全部工作进程"""
+    futures = [executor.submit(warm_analyzers) for _ in range(workers)]
+    for future in futures:
+        future.result()
+
+
 class CodeSommelier:
     # 默认忽略的目录和文件模式
     IGNORE_PATTERNS = {
@@ -14,73 +166,767 @@ class CodeSommelier:
         '.DS_Store', 'Thumbs.db'
     }
 
-    def __init__(self, project_path, target_language=None):
+    # 每个任务包含的文件数：太小则进程间通信开销占比过高，太大则负载不均
+    BATCH_SIZE = 16
+
+    def __init__(self, project_path, target_language=None, jobs=1,
+                 exclude_patterns=None, use_gitignore=True, cache_dir=None, use_cache=True,
+                 since=None, large_file_mb=None, profiler=None, file_timeout=None, max_file_mb=None,
+                 prefetch=0, executor=None, watchdog=None, watch=False, shard=None):
         self.root = Path(project_path)
         self.target_language = target_language.lower() if target_language else None
+        # jobs <= 0 表示使用全部 CPU 核心
+        self.jobs = jobs if jobs and jobs > 0 else (os.cpu_count() or 1)
+        self.use_gitignore = use_gitignore
+        # 内置忽略模式只编译一次；--exclude 按 gitignore 语法相对项目根目录解析
+        self._ignore_matcher = IgnoreMatcher(self.IGNORE_PATTERNS)
+        self._exclude_rules = GitIgnoreRules(exclude_patterns) if exclude_patterns else None
+        # 增量分析缓存，默认位于 <项目>/.sommelier_cache/
+        self.cache = None
+        if use_cache:
+            self.cache = AnalysisCache(cache_dir or self.root / CACHE_DIR_NAME)
+        # 仅分析相对该 git 引用新增或修改过的文件 (PR 门禁场景)
+        self.since = since
+        # 超大文件阈值 (MB)，0 表示不限制，始终完整分析
+        if large_file_mb is None:
+            self.large_file_bytes = LARGE_FILE_BYTES
+        else:
+            self.large_file_bytes = int(large_file_mb * 1024 * 1024)
+        # 看门狗：单个文件的分析时限 (秒) 与大小上限 (MB)，超出的文件记为跳过
+        self.file_timeout = file_timeout if file_timeout and file_timeout > 0 else None
+        self.max_file_mb = max_file_mb if max_file_mb and max_file_mb > 0 else None
+        self.max_file_bytes = int(self.max_file_mb * 1024 * 1024) if self.max_file_mb else None
+        # 预读线程数：在分析当前文件的同时由线程池提前读取后续文件 (适用于网络文件系统)，
+        # 与 jobs (CPU 并行度) 相互独立，0 表示由分析器自行读取
+        self.prefetch = prefetch if prefetch and prefetch > 0 else 0
+        # 分片 (i, N)：完整遍历目录树，但只分析按相对路径稳定哈希落在第 i 片的文件 (见 shard.py)
+        self.shard = shard
+        # 外部传入的常驻进程池 (评分服务中多个请求共享)，为 None 时按 jobs 临时创建
+        self.executor = executor
+        # 同上，file_timeout 模式使用的常驻看门狗进程池 (watchdog_pool.WatchdogPool，已 start)
+        self.watchdog = watchdog
+        # 可选的性能剖析器 (profiler.Profiler)，为 None 时不做任何计时
+        self.profiler = profiler
         self.results = []
         self.file_tree = []
-        self.all_scanned_files = []
+        # 项目结构分析随遍历逐个登记条目，不保留文件列表
+        self.structure = ProjectStructureAnalyzer()
+        # watch 模式需要知道已有哪些文件 (相对路径)，只在 watch=True 时记录
+        self.scanned_files = set() if watch else None
+        # 跨文件克隆索引，随结果逐个填充，在项目结构分析中报告
+        self.clone_index = CloneIndex()
+        # C 系语言的近似重复文件索引 (MinHash + LSH)，同样在项目结构分析中报告
+        self.near_duplicate_index = NearDuplicateIndex()
+        # 遍历到的目录 (watch 模式据此登记监听)，同样只在 watch=True 时记录
+        self.scanned_dirs = [] if watch else None
+        # watch 模式的内存索引，首次 refresh 时建立
+        self._watch_state = None
 
-    def taste(self):
-        """开始品鉴流程"""
+    def taste(self, sink=None):
+        """
+        开始品鉴流程
+        sink: 可选的结果接收器 (提供 add(result) 方法)。传入后每个结果产生时立即交给它，
+              不再保存在 self.results 中，文件树也转存到临时文件 (FileTreeSpool)，内存占用与文件数量无关。
+        """
         if not self.root.exists():
             return False, "❌ 庄园入口未找到，请检查路径。"
 
         print(f"🍷 正在通过嗅觉辨识代码风味... (扫描: {self.root})")
         
         # 1. 代码文件分析
-        self._scan_and_analyze(self.root)
+        if self.jobs > 1:
+            print(f"⚙️ 启用 {self.jobs} 个酒桶并行发酵...")
+        if self.cache:
+            with self._phase('cache_load'):
+                self.cache.load()
+        if sink and not self.since:
+            # 流式品鉴：文件树同样不留在内存中 (增量模式的文件树由少量结果重建，无需转存)
+            self.file_tree = FileTreeSpool()
+
+        if self.since:
+            with self._phase('git_diff'):
+                diff = self._changed_files(self.since)
+            if diff is None:
+                return False, f"❌ 无法获取相对 '{self.since}' 的变更文件，请确认项目位于 git 仓库中且引用存在。"
+            changed, deleted = diff
+            print(f"🔍 仅品鉴相对 {self.since} 变更的 {len(changed)} 个文件...")
+            file_paths = changed
+        else:
+            file_paths = self._walk(self.root)
+            if self.profiler:
+                file_paths = self.profiler.timed_iter('walk', file_paths)
+            if self.shard:
+                file_paths = self._in_shard(file_paths)
+
+        analyzed_paths = []
+        for file_path, result, from_cache in self._analyze_files(file_paths):
+            result.path = self._rel_path(file_path)
+            if not (self.since or self.shard):
+                self.clone_index.add(result)
+                self.near_duplicate_index.add(result)
+            # 跳过的文件 (超时、超出大小上限) 不写入缓存，下次仍会重新尝试
+            if self.cache and not from_cache and not result.skipped:
+                with self._phase('cache_store'):
+                    self.cache.store(result.path, file_path, result)
+            if sink and not self.since:
+                sink.add(result)
+                continue
+            self.results.append(result)
+            analyzed_paths.append(file_path)
+
+        if self.since:
+            self._merge_unchanged_from_cache(changed, deleted, analyzed_paths)
+            # 增量模式需要先与缓存结果合并排序，结果数量也较少，最后再统一交给 sink
+            if sink:
+                for result in self.results:
+                    sink.add(result)
+                self.results = []
+        if self.cache:
+            # 增量、分片、指定语言或 --exclude 时只看到了部分文件，不能据此清理其余文件的缓存
+            with self._phase('cache_save'):
+                self.cache.save(prune=not self._narrowed_scope())
+            print(f"🗄️ 酒窖缓存: 命中 {self.cache.hits} 个, 未命中 {self.cache.misses} 个")
+
+        if self.since:
+            # 增量模式不遍历整棵目录，项目结构分析需要完整视图，因此跳过
+            return True, "品鉴完成"
+        if self.shard:
+            # 跨文件检测需要全部分片的结果，项目结构评分在合并时计算 (见 shard.merge)
+            return True, "品鉴完成"
+
         print(f"🏗️ 正在评估庄园布局 (项目结构分析)...")
-        structure_analyzer = ProjectStructureAnalyzer()
-        structure_result = structure_analyzer.analyze(self.root, self.all_scanned_files)
+        with self._phase('structure'):
+            structure_result = self.structure.finish(self.clone_index.findings,
+                                                     self.near_duplicate_index.findings)
+        if self.clone_index.findings:
+            print(f"👯‍♀️ 发现 {len(self.clone_index.findings)} 个跨文件复制粘贴的函数")
+        if self.near_duplicate_index.findings:
+            print(f"👯 发现 {len(self.near_duplicate_index.findings)} 个与其他文件高度相似的文件")
+        structure_result.path = "."
         
         # 将结构分析结果加入列表
-        self.results.insert(0, structure_result)
+        if sink:
+            sink.add(structure_result)
+        else:
+            self.results.insert(0, structure_result)
 
         return True, "品鉴完成"
 
-    def _is_ignored(self, name):
-        """检查文件或目录是否应该被忽略"""
-        for pattern in self.IGNORE_PATTERNS:
-            if fnmatch.fnmatch(name, pattern):
+    def score_files(self, file_paths):
+        """
+        只品鉴指定的文件 (不遍历目录、不做项目结构分析)，结果按输入顺序保存在 self.results 中。
+        不支持的文件会被忽略。file_paths 必须位于项目根目录之下。
+        """
+        if self.cache:
+            self.cache.load()
+        for file_path, result, from_cache in self._analyze_files(Path(p) for p in file_paths):
+            result.path = self._rel_path(file_path)
+            if self.cache and not from_cache and not result.skipped:
+                self.cache.store(result.path, file_path, result)
+            self.results.append(result)
+        if self.cache:
+            # 只看到了部分文件，不能据此清理其余文件的缓存
+            self.cache.save(prune=False)
+        return self.results
+
+    def _phase(self, name):
+        """性能剖析阶段；未开启剖析时返回空上下文"""
+        return self.profiler.phase(name) if self.profiler else nullcontext()
+
+    def _changed_files(self, ref):
+        """
+        通过本地 git 获取相对 ref 的变更，返回 (新增、修改或重命名后的文件 (按遍历顺序排序),
+        被删除或重命名前的相对路径集合)。git 不可用或命令失败时返回 None。
+        """
+        import subprocess
+        try:
+            proc = subprocess.run(
+                ['git', 'diff', '--name-status', '-z', '--relative',
+                 '--diff-filter=AMRD', ref, '--'],
+                cwd=self.root, capture_output=True, check=True
+            )
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+        # -z 输出格式: 状态\0路径\0，重命名为 状态\0旧路径\0新路径\0
+        fields = proc.stdout.decode('utf-8', errors='surrogateescape').split('\0')
+        rel_paths = []
+        deleted = set()
+        i = 0
+        while i < len(fields) - 1:
+            status = fields[i]
+            if status.startswith(('R', 'C')):
+                if status.startswith('R'):
+                    deleted.add(fields[i + 1])
+                rel_paths.append(fields[i + 2])
+                i += 3
+            elif status == 'D':
+                deleted.add(fields[i + 1])
+                i += 2
+            else:
+                rel_paths.append(fields[i + 1])
+                i += 2
+
+        changed = []
+        for rel_path in sorted(set(rel_paths), key=lambda p: p.split('/')):
+            full_path = self.root / rel_path
+            if self._is_rel_path_ignored(rel_path) or not full_path.is_file():
+                continue
+            changed.append(full_path)
+        self._build_tree(rel.relative_to(self.root).as_posix() for rel in changed)
+        return changed, deleted
+
+    def _is_rel_path_ignored(self, rel_path):
+        """对单个相对路径套用遍历时的忽略规则 (内置模式与 --exclude)"""
+        parts = rel_path.split('/')
+        for depth, name in enumerate(parts):
+            if name.startswith('.') or self._is_ignored(name):
                 return True
+            if self._exclude_rules:
+                is_dir = depth < len(parts) - 1
+                if self._exclude_rules.match('/'.join(parts[:depth + 1]), name, is_dir):
+                    return True
         return False
 
-    def _scan_and_analyze(self, current_path, prefix=""):
-        """递归遍历目录，生成树并分析文件"""
-        try:
-            items = sorted(os.listdir(current_path))
-        except PermissionError:
+    def _merge_unchanged_from_cache(self, changed, deleted, analyzed_paths):
+        """
+        增量模式下，把缓存中未变更文件的评分一并纳入报告。
+        相对 ref 已删除的文件 (以及缓存建立后在工作区中消失的文件) 不再列出，其缓存条目一并丢弃。
+        """
+        if not self.cache:
             return
+        changed_rel = {self._rel_path(p) for p in changed}
+        reported = {self._rel_path(p): r for p, r in zip(analyzed_paths, self.results)}
+        analyzed_count = len(reported)
+        for rel_path in list(self.cache.entries):
+            if rel_path in changed_rel or self._is_rel_path_ignored(rel_path):
+                continue
+            if rel_path in deleted or not (self.root / rel_path).is_file():
+                self.cache.discard(rel_path)
+                continue
+            analyzer = get_analyzer_for_file(Path(rel_path), self.target_language)
+            if not analyzer:
+                continue
+            stamp = analyzer.version_stamp()
+            cached = self.cache.peek(rel_path, stamp)
+            if cached is None:
+                cached = self.cache.peek(rel_path, stamp + LARGE_STAMP_SUFFIX)
+            if cached is not None:
+                cached.path = rel_path
+                reported[rel_path] = cached
 
-        # 过滤
-        filtered_items = [
-            i for i in items 
-            if not i.startswith('.') and not self._is_ignored(i)
-        ]
-        
-        count = len(filtered_items)
-        for i, item in enumerate(filtered_items):
-            full_path = current_path / item
-            is_last = (i == count - 1)
+        if len(reported) > analyzed_count:
+            print(f"📦 另有 {len(reported) - analyzed_count} 个未变更文件沿用缓存中的评分")
+        ordered = sorted(reported, key=lambda p: p.split('/'))
+        self.results = [reported[rel_path] for rel_path in ordered]
+        self.file_tree = []
+        self._build_tree(ordered)
+
+    def _build_tree(self, rel_paths):
+        """根据相对路径列表生成文件树 (不访问文件系统)，格式与遍历时记录的一致"""
+        tree = {}
+        for rel_path in rel_paths:
+            node = tree
+            for part in rel_path.split('/'):
+                node = node.setdefault(part, {})
+
+        stack = [(sorted(tree.items()), 0, "")]
+        while stack:
+            items, index, prefix = stack[-1]
+            if index >= len(items):
+                stack.pop()
+                continue
+            stack[-1] = (items, index + 1, prefix)
+            name, children = items[index]
+            is_last = (index == len(items) - 1)
+            self.file_tree.append(f"{prefix}{'└── ' if is_last else '├── '}{name}")
+            if children:
+                stack.append((sorted(children.items()), 0, prefix + ("    " if is_last else "│   ")))
+
+    def _is_ignored(self, name):
+        """检查文件或目录是否应该被忽略"""
+        return self._ignore_matcher.matches(name)
+
+    def _list_dir(self, dir_path, rel_dir, rule_sets):
+        """
+        列出目录下未被忽略的条目 (按名称排序)，复用 DirEntry 缓存的类型信息。
+        同时读取该目录下的 .gitignore / .ignore，返回 (条目列表, 子目录继承的规则集)。
+        """
+        try:
+            with os.scandir(dir_path) as it:
+                all_entries = list(it)
+        except OSError as e:
+            if not rel_dir:
+                self.structure.set_root_error(e)
+            return [], rule_sets
+
+        if not rel_dir:
+            # 根目录的全部条目 (含隐藏与被忽略的) 供项目结构分析使用，复用本次列目录的结果
+            for e in all_entries:
+                try:
+                    is_file = e.is_file()
+                except OSError:
+                    is_file = False
+                self.structure.add_root_entry(e.name, is_file)
+
+        if self.use_gitignore:
+            names = {e.name for e in all_entries}
+            for ignore_file in IGNORE_FILES:
+                if ignore_file in names:
+                    rules = GitIgnoreRules.from_file(os.path.join(dir_path, ignore_file), rel_dir)
+                    if rules and rules.rules:
+                        rule_sets = rule_sets + [rules]
+
+        entries = []
+        for e in all_entries:
+            name = e.name
+            if name.startswith('.') or self._is_ignored(name):
+                continue
+            try:
+                is_dir = e.is_dir()
+            except OSError:
+                is_dir = False
+            # 在下探之前按规则剪枝，被忽略的目录不会再被遍历
+            if rule_sets or self._exclude_rules:
+                rel_path = f"{rel_dir}/{name}" if rel_dir else name
+                if self._exclude_rules and self._exclude_rules.match(rel_path, name, is_dir):
+                    continue
+                if is_path_ignored(rule_sets, rel_path, name, is_dir):
+                    continue
+            entries.append((e, is_dir))
+        entries.sort(key=lambda item: item[0].name)
+        return entries, rule_sets
+
+    def _walk(self, root):
+        """
+        迭代式深度优先遍历 (不受递归深度限制)：边遍历边记录文件树，
+        并在发现文件时立即产出，供分析流程流式消费。
+        通过记录已访问目录的 (device, inode) 避免符号链接成环导致的死循环。
+        """
+        visited = set()
+        try:
+            root_stat = root.stat()
+            visited.add((root_stat.st_dev, root_stat.st_ino))
+        except OSError:
+            pass
+
+        # 栈中每一帧: (当前目录的条目列表, 下一个条目的下标, 树前缀, 相对路径, 生效的忽略规则)
+        entries, rule_sets = self._list_dir(root, "", [])
+        stack = [(entries, 0, "", "", rule_sets)]
+        while stack:
+            entries, index, prefix, rel_dir, rule_sets = stack[-1]
+            if index >= len(entries):
+                stack.pop()
+                continue
+            stack[-1] = (entries, index + 1, prefix, rel_dir, rule_sets)
+
+            entry, is_dir = entries[index]
+            is_last = (index == len(entries) - 1)
             connector = "└── " if is_last else "├── "
             
             # 1. 记录文件树
-            self.file_tree.append(f"{prefix}{connector}{item}")
+            self.file_tree.append(f"{prefix}{connector}{entry.name}")
+
+            full_path = Path(entry.path)
 
-            if full_path.is_dir():
+            if is_dir:
+                try:
+                    st = entry.stat()
+                    key = (st.st_dev, st.st_ino)
+                except OSError:
+                    continue
+                if key in visited:
+                    continue
+                visited.add(key)
+                if self.scanned_dirs is not None:
+                    self.scanned_dirs.append(full_path)
                 new_prefix = prefix + ("    " if is_last else "│   ")
-                self._scan_and_analyze(full_path, new_prefix)
+                new_rel_dir = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                child_entries, child_rules = self._list_dir(full_path, new_rel_dir, rule_sets)
+                stack.append((child_entries, 0, new_prefix, new_rel_dir, child_rules))
+            else:
+                # 登记到项目结构分析 (只累加计数)
+                self.structure.add_file(entry.name)
+                if self.scanned_files is not None:
+                    self.scanned_files.add(f"{rel_dir}/{entry.name}" if rel_dir else entry.name)
+
+                # 2. 立即交给分析流程 (串行或进程池)
+                yield full_path
+
+    def _narrowed_scope(self):
+        """本次品鉴是否只覆盖了项目的一部分文件 (此时未扫描到的缓存条目不代表文件已删除)"""
+        return bool(self.since or self.shard or self.target_language or self._exclude_rules)
+
+    def _in_shard(self, file_paths):
+        """只保留属于当前分片的文件 (遍历本身不受影响，文件树与结构统计仍然完整)"""
+        from shard import shard_of
+        index, count = self.shard
+        for file_path in file_paths:
+            if shard_of(self._rel_path(file_path), count) == index:
+                yield file_path
+
+    def _rel_path(self, file_path):
+        return file_path.relative_to(self.root).as_posix()
+
+    def _lookup_cache(self, file_paths):
+        """
+        过滤掉不支持的文件，并为每个文件查询缓存，产出 (路径, 已有结果或 None)。
+        已有结果包括命中的缓存，以及超出大小上限、无需分析的跳过结果。
+        """
+        for file_path in file_paths:
+            analyzer = get_analyzer_for_file(file_path, self.target_language)
+            if not analyzer:
+                continue
+            st = None
+            if self.cache or self.max_file_bytes:
+                try:
+                    st = os.stat(file_path)
+                except OSError:
+                    st = None
+            if st and self.max_file_bytes and st.st_size > self.max_file_bytes:
+                issue = Issue('watchdog.too_large', size_mb=st.st_size / (1024 * 1024), size=st.st_size,
+                              limit_mb=self.max_file_mb, limit=self.max_file_bytes)
+                yield file_path, self._skipped_result(file_path, analyzer, issue)
+                continue
+            cached = None
+            if self.cache:
+                stamp = analyzer.version_stamp()
+                if st and self.large_file_bytes and st.st_size > self.large_file_bytes:
+                    stamp += LARGE_STAMP_SUFFIX
+                cached = self.cache.lookup(self._rel_path(file_path), file_path, stamp, st)
+            yield file_path, cached
+
+    @staticmethod
+    def _skipped_result(file_path, analyzer, issue):
+        return AnalysisResult(file_path.name, analyzer.LANGUAGE, 0, analyzer.calculate_rating(0), [issue], skipped=True)
+
+    def _analyze_files(self, file_paths):
+        """
+        分发文件分析任务，按输入顺序逐个产出 (路径, AnalysisResult, 是否来自缓存)。
+        命中缓存的文件不再分发；无论 jobs 为多少，产出顺序都与串行遍历一致，保证报告内容稳定。
+        """
+        entries = self._lookup_cache(file_paths)
+        if self.profiler:
+            entries = self.profiler.timed_iter('cache_lookup', entries)
+        if self.prefetch:
+            entries = self._prefetch(entries)
+        else:
+            entries = ((file_path, cached, None) for file_path, cached in entries)
+        if self.file_timeout:
+            yield from self._analyze_with_watchdog(entries)
+            return
+        if self.jobs <= 1 and not self.executor:
+            for file_path, cached, data in entries:
+                if cached is not None:
+                    yield file_path, cached, True
+                elif self.profiler:
+                    with self.profiler.phase('analyze'):
+                        result, record = _profile_file(file_path, self.target_language, self.large_file_bytes, data)
+                    self._add_profile_record(file_path, record)
+                    yield file_path, result, False
+                else:
+                    yield file_path, _analyze_file(file_path, self.target_language, self.large_file_bytes, data), False
+            return
+
+        profile = self.profiler is not None
+        # 进程池相关模块 (multiprocessing 等) 只在并行时导入，串行的小规模调用启动更快
+        from concurrent.futures import ProcessPoolExecutor
+        with nullcontext(self.executor) if self.executor else ProcessPoolExecutor(max_workers=self.jobs, initializer=_init_worker) as pool:
+            # 按提交顺序排队，限制在途批次数量以控制内存。
+            # 每个批次保存全部条目 (含缓存命中)，只把未命中的文件交给进程池。
+            in_flight = deque()
+            max_in_flight = self.jobs * 2
+            items, misses, datas = [], [], []
+            for file_path, cached, data in entries:
+                items.append((file_path, cached))
+                if cached is None:
+                    misses.append(file_path)
+                    datas.append(data)
+                if len(misses) >= self.BATCH_SIZE:
+                    in_flight.append((items, self._submit_batch(pool, misses, datas, profile)))
+                    items, misses, datas = [], [], []
+                    if len(in_flight) >= max_in_flight:
+                        yield from self._merge_batch(*in_flight.popleft())
+            if items:
+                future = self._submit_batch(pool, misses, datas, profile) if misses else None
+                in_flight.append((items, future))
+            while in_flight:
+                yield from self._merge_batch(*in_flight.popleft())
+
+    def _submit_batch(self, pool, misses, datas, profile):
+        # 未开启预读时不传 datas，避免把一列 None 也 pickle 给工作进程
+        return pool.submit(_analyze_batch, misses, self.target_language, self.large_file_bytes, profile,
+                           datas if self.prefetch else None)
+
+    def _prefetch(self, entries):
+        """
+        预读阶段：用线程池提前读取后续未命中缓存的文件，产出 (路径, 已有结果或 None, 字节或 None)。
+        读取在后台线程中与分析重叠进行；窗口最多容纳 prefetch * 2 个条目，
+        已读入内存的文件数量因此有上限 (超大文件不预读，仍由分析器流式处理)。
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        window = deque()
+        max_window = self.prefetch * 2
+        with ThreadPoolExecutor(max_workers=self.prefetch, thread_name_prefix='sommelier-prefetch') as pool:
+            for file_path, cached in entries:
+                future = None
+                if cached is None:
+                    future = pool.submit(_read_bytes, file_path, self.large_file_bytes)
+                window.append((file_path, cached, future))
+                if len(window) >= max_window:
+                    yield self._prefetched(*window.popleft())
+            while window:
+                yield self._prefetched(*window.popleft())
+
+    def _prefetched(self, file_path, cached, future):
+        if future is None:
+            return file_path, cached, None
+        with self._phase('prefetch_wait'):
+            return file_path, cached, future.result()
+
+    def _analyze_with_watchdog(self, entries):
+        """
+        看门狗模式：每个文件在独立的工作进程中分析 (jobs 为 1 时也使用一个子进程)，
+        超时或进程崩溃的文件记为跳过，其余文件不受影响。
+        """
+        profile = self.profiler is not None
+        # 按输入顺序记录所有条目；只有未命中缓存的文件交给进程池
+        order = deque()
+
+        def misses():
+            for file_path, cached, data in entries:
+                order.append((file_path, cached))
+                if cached is None:
+                    yield file_path, data
+
+        from watchdog_pool import WatchdogPool, OK, TIMEOUT, CRASHED
+        args = (self.target_language, self.large_file_bytes, profile)
+        with nullcontext(self.watchdog) if self.watchdog else \
+                WatchdogPool(_analyze_task, args, workers=self.jobs, timeout=self.file_timeout,
+                             initializer=_init_worker) as pool:
+            for (file_path, _), status, value in pool.map(misses(), args):
+                # 先产出排在它前面的已有结果
+                while order[0][1] is not None:
+                    yield (*order.popleft(), True)
+                order.popleft()
+                analyzer = get_analyzer_for_file(file_path, self.target_language)
+                if status == OK:
+                    if profile:
+                        value, record = value
+                        self._add_profile_record(file_path, record)
+                    yield file_path, value, False
+                    continue
+                if status == TIMEOUT:
+                    print(f"⏱️ 分析超时，已跳过: {self._rel_path(file_path)}")
+                    issue = Issue('watchdog.timeout', seconds=self.file_timeout)
+                elif status == CRASHED:
+                    issue = Issue('watchdog.crashed', reason=f"exit code {value}")
+                else:
+                    issue = Issue('watchdog.crashed', reason=value)
+                yield file_path, self._skipped_result(file_path, analyzer, issue), False
+        while order:
+            yield (*order.popleft(), True)
+
+    def _merge_batch(self, items, future):
+        """把进程池返回的结果按原顺序填回批次中缓存未命中的位置"""
+        with self._phase('wait_workers'):
+            analyzed = iter(future.result() if future else ())
+        for file_path, cached in items:
+            if cached is not None:
+                yield file_path, cached, True
+            elif self.profiler:
+                result, record = next(analyzed)
+                self._add_profile_record(file_path, record)
+                yield file_path, result, False
             else:
-                # 记录文件路径用于结构分析
-                self.all_scanned_files.append(full_path)
+                yield file_path, next(analyzed), False
+
+    def _add_profile_record(self, file_path, record):
+        record['path'] = self._rel_path(file_path)
+        self.profiler.add_file(record)
+
+    #  watch 模式
+
+    def watched_dirs(self):
+        """需要监听的目录：项目根目录与遍历时进入过的所有目录"""
+        return [self.root] + self.scanned_dirs
+
+    def refresh(self, changed_paths):
+        """
+        watch 模式的增量刷新：只重新分析发生变化的文件，原地更新内存中的结果、文件树与结构分析，
+        不重新遍历、也不重新分析未变化的部分。必须在 taste() (非流式、非增量模式) 之后调用。
+        changed_paths: 变化的文件或目录路径集合；为 None 表示事件丢失，需要完整重新品鉴。
+        返回 (报告是否需要更新, 新出现的需要监听的目录列表)。
+        """
+        if changed_paths is None or any(Path(p).name in IGNORE_FILES for p in changed_paths):
+            # 忽略规则变化会影响整棵树，退回完整品鉴 (有缓存时未变化的文件不会重新分析)
+            print("🔁 忽略规则变化或事件丢失，重新品鉴整个项目...")
+            return self._retaste(), list(self.scanned_dirs)
+
+        state = self._watch_state or self._init_watch_state()
+        files, dirs, index = state['files'], state['dirs'], state['index']
+        to_analyze, new_dirs = {}, []
+        tree_changed = False
+
+        for path in sorted(Path(p) for p in changed_paths):
+            try:
+                rel = self._rel_path(path)
+            except ValueError:
+                continue
+            if rel == '.':
+                continue
+            if path.is_dir():
+                if rel in dirs or self._is_watch_ignored(rel, True):
+                    continue
+                # 新建 (或移入) 的目录：只扫描这棵子树
+                for dir_path, file_path in self._scan_new_dir(path):
+                    if dir_path is not None:
+                        dirs.add(self._rel_path(dir_path))
+                        new_dirs.append(dir_path)
+                    else:
+                        files.add(self._rel_path(file_path))
+                        to_analyze[file_path] = None
+                tree_changed = True
+            elif path.is_file():
+                if rel not in files:
+                    if self._is_watch_ignored(rel, False):
+                        continue
+                    files.add(rel)
+                    tree_changed = True
+                to_analyze[path] = None
+            elif rel in files:
+                files.discard(rel)
+                self._forget(rel, index)
+                tree_changed = True
+            elif rel in dirs:
+                prefix = rel + '/'
+                dirs.difference_update({d for d in dirs if d == rel or d.startswith(prefix)})
+                for gone in [f for f in files if f.startswith(prefix)]:
+                    files.discard(gone)
+                    self._forget(gone, index)
+                tree_changed = True
+
+        updated = tree_changed
+        for file_path, result, from_cache in self._analyze_files(to_analyze):
+            result.path = self._rel_path(file_path)
+            if self.cache and not from_cache and not result.skipped:
+                self.cache.store(result.path, file_path, result)
+            previous = index.get(result.path)
+            if previous is None or previous.to_dict() != result.to_dict():
+                updated = True
+                before = f"{previous.score:.1f}" if previous else "新"
+                print(f"🍇 {result.path}: {before} → {result.score:.1f}")
+            index[result.path] = result
+
+        if not updated:
+            return False, new_dirs
+        if self.cache:
+            self.cache.save(prune=False)
+        if tree_changed:
+            self.file_tree = []
+            self._build_tree(sorted(files | dirs, key=lambda p: p.split('/')))
+            self._rebuild_structure(files)
+        ordered = sorted(index, key=lambda p: p.split('/'))
+        # 克隆索引只保存哈希与签名，按遍历顺序重建的开销与函数数、文件数成正比
+        self.clone_index = CloneIndex.from_results(index[rel] for rel in ordered)
+        self.near_duplicate_index = NearDuplicateIndex.from_results(index[rel] for rel in ordered)
+        state['structure'] = self.structure.finish(self.clone_index.findings,
+                                                   self.near_duplicate_index.findings)
+        state['structure'].path = "."
+        self.results = [state['structure']] + [index[rel] for rel in ordered]
+        return True, new_dirs
+
+    def _init_watch_state(self):
+        if self.scanned_files is None:
+            raise RuntimeError("refresh() 需要以 watch=True 创建 CodeSommelier")
+        root_len = len(self.root.parts)
+        self._watch_state = {
+            'files': self.scanned_files,
+            'dirs': {Path(*p.parts[root_len:]).as_posix() for p in self.scanned_dirs},
+            # 结构分析结果位于 results[0] (见 taste)
+            'structure': self.results[0] if self.results else None,
+            'index': {r.path: r for r in self.results[1:]},
+            'rule_sets': {},
+        }
+        return self._watch_state
+
+    def _retaste(self):
+        self.results, self.file_tree, self.scanned_dirs = [], [], []
+        self.structure = ProjectStructureAnalyzer()
+        self.scanned_files = set()
+        self.clone_index = CloneIndex()
+        self.near_duplicate_index = NearDuplicateIndex()
+        self._watch_state = None
+        success, message = self.taste()
+        if not success:
+            print(message)
+        return success
+
+    def _rebuild_structure(self, files):
+        """目录树变化后重新汇总项目结构：按遍历顺序重新登记文件，并重新列出根目录"""
+        self.structure = ProjectStructureAnalyzer()
+        self._list_dir(self.root, "", [])
+        for rel in sorted(files, key=lambda p: p.split('/')):
+            self.structure.add_file(rel.rpartition('/')[2])
+
+    def _forget(self, rel_path, index):
+        if index.pop(rel_path, None) is not None:
+            print(f"🗑️ {rel_path}: 已移除")
+        if self.cache:
+            self.cache.discard(rel_path)
+
+    def _scan_new_dir(self, dir_path):
+        """遍历新出现的目录，产出 (目录, None) 或 (None, 文件)，遵循与 _walk 相同的忽略规则"""
+        stack = [dir_path]
+        while stack:
+            current = stack.pop()
+            yield current, None
+            try:
+                with os.scandir(current) as it:
+                    entries = sorted(it, key=lambda e: e.name)
+            except OSError:
+                continue
+            for e in entries:
+                try:
+                    is_dir = e.is_dir()
+                except OSError:
+                    is_dir = False
+                full_path = Path(e.path)
+                if self._is_watch_ignored(self._rel_path(full_path), is_dir):
+                    continue
+                if is_dir:
+                    stack.append(full_path)
+                else:
+                    yield None, full_path
+
+    def _is_watch_ignored(self, rel_path, is_dir):
+        """对 watch 模式中新出现的路径套用遍历时的全部忽略规则 (内置模式、--exclude 与 .gitignore)"""
+        if self._is_rel_path_ignored(rel_path):
+            return True
+        if not self.use_gitignore:
+            return False
+        parts = rel_path.split('/')
+        for depth, name in enumerate(parts):
+            rule_sets = self._rule_sets_for('/'.join(parts[:depth]))
+            entry_is_dir = is_dir or depth < len(parts) - 1
+            if rule_sets and is_path_ignored(rule_sets, '/'.join(parts[:depth + 1]), name, entry_is_dir):
+                return True
+        return False
 
-                # 2. 核心分发逻辑
-                analyzer = get_analyzer_for_file(full_path, self.target_language)
-                
-                if analyzer:
-                    score_data = analyzer.analyze(full_path)
-                    self.results.append(score_data)
+    def _rule_sets_for(self, rel_dir):
+        """rel_dir 目录中生效的忽略规则集 (与 _list_dir 的继承方式一致，按目录缓存)"""
+        cache = self._watch_state['rule_sets']
+        if rel_dir in cache:
+            return cache[rel_dir]
+        rule_sets = self._rule_sets_for(rel_dir.rpartition('/')[0]) if rel_dir else []
+        for ignore_file in IGNORE_FILES:
+            ignore_path = self.root / rel_dir / ignore_file
+            if ignore_path.is_file():
+                rules = GitIgnoreRules.from_file(ignore_path, rel_dir)
+                if rules and rules.rules:
+                    rule_sets = rule_sets + [rules]
+        cache[rel_dir] = rule_sets
+        return rule_sets
 
     def get_file_tree_str(self):
-        return "\n".join(self.file_tree)
\ No newline at end of file
+        return "\n".join(self.file_tree)
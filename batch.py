@@ -0,0 +1,280 @@
+import argparse
+import datetime
+import io
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from analyzer import CodeSommelier, _analyze_task, _init_worker, warm_analyzers, warm_pool
+from reporter import MarkdownReporter, summarize
+from watchdog_pool import WatchdogPool
+
+LEADERBOARD_NAME = 'LEADERBOARD.md'
+
+
+def read_manifest(manifest_path):
+    """
+    读取项目清单：每行一个项目根目录，空行与 # 开头的注释行被忽略。
+    相对路径相对清单文件所在目录解析；重复出现的项目只保留第一次。
+    """
+    base = Path(manifest_path).resolve().parent
+    projects, seen = [], set()
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            path = Path(line).expanduser()
+            if not path.is_absolute():
+                path = base / path
+            key = os.path.normpath(path)
+            if key in seen:
+                continue
+            seen.add(key)
+            projects.append(Path(key))
+    return projects
+
+
+def report_names(projects):
+    """
+    每个项目的报告名：取目录名 (去掉不适合做文件名的字符)，重名时追加序号。
+    排行榜占用了同一目录下的 LEADERBOARD.md，该名称同样视为已被占用。
+    """
+    names, used = [], {Path(LEADERBOARD_NAME).stem.lower()}
+    for project in projects:
+        base = re.sub(r'[^\w.-]+', '_', project.name).strip('.') or 'project'
+        name, n = base, 2
+        while name.lower() in used:
+            name, n = f"{base}-{n}", n + 1
+        used.add(name.lower())
+        names.append(name)
+    return names
+
+
+class _ThreadOutput:
+    """
+    按线程分流的 stdout：处于 capture() 中的线程写入各自的缓冲区，其余线程照常输出。
+    多个项目并发品鉴时，每个项目的进度信息在完成后整段打印，不会相互交错。
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def write(self, text):
+        buffer = getattr(self._local, 'buffer', None)
+        return (buffer if buffer is not None else self._stream).write(text)
+
+    def flush(self):
+        self._stream.flush()
+
+    def emit(self, text):
+        """把一段完整的输出直接写到原始 stdout"""
+        with self._lock:
+            self._stream.write(text)
+            self._stream.flush()
+
+    @contextmanager
+    def capture(self):
+        self._local.buffer = buffer = io.StringIO()
+        try:
+            yield buffer
+        finally:
+            self._local.buffer = None
+
+
+class BatchRunner:
+    """
+    批量品鉴：一次调用为清单中的全部项目评分。
+    所有项目共享同一个工作进程池与进程内已加载的分析器，省去每个项目的解释器启动与进程创建开销；
+    每个项目使用独立的 CodeSommelier 实例 (结果、文件树、克隆索引、结构统计、缓存互不影响)，
+    各自写出一份报告，最后汇总为排行榜。
+    concurrent_projects > 1 时多个项目在线程中同时进行，遍历、缓存与报告等主进程工作相互重叠，
+    分析任务全部交给共享的进程池。开启 file_timeout 时共享的是一个常驻看门狗进程池，
+    各项目依次使用 (与评分服务相同)。
+    """
+
+    def __init__(self, output_dir, jobs=1, concurrent_projects=1, language=None, exclude_patterns=None,
+                 use_gitignore=True, cache_dir=None, use_cache=True, large_file_mb=None,
+                 max_file_mb=None, file_timeout=None, prefetch=0):
+        self.output_dir = Path(output_dir)
+        self.jobs = jobs if jobs and jobs > 0 else (os.cpu_count() or 1)
+        self.concurrent_projects = max(1, concurrent_projects or 1)
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.use_cache = use_cache
+        self.options = {
+            'target_language': language,
+            'exclude_patterns': exclude_patterns or None,
+            'use_gitignore': use_gitignore,
+            'large_file_mb': large_file_mb,
+            'max_file_mb': max_file_mb,
+            'file_timeout': file_timeout,
+            'prefetch': prefetch,
+        }
+        self._output = None
+
+    def run(self, projects):
+        """品鉴全部项目，返回按清单顺序排列的记录列表 (见 _score)"""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        names = report_names(projects)
+        executor = watchdog = None
+        if self.options['file_timeout'] and self.options['file_timeout'] > 0:
+            # 在主进程预热之后再拉起看门狗进程，子进程继承已加载的分析器
+            warm_analyzers()
+            watchdog = WatchdogPool(_analyze_task, workers=self.jobs, timeout=self.options['file_timeout'],
+                                    initializer=_init_worker).start()
+        elif self.jobs > 1:
+            executor = ProcessPoolExecutor(max_workers=self.jobs)
+        pools = {'executor': executor, 'watchdog': watchdog}
+        try:
+            if self.concurrent_projects == 1:
+                return [self._score(project, name, pools) for project, name in zip(projects, names)]
+            if executor:
+                # 进程池按需 fork 工作进程；在项目线程启动之前一次性拉起全部进程，
+                # 避免在多线程运行时 fork 出继承了其他线程所持锁的子进程
+                warm_pool(executor, self.jobs)
+            saved_stdout = sys.stdout
+            self._output = sys.stdout = _ThreadOutput(saved_stdout)
+            try:
+                with ThreadPoolExecutor(max_workers=self.concurrent_projects) as threads:
+                    return list(threads.map(self._score, projects, names, [pools] * len(projects)))
+            finally:
+                sys.stdout, self._output = saved_stdout, None
+        finally:
+            if executor:
+                executor.shutdown()
+            if watchdog:
+                watchdog.close()
+
+    def _score(self, project, name, pools):
+        if self._output is None:
+            return self._taste_project(project, name, pools)
+        with self._output.capture() as log:
+            entry = self._taste_project(project, name, pools)
+        self._output.emit(log.getvalue())
+        return entry
+
+    def _taste_project(self, project, name, pools):
+        """
+        品鉴单个项目并写出报告，返回记录:
+        {'name', 'path', 'success', 'message', 'summary', 'report', 'seconds'}
+        """
+        start = time.perf_counter()
+        entry = {'name': name, 'path': str(project), 'success': False, 'message': '',
+                 'summary': None, 'report': None, 'seconds': 0.0}
+        print(f"\n🍇 [{name}] {project}")
+        try:
+            cache_dir = self.cache_dir / name if self.cache_dir else None
+            sommelier = CodeSommelier(project, jobs=self.jobs, cache_dir=cache_dir, use_cache=self.use_cache,
+                                      **pools, **self.options)
+            success, message = sommelier.taste()
+            if not success:
+                entry['message'] = message
+                print(message)
+            else:
+                report = self.output_dir / f"{name}.md"
+                MarkdownReporter().generate(sommelier.results, sommelier.get_file_tree_str(), str(report))
+                entry.update(success=True, summary=summarize(sommelier.results), report=report.name)
+        except Exception as e:
+            # 单个项目出错不影响其余项目，记录在排行榜中
+            entry['message'] = f"{type(e).__name__}: {e}"
+            print(f"❌ [{name}] 品鉴失败: {entry['message']}")
+        entry['seconds'] = time.perf_counter() - start
+        return entry
+
+
+def write_leaderboard(entries, output_path):
+    """按综合评分从高到低写出排行榜，失败的项目列在最后"""
+    scored = sorted((e for e in entries if e['success']), key=lambda e: -e['summary']['avg_score'])
+    failed = [e for e in entries if not e['success']]
+    total_seconds = sum(e['seconds'] for e in entries)
+
+    lines = [
+        "# 🏆 Code Sommelier 庄园排行榜",
+        f"> **生成时间**: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+        "",
+        f"- **参评庄园**: {len(entries)} 个 (成功 {len(scored)} 个，失败 {len(failed)} 个)",
+        f"- **累计品鉴耗时**: {total_seconds:.2f}s",
+        "",
+        "| 名次 | 项目 | 得分 | 等级 | 文件数 | 跳过 | 耗时 | 报告 |",
+        "| :---: | :--- | :---: | :---: | :---: | :---: | :---: | :--- |",
+    ]
+    for rank, e in enumerate(scored, 1):
+        summary = e['summary']
+        lines.append(f"| {rank} | `{e['name']}` | {summary['avg_score']:.2f} | **{summary['rank']}** | "
+                     f"{summary['file_count']} | {summary['skipped_count']} | {e['seconds']:.2f}s | "
+                     f"[{e['report']}]({e['report']}) |")
+    if failed:
+        lines += ["", "## ❌ 未能品鉴的庄园", ""]
+        for e in failed:
+            lines.append(f"- `{e['name']}` ({e['path']}): {e['message']}")
+    lines.append("")
+
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='main.py batch', description="Code Sommelier 批量品鉴 🍷🍷🍷")
+    parser.add_argument('--manifest', type=str, required=True,
+                        help='项目清单文件：每行一个项目根目录 (相对清单所在目录)，# 开头为注释')
+    parser.add_argument('--output_dir', type=str, default='sommelier_reports',
+                        help=f'报告输出目录，每个项目一份 <名称>.md，另有汇总的 {LEADERBOARD_NAME} (默认: sommelier_reports)')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='工作进程数，所有项目共享同一个进程池；传入 0 则使用全部 CPU 核心 (默认: 1)')
+    parser.add_argument('--concurrent_projects', type=int, default=1, metavar='N',
+                        help='同时品鉴的项目数 (默认: 1)。项目较多且较小时调大，可让进程池保持忙碌')
+    parser.add_argument('--language', type=str, default=None, choices=['python', 'cpp'], help='指定评判语言')
+    parser.add_argument('--exclude', action='append', default=[], metavar='PATTERN',
+                        help='额外排除的路径模式 (gitignore 语法，相对各项目根目录)，可重复指定')
+    parser.add_argument('--no_gitignore', action='store_true', help='不读取项目中的 .gitignore / .ignore 文件')
+    parser.add_argument('--no_cache', action='store_true', help='禁用增量分析缓存')
+    parser.add_argument('--cache_dir', type=str, default=None,
+                        help='缓存根目录，每个项目使用其中的 <名称>/ 子目录 (默认: 各项目下的 .sommelier_cache/)')
+    parser.add_argument('--large_file_mb', type=float, default=20,
+                        help='超过该大小 (MB) 的文件改用流式分析 (默认: 20，0 表示不限制)')
+    parser.add_argument('--max_file_mb', type=float, default=None, help='单个文件的大小上限 (MB)，超出的文件记为跳过')
+    parser.add_argument('--file_timeout', type=float, default=None, metavar='SECONDS',
+                        help='单个文件的分析时限 (秒)，超时的文件记为跳过')
+    parser.add_argument('--prefetch', type=int, default=0, metavar='N', help='预读线程数 (默认: 0)')
+    args = parser.parse_args(argv)
+
+    try:
+        projects = read_manifest(args.manifest)
+    except OSError as e:
+        print(f"❌ 无法读取项目清单: {e}")
+        sys.exit(1)
+    if not projects:
+        print("❌ 项目清单中没有任何项目。")
+        sys.exit(1)
+
+    runner = BatchRunner(
+        args.output_dir,
+        jobs=args.jobs,
+        concurrent_projects=args.concurrent_projects,
+        language=args.language,
+        exclude_patterns=args.exclude,
+        use_gitignore=not args.no_gitignore,
+        cache_dir=args.cache_dir,
+        use_cache=not args.no_cache,
+        large_file_mb=args.large_file_mb,
+        max_file_mb=args.max_file_mb,
+        file_timeout=args.file_timeout,
+        prefetch=args.prefetch,
+    )
+    print(f"🍷 批量品鉴 {len(projects)} 个庄园 (工作进程: {runner.jobs}，并行项目: {runner.concurrent_projects})...")
+    start = time.perf_counter()
+    entries = runner.run(projects)
+    leaderboard = runner.output_dir / LEADERBOARD_NAME
+    write_leaderboard(entries, leaderboard)
+
+    failed = sum(1 for e in entries if not e['success'])
+    print(f"\n🏆 排行榜已装瓶: {leaderboard} ({len(entries) - failed} 个成功，{failed} 个失败，"
+          f"总耗时 {time.perf_counter() - start:.2f}s)")
+    if failed:
+        sys.exit(1)
@@ -0,0 +1,5 @@
+"""
+性能基准套件
+    python -m benchmarks.run            # 生成合成语料并测量各分析器与端到端的吞吐、峰值内存
+    python -m benchmarks.corpus <目录>   # 只生成合成语料
+"""
@@ -0,0 +1,337 @@
+import argparse
+import random
+from pathlib import Path
+
+# 各档位的规模：每种语言的普通文件数、每个文件的函数数、函数体行数，
+# 以及病态样本 (单个巨型函数的行数、花括号/缩进的嵌套层数)
+SIZES = {
+    'small':  {'files': 4,  'functions': 12, 'body': 10, 'huge_body': 2000,  'deep': 40},
+    'medium': {'files': 16, 'functions': 30, 'body': 14, 'huge_body': 10000, 'deep': 120},
+    'large':  {'files': 48, 'functions': 60, 'body': 20, 'huge_body': 40000, 'deep': 400},
+}
+
+_WORDS = ['user', 'order', 'item', 'cache', 'value', 'index', 'buffer', 'config',
+          'request', 'result', 'node', 'path', 'count', 'token', 'state', 'event']
+
+
+def _name(rng, style):
+    words = [rng.choice(_WORDS) for _ in range(rng.randint(1, 3))]
+    if style == 'snake':
+        return '_'.join(words)
+    if style == 'pascal':
+        return ''.join(w.capitalize() for w in words)
+    return words[0] + ''.join(w.capitalize() for w in words[1:])
+
+
+#  Python
+
+def _py_block(rng, lines, depth, indent):
+    pad = '    ' * indent
+    out = []
+    while len(out) < lines:
+        kind = rng.random()
+        if kind < 0.15:
+            # 注释后总是跟一条语句，避免代码块中只有注释
+            out.append(f"{pad}# 处理 {rng.choice(_WORDS)} 的边界情况")
+            out.append(f"{pad}{_name(rng, 'snake')} = a")
+        elif kind < 0.35 and depth > 0:
+            out.append(f"{pad}if {_name(rng, 'snake')} > {rng.randint(0, 99)}:")
+            out += _py_block(rng, rng.randint(1, 4), depth - 1, indent + 1)
+        elif kind < 0.45 and depth > 0:
+            out.append(f"{pad}for {_name(rng, 'snake')} in range({rng.randint(1, 9)}):")
+            out += _py_block(rng, rng.randint(1, 3), depth - 1, indent + 1)
+        elif kind < 0.5:
+            out.append(f"{pad}try:")
+            out.append(f"{pad}    value = int('{rng.randint(0, 9)}')")
+            out.append(f"{pad}except ValueError:")
+            out.append(f"{pad}    pass")
+        else:
+            out.append(f"{pad}{_name(rng, 'snake')} = \"{{not a brace}}\" + str({rng.randint(0, 999)})")
+    return out
+
+
+def _python(rng, functions, body, depth):
+    out = ['"""合成的 Python 模块"""', 'import os', '']
+    for _ in range(functions):
+        name = _name(rng, 'snake' if rng.random() < 0.9 else 'camel')
+        out.append(f"def {name}(a, b, c=None):")
+        out.append(f'    """{name} 的说明"""')
+        out += _py_block(rng, body, depth, 1)
+        out.append('')
+    out.append(f"class {_name(rng, 'pascal')}:")
+    out.append("    def run(self):")
+    out += _py_block(rng, body, depth, 2)
+    return '\n'.join(out) + '\n'
+
+
+def _python_deep(depth):
+    # Python 解析器限制缩进层数 (约 100)，超出部分折算为更多的同层分支
+    depth = min(depth, 90)
+    out = ['def deep(x):']
+    for level in range(depth):
+        out.append('    ' * (level + 1) + f"if x > {level}:")
+    out.append('    ' * (depth + 1) + "return x")
+    return '\n'.join(out) + '\n'
+
+
+#  C 家族 (C++ / Go / Java / C# / JS)
+
+# 每种方言的语法片段：函数头、变量声明、输出语句、文件头/尾
+_C_SYNTAX = {
+    'cpp': {
+        'head': ['#include <string>', '#define MAX_SIZE 128', ''],
+        'func': 'int {name}(int a, int b) {{',
+        'var': 'int {name} = a + {n};',
+        'print': 'std::string s = "{{ not a brace }}";',
+        'tail': [],
+    },
+    'go': {
+        'head': ['package synthetic', '', 'import "fmt"', ''],
+        'func': 'func {name}(a int, b int) int {{',
+        'var': '{name} := a + {n}',
+        'print': 'fmt.Println("{{ not a brace }}", `raw {{ string`)',
+        'tail': [],
+    },
+    'java': {
+        'head': ['package synthetic;', '', 'public class Synthetic {'],
+        'func': '    public int {name}(int a, int b) {{',
+        'var': 'int {name} = a + {n};',
+        'print': 'System.out.println("{{ not a brace }}");',
+        'tail': ['}'],
+    },
+    'csharp': {
+        'head': ['using System;', '', 'namespace Synthetic', '{', 'public class Synthetic', '{'],
+        'func': '    public int {name}(int a, int b) {{',
+        'var': 'var {name} = a + {n};',
+        'print': 'Console.WriteLine(@"{{ not a brace }}");',
+        'tail': ['}', '}'],
+    },
+    'js': {
+        'head': ["'use strict';", ''],
+        'func': 'function {name}(a, b) {{',
+        'var': 'const {name} = a + {n};',
+        'print': 'const s = `template {{ ${{a}} }}`;',
+        'tail': [],
+    },
+}
+
+
+def _c_block(rng, dialect, lines, depth, indent):
+    syntax = _C_SYNTAX[dialect]
+    pad = '    ' * indent
+    out = []
+    while len(out) < lines:
+        kind = rng.random()
+        if kind < 0.15:
+            out.append(f"{pad}// 处理 {rng.choice(_WORDS)} 的边界情况")
+        elif kind < 0.2:
+            out.append(f"{pad}/* 多行注释")
+            out.append(f"{pad} * 包含 {{ 花括号 }} */")
+        elif kind < 0.4 and depth > 0:
+            cond = f"a > {rng.randint(0, 99)}"
+            if dialect == 'go':
+                out.append(f"{pad}if {cond} {{")
+            else:
+                out.append(f"{pad}{rng.choice(['if', 'while'])} ({cond}) {{")
+            out += _c_block(rng, dialect, rng.randint(1, 4), depth - 1, indent + 1)
+            out.append(f"{pad}}}")
+        elif kind < 0.5:
+            out.append(pad + syntax['print'].format())
+        else:
+            out.append(pad + syntax['var'].format(name=_name(rng, 'camel'), n=rng.randint(0, 999)))
+    return out
+
+
+def _c_family(dialect):
+    syntax = _C_SYNTAX[dialect]
+    base_indent = 1 if syntax['func'].startswith('    ') else 0
+
+    def generate(rng, functions, body, depth):
+        out = list(syntax['head'])
+        for _ in range(functions):
+            name = _name(rng, 'pascal' if dialect in ('go', 'csharp') else 'camel')
+            out.append(syntax['func'].format(name=name))
+            out += _c_block(rng, dialect, body, depth, base_indent + 1)
+            out.append('    ' * base_indent + '}')
+            out.append('')
+        out += syntax['tail']
+        return '\n'.join(out) + '\n'
+
+    def deep(depth):
+        out = list(syntax['head'])
+        out.append(syntax['func'].format(name='Deep'))
+        for level in range(depth):
+            out.append('    ' * (base_indent + level + 1) + ('if a > %d {' if dialect == 'go' else 'if (a > %d) {') % level)
+        for level in reversed(range(depth)):
+            out.append('    ' * (base_indent + level + 1) + '}')
+        out.append('    ' * base_indent + '}')
+        out += syntax['tail']
+        return '\n'.join(out) + '\n'
+
+    return generate, deep
+
+
+#  前端
+
+def _jsx(rng, functions, body, depth):
+    out = ["import React from 'react';", '']
+    for _ in range(functions):
+        name = _name(rng, 'pascal')
+        out.append(f"export function {name}(props: any) {{")
+        out.append(f"    const {_name(rng, 'camel')} = props.value;")
+        out.append("    return (")
+        for level in range(depth):
+            attr = ' style={{color: "red"}}' if rng.random() < 0.2 else ' className="box"'
+            out.append('        ' + '  ' * level + f'<div{attr}>')
+        for _ in range(body):
+            out.append('        ' + '  ' * depth + f'<span>{rng.choice(_WORDS)}</span>')
+        for level in reversed(range(depth)):
+            out.append('        ' + '  ' * level + '</div>')
+        out.append("    );")
+        out.append("}")
+        out.append('')
+    return '\n'.join(out) + '\n'
+
+
+def _jsx_deep(depth):
+    return _jsx(random.Random(0), 1, 1, depth)
+
+
+def _html_body(rng, body, depth):
+    out = []
+    for level in range(depth):
+        style = ' style="margin: 0"' if rng.random() < 0.1 else ''
+        out.append('  ' * level + f'<div class="level-{level}"{style}>')
+    for _ in range(body):
+        out.append('  ' * depth + f'<p>{rng.choice(_WORDS)} {rng.randint(0, 999)}</p>')
+    for level in reversed(range(depth)):
+        out.append('  ' * level + '</div>')
+    return out
+
+
+def _html(rng, functions, body, depth):
+    out = ['<!DOCTYPE html>', '<html>', '<head><title>synthetic</title></head>', '<body>']
+    if rng.random() < 0.5:
+        out.append('<header>synthetic</header>')
+    for _ in range(functions):
+        out += _html_body(rng, body, depth)
+    out += ['</body>', '</html>']
+    return '\n'.join(out) + '\n'
+
+
+def _html_deep(depth):
+    return _html(random.Random(0), 1, 1, depth)
+
+
+def _css(rng, functions, body, depth):
+    out = ['/* 合成样式表 */']
+    for _ in range(functions * 2):
+        selector = ' '.join(f".{_name(rng, 'snake')}" for _ in range(rng.randint(1, depth + 1)))
+        out.append(f"{selector} {{")
+        for _ in range(max(1, body // 3)):
+            important = ' !important' if rng.random() < 0.05 else ''
+            out.append(f"    margin: {rng.randint(0, 32)}px{important};")
+        out.append("}")
+    return '\n'.join(out) + '\n'
+
+
+def _css_deep(depth):
+    selector = ' > '.join(f'.level-{level}' for level in range(depth))
+    return f"{selector} {{\n    color: red;\n}}\n"
+
+
+def _vue(rng, functions, body, depth):
+    out = ['<template>']
+    out += ['  ' + line for line in _html_body(rng, body, depth)]
+    if rng.random() < 0.3:
+        out.append('  <li v-for="item in items" v-if="item.visible">{{ item }}</li>')
+    out.append('</template>')
+    out.append('')
+    out.append('<script>')
+    out.append('export default {')
+    out.append('  methods: {')
+    for _ in range(functions):
+        out.append(f"    {_name(rng, 'camel')}(a) {{")
+        out.append(f"      // {rng.choice(_WORDS)}")
+        out.append(f"      return a + {rng.randint(0, 99)};")
+        out.append("    },")
+    out.append('  }')
+    out.append('};')
+    out.append('</script>')
+    out.append('')
+    out.append('<style scoped>' if rng.random() < 0.7 else '<style>')
+    out.append('.box { color: red; }')
+    out.append('</style>')
+    return '\n'.join(out) + '\n'
+
+
+def _vue_deep(depth):
+    return _vue(random.Random(0), 1, 1, depth)
+
+
+_CPP, _CPP_DEEP = _c_family('cpp')
+_GO, _GO_DEEP = _c_family('go')
+_JAVA, _JAVA_DEEP = _c_family('java')
+_CS, _CS_DEEP = _c_family('csharp')
+_JS, _JS_DEEP = _c_family('js')
+
+# 语言 -> (文件后缀, 普通样本生成器, 深度嵌套样本生成器)。语言名与 flavors.REGISTRY 保持一致
+GENERATORS = {
+    'python':     ('.py',   _python, _python_deep),
+    'cpp':        ('.cpp',  _CPP,    _CPP_DEEP),
+    'go':         ('.go',   _GO,     _GO_DEEP),
+    'java':       ('.java', _JAVA,   _JAVA_DEEP),
+    'csharp':     ('.cs',   _CS,     _CS_DEEP),
+    'vue':        ('.vue',  _vue,    _vue_deep),
+    'react':      ('.tsx',  _jsx,    _jsx_deep),
+    'html':       ('.html', _html,   _html_deep),
+    'css':        ('.css',  _css,    _css_deep),
+    'javascript': ('.js',   _JS,     _JS_DEEP),
+}
+
+
+def generate_corpus(out_dir, size='medium', seed=0):
+    """
+    在 out_dir 下生成确定性的合成语料 (相同的 size 与 seed 总是得到相同的文件)。
+    每种语言一个子目录，包含普通文件、一个巨型单函数文件和一个深度嵌套文件。
+    返回 {语言: [文件路径, ...]}。
+    """
+    spec = SIZES[size]
+    out_dir = Path(out_dir)
+    files = {}
+    for lang, (ext, generate, deep) in GENERATORS.items():
+        # 每种语言使用独立的随机序列，新增语言不会改变其他语言的语料
+        rng = random.Random(f"{seed}:{lang}")
+        lang_dir = out_dir / lang
+        lang_dir.mkdir(parents=True, exist_ok=True)
+        samples = []
+        for i in range(spec['files']):
+            samples.append((f"sample_{i}{ext}", generate(rng, spec['functions'], spec['body'], 3)))
+        samples.append((f"huge_function{ext}", generate(rng, 1, spec['huge_body'], 3)))
+        samples.append((f"deep_nesting{ext}", deep(spec['deep'])))
+
+        files[lang] = []
+        for name, text in samples:
+            path = lang_dir / name
+            path.write_text(text, encoding='utf-8')
+            files[lang].append(path)
+    # 让端到端测试也经过项目结构分析的常规路径
+    (out_dir / 'README.md').write_text('# synthetic corpus\n', encoding='utf-8')
+    (out_dir / '.gitignore').write_text('*.tmp\n', encoding='utf-8')
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成基准测试用的合成语料")
+    parser.add_argument('out_dir', type=str, help='输出目录')
+    parser.add_argument('--size', type=str, default='medium', choices=list(SIZES))
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    files = generate_corpus(args.out_dir, args.size, args.seed)
+    total = sum(len(paths) for paths in files.values())
+    print(f"🍇 已生成 {total} 个合成文件: {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
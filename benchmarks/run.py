@@ -0,0 +1,264 @@
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from benchmarks.corpus import SIZES, generate_corpus
+
+try:
+    import resource
+except ImportError:  # Windows 没有 resource 模块，峰值内存记为 None
+    resource = None
+
+DEFAULT_BASELINE = Path(__file__).with_name('baseline.json')
+REPO_ROOT = Path(__file__).resolve().parent.parent
+# 冷启动测量：模拟 pre-commit 钩子只检查少量文件的场景
+STARTUP_LANGUAGE = 'css'
+STARTUP_FILES = 3
+# 冷启动耗时的波动在该值 (秒) 以内时不视为回退
+STARTUP_NOISE_SECONDS = 0.02
+# 峰值内存的波动在该值 (MB) 以内时不视为回退，避免解释器本身的抖动造成误报
+RSS_NOISE_MB = 2.0
+
+
+def _peak_rss_mb():
+    """当前进程的峰值常驻内存 (MB)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 为单位，macOS 以字节为单位
+    if sys.platform == 'darwin':
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def _bench_flavor(lang, paths, repeat):
+    """在独立进程中测量单个分析器：重复 repeat 次取最快的一次"""
+    from flavors import load_analyzer_class
+
+    analyzer = load_analyzer_class(lang)()
+    paths = [Path(p) for p in paths]
+    total_bytes = sum(p.stat().st_size for p in paths)
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for path in paths:
+            analyzer.analyze(path)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return _metrics(len(paths), total_bytes, best)
+
+
+def _bench_end_to_end(corpus_dir, repeat, jobs):
+    """在独立进程中测量完整的 CodeSommelier.taste 流程 (不使用缓存)"""
+    from analyzer import CodeSommelier
+
+    total_bytes = sum(p.stat().st_size for p in Path(corpus_dir).rglob('*') if p.is_file())
+    best, files = None, 0
+    for _ in range(repeat):
+        sommelier = CodeSommelier(corpus_dir, jobs=jobs, use_cache=False)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            sommelier.taste()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        files = len(sommelier.results)
+    return _metrics(files, total_bytes, best)
+
+
+def _bench_startup(paths, repeat):
+    """
+    冷启动测量：每次都启动新的解释器。
+    import_seconds 为导入 main 模块的耗时，seconds 为对 STARTUP_FILES 个文件完整运行 main.py 的墙钟时间。
+    """
+    work_dir = Path(tempfile.mkdtemp(prefix='sommelier_startup_'))
+    try:
+        project = work_dir / 'project'
+        project.mkdir()
+        for path in paths:
+            shutil.copy(path, project / Path(path).name)
+        import_code = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+        command = [sys.executable, str(REPO_ROOT / 'main.py'), '--project_path', str(project),
+                   '--no_cache', '--output', str(work_dir / 'CODE_RATING.md')]
+        best_import, best_run = None, None
+        for _ in range(repeat):
+            out = subprocess.run([sys.executable, '-c', import_code], cwd=REPO_ROOT,
+                                 capture_output=True, text=True, check=True).stdout
+            best_import = min(float(out), best_import or float('inf'))
+            start = time.perf_counter()
+            subprocess.run(command, cwd=work_dir, capture_output=True, check=True)
+            best_run = min(time.perf_counter() - start, best_run or float('inf'))
+        return {
+            'files': len(paths),
+            'language': STARTUP_LANGUAGE,
+            'import_seconds': round(best_import, 4),
+            'seconds': round(best_run, 4),
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _metrics(files, total_bytes, seconds):
+    seconds = max(seconds, 1e-9)
+    return {
+        'files': files,
+        'bytes': total_bytes,
+        'seconds': round(seconds, 4),
+        'files_per_sec': round(files / seconds, 2),
+        'mb_per_sec': round(total_bytes / (1024 * 1024) / seconds, 3),
+        'peak_rss_mb': _peak_rss_mb(),
+    }
+
+
+def _run_isolated(func, *args):
+    """
+    每项测量使用全新的 spawn 进程，峰值内存互不影响，
+    也不会继承父进程 (生成语料、前一项测量) 的内存占用。
+    """
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(func, *args).result()
+
+
+def run_benchmarks(size='medium', seed=0, repeat=3, jobs=1, corpus_dir=None):
+    """生成语料并依次测量各分析器与端到端流程，返回结果字典"""
+    work_dir = Path(corpus_dir) if corpus_dir else Path(tempfile.mkdtemp(prefix='sommelier_bench_'))
+    try:
+        print(f"🍇 正在生成 {size} 规模的合成语料 (seed={seed})...")
+        files = generate_corpus(work_dir, size, seed)
+
+        results = {
+            'meta': {
+                'size': size,
+                'seed': seed,
+                'repeat': repeat,
+                'jobs': jobs,
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+            },
+            'flavors': {},
+        }
+        for lang, paths in files.items():
+            print(f"⏱️ 正在测量 {lang} ...")
+            results['flavors'][lang] = _run_isolated(_bench_flavor, lang, [str(p) for p in paths], repeat)
+        print(f"⏱️ 正在测量端到端流程 (jobs={jobs}) ...")
+        results['end_to_end'] = _run_isolated(_bench_end_to_end, str(work_dir), repeat, jobs)
+        print(f"⏱️ 正在测量冷启动 ({STARTUP_FILES} 个 {STARTUP_LANGUAGE} 文件) ...")
+        results['startup'] = _bench_startup([str(p) for p in files[STARTUP_LANGUAGE][:STARTUP_FILES]], repeat)
+        return results
+    finally:
+        if not corpus_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def compare(current, baseline, threshold):
+    """与基线对比，返回回退项的描述列表 (吞吐下降或峰值内存上升超过 threshold 比例)"""
+    regressions = []
+    pairs = [(f"flavor:{lang}", data, baseline.get('flavors', {}).get(lang))
+             for lang, data in current['flavors'].items()]
+    pairs.append(('end_to_end', current['end_to_end'], baseline.get('end_to_end')))
+
+    for name, now, before in pairs:
+        if not before:
+            continue
+        if before['files_per_sec'] and now['files_per_sec'] < before['files_per_sec'] * (1 - threshold):
+            regressions.append(
+                f"{name}: 吞吐 {now['files_per_sec']:.1f} files/s，低于基线 {before['files_per_sec']:.1f} files/s")
+        if now['peak_rss_mb'] is not None and before.get('peak_rss_mb') is not None:
+            limit = max(before['peak_rss_mb'] * (1 + threshold), before['peak_rss_mb'] + RSS_NOISE_MB)
+            if now['peak_rss_mb'] > limit:
+                regressions.append(
+                    f"{name}: 峰值内存 {now['peak_rss_mb']:.1f} MB，高于基线 {before['peak_rss_mb']:.1f} MB")
+
+    now, before = current.get('startup'), baseline.get('startup')
+    if now and before:
+        for key, label in (('import_seconds', '导入耗时'), ('seconds', '冷启动耗时')):
+            limit = max(before[key] * (1 + threshold), before[key] + STARTUP_NOISE_SECONDS)
+            if now[key] > limit:
+                regressions.append(f"startup: {label} {now[key]:.3f}s，高于基线 {before[key]:.3f}s")
+    return regressions
+
+
+def print_table(results):
+    header = f"{'项目':<16}{'文件数':>8}{'耗时(s)':>10}{'files/s':>12}{'MB/s':>10}{'峰值内存(MB)':>14}"
+    print(header)
+    print('-' * len(header))
+    rows = [(lang, data) for lang, data in results['flavors'].items()]
+    rows.append(('end_to_end', results['end_to_end']))
+    for name, data in rows:
+        rss = f"{data['peak_rss_mb']:.1f}" if data['peak_rss_mb'] is not None else '-'
+        print(f"{name:<16}{data['files']:>8}{data['seconds']:>10.3f}"
+              f"{data['files_per_sec']:>12.1f}{data['mb_per_sec']:>10.2f}{rss:>14}")
+    startup = results.get('startup')
+    if startup:
+        print(f"\n冷启动 ({startup['files']} 个 {startup['language']} 文件): {startup['seconds']:.3f}s，"
+              f"其中导入 main {startup['import_seconds']:.3f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Code Sommelier 性能基准 ⏱️")
+    parser.add_argument('--size', type=str, default='medium', choices=list(SIZES),
+                        help='合成语料的规模 (默认: medium)')
+    parser.add_argument('--seed', type=int, default=0, help='语料生成的随机种子')
+    parser.add_argument('--repeat', type=int, default=3, help='每项测量重复次数，取最快的一次')
+    parser.add_argument('--jobs', type=int, default=1, help='端到端测量使用的进程数')
+    parser.add_argument('--corpus_dir', type=str, default=None,
+                        help='把语料生成到该目录并保留 (默认使用临时目录，结束后删除)')
+    parser.add_argument('--baseline', type=str, default=str(DEFAULT_BASELINE),
+                        help='基线结果文件 (默认: benchmarks/baseline.json)')
+    parser.add_argument('--save_baseline', action='store_true', help='把本次结果保存为新的基线')
+    parser.add_argument('--no_compare', action='store_true',
+                        help='只测量，不与基线对比 (默认与基线对比，基线缺失或不匹配时以非零状态退出)')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='允许的回退比例，超过则以非零状态退出 (默认: 0.2)')
+    parser.add_argument('--output', type=str, default=None, help='把本次结果写入该 JSON 文件')
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.size, args.seed, args.repeat, args.jobs, args.corpus_dir)
+    print()
+    print_table(results)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding='utf-8')
+
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        baseline_path.write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding='utf-8')
+        print(f"\n💾 已保存基线: {baseline_path}")
+        return
+    if args.no_compare:
+        return
+
+    # 门禁模式：没有可对比的基线时不能视为通过
+    if not baseline_path.exists():
+        print(f"\n❌ 未找到基线 {baseline_path}，无法进行回退检查。"
+              f"请先在基准机器上使用 --save_baseline 生成，或使用 --no_compare 只做测量")
+        sys.exit(1)
+
+    baseline = json.loads(baseline_path.read_text(encoding='utf-8'))
+    meta, base_meta = results['meta'], baseline.get('meta', {})
+    if (meta['size'], meta['seed'], meta['jobs']) != (base_meta.get('size'), base_meta.get('seed'), base_meta.get('jobs')):
+        print(f"\n❌ 基线的语料规模/种子/进程数 ({base_meta.get('size')}/{base_meta.get('seed')}/{base_meta.get('jobs')}) "
+              f"与本次 ({meta['size']}/{meta['seed']}/{meta['jobs']}) 不同，无法进行回退检查")
+        sys.exit(1)
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n❌ 发现 {len(regressions)} 项性能回退 (阈值 {args.threshold:.0%}):")
+        for line in regressions:
+            print(f"  - {line}")
+        sys.exit(1)
+    print(f"\n✅ 与基线相比没有超过 {args.threshold:.0%} 的回退")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import os
+import json
+import hashlib
+from pathlib import Path
+from flavors.base import AnalysisResult
+
+# 默认缓存目录 (位于项目根目录下，以 . 开头因此不会被扫描)
+CACHE_DIR_NAME = '.sommelier_cache'
+CACHE_FILE_NAME = 'results.json'
+# 缓存文件结构变化时递增，旧格式的缓存整体作废
+CACHE_FORMAT = 4  # v2: 问题以 [规则编号, 参数...] 的形式保存；v3: 零分结果的评级统一为 calculate_rating(0)；v4: rating 与报告等级共用分界
+
+
+def file_digest(file_path, chunk_size=1 << 20):
+    """分块计算文件内容的 SHA-1，避免一次性读入大文件"""
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class AnalysisCache:
+    """
+    增量分析缓存 (酒窖)
+    以 相对路径 + 文件大小 + mtime + 内容哈希 + 分析器版本 作为键，保存每个文件的 AnalysisResult。
+    大小与 mtime 均未变化时直接命中；mtime 变化但内容哈希一致 (如 git checkout) 时同样视为命中。
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = Path(cache_dir)
+        self.cache_file = self.cache_dir / CACHE_FILE_NAME
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        # 未命中的文件在 lookup 时记录下指纹，store 时写入
+        self._pending = {}
+        self._seen = set()
+        self._dirty = False
+
+    def load(self):
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return self
+        if data.get('format') == CACHE_FORMAT:
+            self.entries = data.get('entries', {})
+        return self
+
+    def lookup(self, rel_path, file_path, stamp, st=None):
+        """返回缓存的 AnalysisResult，未命中时返回 None (调用方已 stat 过时可传入 st 避免重复调用)"""
+        self._seen.add(rel_path)
+        if st is None:
+            try:
+                st = os.stat(file_path)
+            except OSError:
+                pass
+        if st is None:
+            self.misses += 1
+            return None
+
+        entry = self.entries.get(rel_path)
+        if entry and entry['stamp'] == stamp and entry['size'] == st.st_size:
+            if entry['mtime_ns'] == st.st_mtime_ns:
+                self.hits += 1
+                return AnalysisResult.from_dict(entry['result'])
+            try:
+                digest = file_digest(file_path)
+            except OSError:
+                digest = None
+            if digest == entry['sha1']:
+                entry['mtime_ns'] = st.st_mtime_ns
+                self._dirty = True
+                self.hits += 1
+                return AnalysisResult.from_dict(entry['result'])
+
+        self.misses += 1
+        self._pending[rel_path] = (stamp, st.st_size, st.st_mtime_ns)
+        return None
+
+    def peek(self, rel_path, stamp):
+        """不校验文件指纹，直接读取缓存结果 (用于增量模式中未变更的文件)"""
+        entry = self.entries.get(rel_path)
+        if entry and entry['stamp'] == stamp:
+            self.hits += 1
+            return AnalysisResult.from_dict(entry['result'])
+        return None
+
+    def store(self, rel_path, file_path, result):
+        pending = self._pending.pop(rel_path, None)
+        if pending is None:
+            return
+        stamp, size, mtime_ns = pending
+        try:
+            digest = file_digest(file_path)
+        except OSError:
+            return
+        self.entries[rel_path] = {
+            'size': size,
+            'mtime_ns': mtime_ns,
+            'sha1': digest,
+            'stamp': stamp,
+            'result': result.to_dict(),
+        }
+        self._dirty = True
+
+    def discard(self, rel_path):
+        """删除某个文件的缓存条目 (watch 模式中文件被删除时调用)"""
+        if self.entries.pop(rel_path, None) is not None:
+            self._dirty = True
+        self._pending.pop(rel_path, None)
+
+    def save(self, prune=True):
+        """
+        写回缓存文件 (先写临时文件再替换，避免中断导致缓存损坏)。
+        prune 为 True 时丢弃本次未扫描到的文件，防止缓存无限增长。
+        """
+        if prune:
+            stale = self.entries.keys() - self._seen
+            for rel_path in stale:
+                del self.entries[rel_path]
+            self._dirty = self._dirty or bool(stale)
+        if not self._dirty:
+            return
+
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            gitignore = self.cache_dir / '.gitignore'
+            if not gitignore.exists():
+                gitignore.write_text('*\n', encoding='utf-8')
+            tmp_file = self.cache_file.with_suffix('.tmp')
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({'format': CACHE_FORMAT, 'entries': self.entries}, f, ensure_ascii=False)
+            os.replace(tmp_file, self.cache_file)
+            self._dirty = False
+        except OSError as e:
+            print(f"⚠️ 酒窖写入失败 (缓存未保存): {e}")
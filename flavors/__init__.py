@@ -1,74 +1,107 @@
-# Backend
-from .python_flavor import PythonAnalyzer
-from .cpp_flavor import CppAnalyzer
-from .go_flavor import GoAnalyzer
-from .java_flavor import JavaAnalyzer
-from .csharp_flavor import CsharpAnalyzer
+import importlib
+from types import MappingProxyType
 
-# Frontend
-from .frontend.vue_flavor import VueAnalyzer
-from .frontend.react_flavor import ReactAnalyzer
-from .frontend.web_basic import HtmlAnalyzer, CssAnalyzer, JsAnalyzer
-
-# 注册支持的语言和后缀
+# 注册支持的语言和后缀。
+# 分析器按需加载：这里只记录模块路径与类名，某种语言的模块 (及其依赖的 ast、tokenize、
+# 模块级正则等) 在第一次遇到对应后缀的文件时才会导入，只分析少量文件时启动更快。
 REGISTRY = {
     # --- Backend ---
     'python': {
         'extensions': ['.py'],
-        'class': PythonAnalyzer
+        'module': '.python_flavor',
+        'class': 'PythonAnalyzer'
     },
     'cpp': {
         'extensions': ['.cpp', '.cc', '.c', '.cxx', '.h', '.hpp'],
-        'class': CppAnalyzer
+        'module': '.cpp_flavor',
+        'class': 'CppAnalyzer'
     },
     'go': {
         'extensions': ['.go'],
-        'class': GoAnalyzer
+        'module': '.go_flavor',
+        'class': 'GoAnalyzer'
     },
     'java': {
         'extensions': ['.java'],
-        'class': JavaAnalyzer
+        'module': '.java_flavor',
+        'class': 'JavaAnalyzer'
     },
     'csharp': {
         'extensions': ['.cs'],
-        'class': CsharpAnalyzer
+        'module': '.csharp_flavor',
+        'class': 'CsharpAnalyzer'
     },
 
     # --- Frontend ---
     'vue': {
         'extensions': ['.vue'],
-        'class': VueAnalyzer
+        'module': '.frontend.vue_flavor',
+        'class': 'VueAnalyzer'
     },
     'react': {
         'extensions': ['.jsx', '.tsx'],
-        'class': ReactAnalyzer
+        'module': '.frontend.react_flavor',
+        'class': 'ReactAnalyzer'
     },
     'html': {
         'extensions': ['.html', '.htm'],
-        'class': HtmlAnalyzer
+        'module': '.frontend.web_basic',
+        'class': 'HtmlAnalyzer'
     },
     'css': {
         'extensions': ['.css', '.scss', '.less', '.sass'],
-        'class': CssAnalyzer
+        'module': '.frontend.web_basic',
+        'class': 'CssAnalyzer'
     },
     'javascript': {
         'extensions': ['.js', '.mjs', '.ts'],
-        'class': JsAnalyzer
+        'module': '.frontend.web_basic',
+        'class': 'JsAnalyzer'
     }
 }
 
+# 后缀 -> 语言 的只读索引，导入时构建一次 (不导入任何分析器模块)
+EXTENSION_INDEX = MappingProxyType({
+    ext: lang
+    for lang, config in REGISTRY.items()
+    for ext in config['extensions']
+})
+
+# 类名 -> 语言，供 `from flavors import PythonAnalyzer` 这类写法按需加载
+_CLASS_INDEX = {config['class']: lang for lang, config in REGISTRY.items()}
+
+# 分析器本身不保存跨文件的状态，每种语言在整个运行期间复用同一个实例
+_ANALYZER_INSTANCES = {}
+
+
+def load_analyzer_class(lang):
+    """导入并返回某种语言的分析器类 (模块只在第一次调用时导入)"""
+    config = REGISTRY[lang]
+    module = importlib.import_module(config['module'], __name__)
+    return getattr(module, config['class'])
+
+
 def get_analyzer_for_file(file_path, target_language=None):
     """
     根据文件后缀和用户指定的目标语言，返回对应的分析器实例。
     """
-    ext = file_path.suffix.lower()
+    lang = EXTENSION_INDEX.get(file_path.suffix.lower())
+    if lang is None:
+        return None
+
+    # 如果用户指定了语言，且当前文件的语言不匹配，则跳过
+    if target_language and lang != target_language:
+        return None
+
+    analyzer = _ANALYZER_INSTANCES.get(lang)
+    if analyzer is None:
+        analyzer = _ANALYZER_INSTANCES[lang] = load_analyzer_class(lang)()
+    return analyzer
+
 
-    for lang, config in REGISTRY.items():
-        # 如果用户指定了语言，且当前遍历到的语言不匹配，则跳过
-        if target_language and lang != target_language:
-            continue
-            
-        if ext in config['extensions']:
-            return config['class']()
-    
-    return None
\ No newline at end of file
+def __getattr__(name):
+    # PEP 562：兼容 `from flavors import CppAnalyzer`，访问时才导入对应模块
+    lang = _CLASS_INDEX.get(name)
+    if lang is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return load_analyzer_class(lang)
@@ -1,23 +1,138 @@
+import re
+import mmap
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
 from typing import List
+from .issues import Issue
+from .timing import phase
 
-@dataclass
+@dataclass(slots=True)
 class AnalysisResult:
     file_name: str
     language: str
     score: float
     rating: str  # S, A, B, C, D
-    issues: List[str] = field(default_factory=list)
+    # 问题以紧凑的 Issue 记录保存 (规则编号 + 参数)，展示文本在生成报告时渲染
+    issues: List[Issue] = field(default_factory=list)
+    # 相对项目根目录的路径 (POSIX 风格)，由分析流程填写
+    path: str = ""
+    # 因超时、超出大小上限等原因未被分析，不计入总分
+    skipped: bool = False
+    # 跨文件克隆检测使用的函数结构哈希: [[哈希, 函数名, 行号], ...] (见 flavors/clones.py)
+    clone_hashes: List[list] = field(default_factory=list)
+    # C 系语言近似重复检测使用的 MinHash 签名 (见 flavors/minhash.py)，为空表示未计算
+    minhash: str = ""
+
+    def to_dict(self) -> dict:
+        return {
+            'file_name': self.file_name,
+            'language': self.language,
+            'score': self.score,
+            'rating': self.rating,
+            'issues': [issue.to_list() for issue in self.issues],
+            'path': self.path,
+            'skipped': self.skipped,
+            'clone_hashes': self.clone_hashes,
+            'minhash': self.minhash,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "AnalysisResult":
+        data = dict(data)
+        data['issues'] = [Issue.from_list(issue) for issue in data.get('issues', [])]
+        return cls(**data)
+
+# 等级分界 (分数下限, 等级)：分析器的 rating 与报告中的等级共用这一张表
+GRADES = ((95, 'S'), (85, 'A'), (75, 'B'), (60, 'C'))
+
+
+def grade_of(score) -> str:
+    """分数对应的等级字母 (S/A/B/C/D)"""
+    for low, grade in GRADES:
+        if score >= low:
+            return grade
+    return 'D'
+
 
 class BaseAnalyzer(ABC):
+    # 评分规则版本号：修改某个分析器的规则后递增，只会让该语言的缓存失效
+    VERSION = 1
+
+    # 超大文件的流式分析配置 (字节级正则，直接作用于 mmap，不把文件解码成 str)
+    LANGUAGE = "Unknown"
+    LARGE_COMMENT_PATTERN = rb'^[ \t]*(?://|/\*|\*)'
+    LARGE_KEYWORD_PATTERN = rb'\b(?:if|for|while|switch|case|catch)\b'  # 为 None 时不统计逻辑密度
+    # 按块统计行数，块大小决定了额外占用的内存上限
+    LARGE_CHUNK_SIZE = 1 << 20
+
+    @classmethod
+    def version_stamp(cls) -> str:
+        return f"{cls.__name__}:{cls.VERSION}"
+
     @abstractmethod
-    def analyze(self, file_path) -> AnalysisResult:
+    def analyze(self, file_path, data=None) -> AnalysisResult:
+        """data: 预读取的文件字节 (见 analyzer 的预读阶段)，为 None 时由分析器自行读取"""
         pass
 
+    def read_text(self, file_path, data=None, errors='ignore', newline=None) -> str:
+        """
+        读取并解码源文件。已有预读取的字节时只做解码，结果与以文本模式打开文件一致：
+        newline=None 时按通用换行模式把 \\r\\n 与 \\r 统一为 \\n，newline='' 时保留原样。
+        """
+        if data is None:
+            with phase('read'), open(file_path, 'r', encoding='utf-8', errors=errors, newline=newline) as f:
+                return f.read()
+        with phase('decode'):
+            text = data.decode('utf-8', errors=errors)
+            if newline is None and '\r' in text:
+                text = text.replace('\r\n', '\n').replace('\r', '\n')
+            return text
+
+    def analyze_large(self, file_path, size) -> AnalysisResult:
+        """
+        超大文件的降级分析：通过 mmap 按字节扫描，只统计行数、注释行与关键字密度。
+        内存占用与文件大小无关，适用于几百 MB 的生成代码。
+        """
+        try:
+            with phase('stream'), open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                total_lines = 0
+                for start in range(0, len(mm), self.LARGE_CHUNK_SIZE):
+                    total_lines += mm[start:start + self.LARGE_CHUNK_SIZE].count(b'\n')
+                if len(mm) and mm[-1:] != b'\n':
+                    total_lines += 1
+                comment_regex = re.compile(self.LARGE_COMMENT_PATTERN, re.MULTILINE)
+                comment_lines = sum(1 for _ in comment_regex.finditer(mm))
+                keywords = 0
+                if self.LARGE_KEYWORD_PATTERN:
+                    keyword_regex = re.compile(self.LARGE_KEYWORD_PATTERN)
+                    keywords = sum(1 for _ in keyword_regex.finditer(mm))
+        except (OSError, ValueError) as e:
+            return AnalysisResult(file_path.name, self.LANGUAGE, 0, self.calculate_rating(0), [Issue('io.unreadable', error=str(e))])
+
+        size_mb = size / (1 << 20)
+        issues = [Issue('large.oversized', size_mb=size_mb)]
+        score = 100.0
+
+        ratio = comment_lines / total_lines if total_lines > 0 else 0
+        if ratio < 0.1:
+            score -= 10
+            issues.append(Issue('large.low_comment_ratio', ratio=ratio*100))
+
+        density = keywords / total_lines if total_lines > 0 else 0
+        if density > 0.2:
+            score -= 10
+            issues.append(Issue('large.logic_density', density=density))
+
+        final_score = max(0, min(100, score))
+        return AnalysisResult(
+            file_name=file_path.name,
+            language=self.LANGUAGE,
+            score=final_score,
+            rating=self.calculate_rating(final_score),
+            issues=issues
+        )
+
+    RATING_LABELS = {'S': "S (神品)", 'A': "A (珍藏)", 'B': "B (优良)", 'C': "C (餐酒)", 'D': "D (劣质)"}
+
     def calculate_rating(self, score):
-        if score >= 95: return "S (神品)"
-        if score >= 85: return "A (珍藏)"
-        if score >= 70: return "B (优良)"
-        if score >= 50: return "C (餐酒)"
-        return "D (劣质)"
\ No newline at end of file
+        return self.RATING_LABELS[grade_of(score)]
\ No newline at end of file
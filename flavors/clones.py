@@ -0,0 +1,95 @@
+from .minhash import signature_similarity
+
+# 近似重复检测的 LSH 参数：64 个签名分量分为 16 段、每段 4 个分量，
+# 相似度 0.8 的文件对至少有一段完全相同的概率超过 99.9%，相似度 0.3 的则不到 13%
+LSH_BANDS = 16
+# 候选对经完整签名确认的相似度阈值
+NEAR_DUPLICATE_THRESHOLD = 0.8
+# 每个分段桶最多参与比较的已有文件数
+LSH_BUCKET_PROBE = 32
+
+
+class CloneIndex:
+    """
+    项目级的跨文件克隆索引。
+    分析器在分析每个文件时记录其函数的规范化结构哈希 (AnalysisResult.clone_hashes)，
+    品鉴流程按遍历顺序把结果逐个加入索引；同一哈希出现在不同文件中即视为复制粘贴。
+    每个函数只保留一条 (路径, 函数名, 行号) 记录，内存随函数数量增长，与 AST 大小无关。
+    """
+
+    def __init__(self):
+        self._first = {}     # 结构哈希 -> 首次出现的 (路径, 函数名, 行号)
+        # (路径, 函数名, 行号, 原始路径, 原始函数名, 原始行号)，按发现顺序排列
+        self.findings = []
+
+    def add(self, result):
+        for digest, func, line in result.clone_hashes:
+            first = self._first.get(digest)
+            if first is None:
+                self._first[digest] = (result.path, func, line)
+            elif first[0] != result.path:
+                # 同一文件内的重复由分析器自身报告，这里只记录跨文件的
+                self.findings.append((result.path, func, line, *first))
+
+    @classmethod
+    def from_results(cls, results):
+        index = cls()
+        for result in results:
+            index.add(result)
+        return index
+
+
+class NearDuplicateIndex:
+    """
+    基于 MinHash 签名的近似重复文件索引 (局部敏感哈希分段)。
+    签名 (AnalysisResult.minhash) 被切成 LSH_BANDS 段，任意一段完全相同的文件才成为候选对，
+    再用完整签名估计相似度确认。每个文件只需查询自己的几个分段桶，
+    整体耗时随文件数近似线性增长，不必两两比较。
+    只比较同一语言的文件；每个文件最多报告一处 (与它最相似的先出现文件)。
+    """
+
+    def __init__(self):
+        self._buckets = {}     # 分段键 -> 文件编号 (多个文件时为列表)
+        self._entries = []     # 文件编号 -> (路径, 签名)
+        # (路径, 原始路径, 相似度)，按发现顺序排列
+        self.findings = []
+
+    def add(self, result):
+        signature = result.minhash
+        if not signature:
+            return
+        file_id = len(self._entries)
+        self._entries.append((result.path, signature))
+
+        width = len(signature) // LSH_BANDS
+        candidates = set()
+        for band in range(LSH_BANDS):
+            # 只保存分段内容的哈希值作为键，每个文件的索引开销与签名长度无关
+            key = hash((result.language, band, signature[band * width:(band + 1) * width]))
+            members = self._buckets.get(key)
+            if members is None:
+                self._buckets[key] = file_id
+                continue
+            if isinstance(members, int):
+                members = self._buckets[key] = [members]
+            # 大量样板文件落入同一个桶时只和最早的几个比较，避免退化为平方复杂度
+            candidates.update(members[:LSH_BUCKET_PROBE])
+            members.append(file_id)
+
+        best = None
+        for other in sorted(candidates):
+            orig_path, orig_signature = self._entries[other]
+            if orig_path == result.path:
+                continue
+            similarity = signature_similarity(signature, orig_signature)
+            if similarity >= NEAR_DUPLICATE_THRESHOLD and (best is None or similarity > best[1]):
+                best = (orig_path, similarity)
+        if best is not None:
+            self.findings.append((result.path, *best))
+
+    @classmethod
+    def from_results(cls, results):
+        index = cls()
+        for result in results:
+            index.add(result)
+        return index
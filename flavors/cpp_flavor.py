@@ -1,34 +1,43 @@
 import re
 from .base import BaseAnalyzer, AnalysisResult
+from .issues import Issue
+from .lexer import lex_source
+from .minhash import minhash_signature
+from .rules import Rule, RuleSet
+
+# C++ 规则表：导入时编译为一条交替正则，每个文件只扫描一遍
+RULES = RuleSet([
+    Rule('define', r'#define\s+'),
+    Rule('class_decl', r'class\s+([a-zA-Z0-9_]+)'),
+    Rule('keyword', r'\b(?:if|for|while|catch|case|\|\||&&)\b'),
+])
+
+# 简单的函数头检测正则
+FUNC_HEAD_PATTERN = re.compile(r'\b([a-zA-Z0-9_]+)\s*\([^;]*\)\s*\{')
 
 class CppAnalyzer(BaseAnalyzer):
-    def analyze(self, file_path) -> AnalysisResult:
+    # v3: 基于共享词法扫描器与规则表，字符串与注释中的括号、关键字和宏不再计入
+    # v4: 记录 MinHash 签名，用于跨文件近似重复检测
+    VERSION = 4
+    LANGUAGE = "C++"
+    LARGE_KEYWORD_PATTERN = rb'\b(?:if|for|while|catch|case)\b|\|\||&&'
+
+    def analyze(self, file_path, data=None) -> AnalysisResult:
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                lines = f.readlines()
-            content = "".join(lines)
+            content = self.read_text(file_path, data)
         except Exception as e:
-            return AnalysisResult(file_path.name, "C++", 0, "D", [f"无法读取: {str(e)}"])
+            return AnalysisResult(file_path.name, "C++", 0, self.calculate_rating(0), [Issue('io.unreadable', error=str(e))])
 
         issues = []
         score = 100.0
         
         #  1. 注释覆盖率 
-        # 简单正则去除 // 和 /* */
-        def remove_comments(text):
-            pattern = r"(\".*?\"|\'.*?\')|(/\*.*?\*/|//[^\r\n]*$)"
-            # group 1 是字符串，group 2 是注释
-            regex = re.compile(pattern, re.MULTILINE|re.DOTALL)
-            def _replacer(match):
-                if match.group(2) is not None:
-                    return "" # 删掉注释
-                else:
-                    return match.group(1) # 保留字符串
-            return regex.sub(_replacer, text)
-
-        clean_code = remove_comments(content)
-        clean_lines_count = len([l for l in clean_code.splitlines() if l.strip()])
-        total_lines_count = len(lines)
+        # 词法扫描一次，得到去注释代码、去字符串代码与花括号事件
+        lex = lex_source(content, 'cpp')
+        clean_code = lex.code
+        code_lines = clean_code.split('\n')
+        clean_lines_count = len([l for l in code_lines if l.strip()])
+        total_lines_count = lex.line_count
         
         # 估算注释行
         comment_lines_est = total_lines_count - clean_lines_count
@@ -36,18 +45,18 @@ class CppAnalyzer(BaseAnalyzer):
         
         if ratio < 0.1:
             score -= 10
-            issues.append(f"🍷 余味干涩: 注释率仅 {ratio*100:.1f}%")
+            issues.append(Issue('cpp.low_comment_ratio', ratio=ratio*100))
 
         #  2. 复杂度与嵌套分析
-        # 统计关键字
-        keywords = re.findall(r'\b(if|for|while|catch|case|\|\||&&)\b', clean_code)
-        complexity_points = len(keywords)
+        # 规则表扫描一遍，得到关键字、类声明与宏定义
+        hits = RULES.scan(lex.bare)
+        complexity_points = len(hits['keyword'])
         
         # 密度检测
         density = complexity_points / clean_lines_count if clean_lines_count > 0 else 0
         if density > 0.2: # 每5行就有1个逻辑跳转
              score -= 20
-             issues.append(f"🕸️ 整体结构纠结: 逻辑密度过高 ({density:.2f})")
+             issues.append(Issue('cpp.logic_density', density=density))
 
         #  3. 函数长度与嵌套
         brace_level = 0
@@ -55,22 +64,23 @@ class CppAnalyzer(BaseAnalyzer):
         func_start_line = 0
         current_func_lines = 0
         max_nesting = 0
-        
-        # 简单的函数头检测正则
-        func_head_pattern = re.compile(r'\b([a-zA-Z0-9_]+)\s*\([^;]*\)\s*\{')
 
-        for i, line in enumerate(lines):
-            stripped = line.strip()
-            # 忽略注释行
-            if stripped.startswith('//') or stripped.startswith('/*'): continue
+        # 花括号只统计代码部分，字符串和注释里的括号不会干扰层级
+        brace_opens, brace_closes = lex.brace_counts()
+
+        raw_lines = content.split('\n')
+
+        for i, line in enumerate(code_lines):
+            # 忽略纯注释行 (去掉注释后为空，但原文非空)
+            if not line.strip() and raw_lines[i].strip(): continue
             
             # 统计开闭括号
-            open_braces = stripped.count('{')
-            close_braces = stripped.count('}')
+            open_braces = brace_opens[i]
+            close_braces = brace_closes[i]
             
             # 检测是否进入函数 (在 Level 0 时发现 '{' 且看起来像函数)
             if brace_level == 0 and open_braces > 0:
-                match = func_head_pattern.search(line)
+                match = FUNC_HEAD_PATTERN.search(line)
                 if match:
                     in_function = True
                     func_start_line = i
@@ -97,28 +107,27 @@ class CppAnalyzer(BaseAnalyzer):
                 # 1. 长度
                 if current_func_lines > 120:
                     score -= 5
-                    issues.append(f"📏 极度臃肿: 函数 (约行{func_start_line}) 长度 {current_func_lines} 行")
+                    issues.append(Issue('cpp.function_too_long', line=func_start_line, lines=current_func_lines))
                 elif current_func_lines > 70:
                     score -= 2
-                    issues.append(f"📏 臃肿: 函数 (约行{func_start_line}) 长度 {current_func_lines} 行")
+                    issues.append(Issue('cpp.function_long', line=func_start_line, lines=current_func_lines))
                 
                 # 2. 嵌套
                 if max_nesting > 5:
                     score -= 3
-                    issues.append(f"🏗️ 嵌套过深: 函数 (约行{func_start_line}) 达到 {max_nesting} 层")
+                    issues.append(Issue('cpp.nesting_too_deep', line=func_start_line, depth=max_nesting))
 
         #  4. 命名规范 (类名) 
-        class_decls = re.findall(r'class\s+([a-zA-Z0-9_]+)', clean_code)
-        for c in class_decls:
+        for _, c in hits['class_decl']:
             if not c[0].isupper():
                 score -= 2
-                issues.append(f"🎨 类名缺乏威严: '{c}' 建议大写开头 (PascalCase)")
+                issues.append(Issue('cpp.class_case', name=c))
 
         #  5. 宏定义滥用检测 
-        macros = len(re.findall(r'#define\s+', content))
+        macros = len(hits['define'])
         if macros > 20:
              score -= 5
-             issues.append(f"⚠️ 预处理依赖: 宏定义过多 ({macros}个)，建议使用 const 或 inline")
+             issues.append(Issue('cpp.too_many_macros', count=macros))
 
         final_score = max(0, min(100, score))
         return AnalysisResult(
@@ -126,5 +135,6 @@ class CppAnalyzer(BaseAnalyzer):
             language="C++",
             score=final_score,
             rating=self.calculate_rating(final_score),
-            issues=issues
+            issues=issues,
+            minhash=minhash_signature(lex.bare)
         )
\ No newline at end of file
@@ -1,35 +1,50 @@
-import re
 from .base import BaseAnalyzer, AnalysisResult
+from .issues import Issue
+from .lexer import lex_source
+from .minhash import minhash_signature
+from .rules import Rule, RuleSet
+
+# C# 规则表：导入时编译为一条交替正则，每个文件只扫描一遍
+RULES = RuleSet([
+    Rule('region', r'#region'),
+    Rule('console_write', r'Console\.Write'),
+    Rule('lower_method', r'\b(?:public|private|protected|internal)\s+(?:static\s+)?(?:[\w<>[\]]+\s+)([a-z][a-zA-Z0-9_]*)\s*\('),
+    Rule('interface', r'\binterface\s+([a-zA-Z0-9_]+)'),
+])
 
 class CsharpAnalyzer(BaseAnalyzer):
-    def analyze(self, file_path) -> AnalysisResult:
+    # v3: 规则表单次扫描，字符串中的内容不再计入
+    # v4: 记录 MinHash 签名，用于跨文件近似重复检测
+    VERSION = 4
+    LANGUAGE = "C#"
+
+    def analyze(self, file_path, data=None) -> AnalysisResult:
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
+            content = self.read_text(file_path, data)
         except Exception as e:
-            return AnalysisResult(file_path.name, "C#", 0, "D", [f"读取失败: {str(e)}"])
+            return AnalysisResult(file_path.name, "C#", 0, self.calculate_rating(0), [Issue('io.read_failed', error=str(e))])
 
         issues = []
         score = 100.0
         lines = content.splitlines()
+        # 词法扫描一次得到去注释、去字符串 (含 @"..." 逐字字符串) 的代码，再用规则表扫描一遍
+        lex = lex_source(content, 'csharp')
+        hits = RULES.scan(lex.bare)
 
         #  1. 滥用 #region
-        regions = content.count("#region")
+        regions = len(hits['region'])
         if regions > 3:
             score -= 5
-            issues.append(f"🙈 视觉欺骗: 使用了 {regions} 个 #region，这通常是为了隐藏过长的代码")
+            issues.append(Issue('cs.region', count=regions))
 
         # 调试输出
-        if "Console.WriteLine" in content or "Console.Write" in content:
+        if hits['console_write']:
             score -= 5
-            issues.append(f"🗑️ 杂质残留: 包含 Console.Write 输出")
+            issues.append(Issue('cs.console_write'))
 
         #  2. 命名规范
-        method_pattern = re.compile(r'\b(?:public|private|protected|internal)\s+(?:static\s+)?(?:[\w<>[\]]+\s+)([a-z][a-zA-Z0-9_]*)\s*\(', re.MULTILINE)
-        
         bad_methods = []
-        for match in method_pattern.finditer(content):
-            name = match.group(1)
+        for _, name in hits['lower_method']:
             # 排除 main (有时候写成小写), 排除 set/get
             if name not in ['main'] and not name.startswith('set_') and not name.startswith('get_'):
                 bad_methods.append(name)
@@ -37,37 +52,33 @@ class CsharpAnalyzer(BaseAnalyzer):
         if bad_methods:
             score -= min(20, len(bad_methods) * 3)
             sample = ", ".join(bad_methods[:3])
-            issues.append(f"🎨 风格不纯: 方法 '{sample}...' 应当使用 PascalCase (大写开头)")
+            issues.append(Issue('cs.method_case', sample=sample))
 
         # 接口命名建议以 I 开头
-        interface_pattern = re.compile(r'\binterface\s+([a-zA-Z0-9_]+)')
-        for match in interface_pattern.finditer(content):
-            name = match.group(1)
+        for _, name in hits['interface']:
             if not name.startswith('I') or (len(name) > 1 and not name[1].isupper()):
                 score -= 2
-                issues.append(f"🏷️ 标签错误: 接口 '{name}' 建议以 'I' 开头 (如 IService)")
+                issues.append(Issue('cs.interface_prefix', name=name))
 
         #  3. 结构分析 
         # C# 的 Lambda 和 LINQ 可能会导致单行极长
         long_lines = [i+1 for i, l in enumerate(lines) if len(l) > 120]
         if len(long_lines) > 5:
             score -= 5
-            issues.append(f"📏 行宽溢出: {len(long_lines)} 行代码超过 120 字符 (建议换行)")
+            issues.append(Issue('cs.long_lines', count=len(long_lines)))
 
-        # 嵌套深度
+        # 嵌套深度 (按行结算，字符串和注释中的括号已被排除)
         max_nesting = 0
         depth = 0
-        for line in lines:
-            line = line.strip()
-            if line.startswith('//'): continue
-            
-            depth += line.count('{')
-            depth -= line.count('}')
+        brace_opens, brace_closes = lex.brace_counts()
+        for opens, closes in zip(brace_opens, brace_closes):
+            depth += opens
+            depth -= closes
             max_nesting = max(max_nesting, depth)
         
         if max_nesting > 6:
             score -= 10
-            issues.append(f"🏗️ 结构极深: 最大嵌套深度达 {max_nesting} 层 (建议提取方法)")
+            issues.append(Issue('cs.nesting_too_deep', depth=max_nesting))
 
         final_score = max(0, min(100, score))
         return AnalysisResult(
@@ -75,5 +86,6 @@ class CsharpAnalyzer(BaseAnalyzer):
             language="C#",
             score=final_score,
             rating=self.calculate_rating(final_score),
-            issues=issues
+            issues=issues,
+            minhash=minhash_signature(lex.bare)
         )
\ No newline at end of file
@@ -1,13 +1,32 @@
 import re
 from ..base import BaseAnalyzer, AnalysisResult
+from ..issues import Issue
+from ..rules import Rule, RuleSet
+
+# React 规则表：导入时编译为一条交替正则，每个文件只扫描一遍
+RULES = RuleSet([
+    Rule('class_attr', r'\bclass=["\']'),
+    Rule('inline_style', r'style=\{\{'),
+    Rule('any_type', r':\s*any\b'),
+])
+
+def _inside_tag(text, pos):
+    """pos 是否位于形如 <tag ... 的标签内部"""
+    start = text.rfind('<', 0, pos)
+    if start == -1 or text.rfind('>', start, pos) != -1:
+        return False
+    return re.match(r'<[a-zA-Z]+\s', text[start:pos + 1]) is not None
 
 class ReactAnalyzer(BaseAnalyzer):
-    def analyze(self, file_path) -> AnalysisResult:
+    # v2: 规则表单次扫描
+    VERSION = 2
+    LANGUAGE = "React"
+
+    def analyze(self, file_path, data=None) -> AnalysisResult:
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
+            content = self.read_text(file_path, data)
         except Exception as e:
-            return AnalysisResult(file_path.name, "React", 0, "D", [f"读取失败: {str(e)}"])
+            return AnalysisResult(file_path.name, "React", 0, self.calculate_rating(0), [Issue('io.read_failed', error=str(e))])
 
         issues = []
         score = 100.0
@@ -17,17 +36,19 @@ class ReactAnalyzer(BaseAnalyzer):
         # 简单的正则，排除注释
         clean_code = re.sub(r'{/\*.*?\*/}', '', content, flags=re.DOTALL) # 去除 JSX 注释
         
+        hits = RULES.scan(clean_code)
+
         # 查找 <div class="... (在 JSX 中是错误的)
-        if re.search(r'<[a-zA-Z]+\s+[^>]*\bclass=["\']', clean_code):
+        if any(_inside_tag(clean_code, pos) for pos, _ in hits['class_attr']):
             score -= 10
-            issues.append(f"🏷️ 标签贴错: 在 JSX 中使用了 'class' 而非 'className'")
+            issues.append(Issue('react.class_attr'))
 
         # --- 2. 样式风味 ---
         # 检查内联样式 style={{ color: 'red' }}
-        inline_styles = len(re.findall(r'style=\{\{', clean_code))
+        inline_styles = len(hits['inline_style'])
         if inline_styles > 3:
             score -= 5
-            issues.append(f"🎨 调味不匀: 发现 {inline_styles} 处内联样式 (style={{...}})，建议使用 CSS 类")
+            issues.append(Issue('react.inline_style', count=inline_styles))
 
         # --- 3. Hooks 使用 ---
         # useEffect 依赖项缺失
@@ -46,10 +67,10 @@ class ReactAnalyzer(BaseAnalyzer):
         # 检查 render 函数或 return JSX 的长度
         if file_path.suffix == '.tsx':
             # TypeScript 特有检查: any 滥用
-            any_count = len(re.findall(r':\s*any\b', clean_code))
+            any_count = len(hits['any_type'])
             if any_count > 3:
                 score -= 10
-                issues.append(f"🗑️ 食材不明: 滥用 'any' 类型 ({any_count}次)，丧失了 TS 的严谨口感")
+                issues.append(Issue('react.any_type', count=any_count))
 
         final_score = max(0, min(100, score))
         return AnalysisResult(
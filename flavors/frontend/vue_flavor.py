@@ -1,37 +1,66 @@
 import re
 from ..base import BaseAnalyzer, AnalysisResult
+from ..issues import Issue
+from ..rules import Rule, RuleSet
+
+# Vue 规则表：导入时编译为一条交替正则，每个文件只扫描一遍
+RULES = RuleSet([
+    Rule('script_setup', r'<script setup'),
+    Rule('options_api', r'defineComponent|export default \{'),
+    Rule('v_if', r'v-if='),
+    Rule('v_for', r'v-for='),
+    Rule('style_tag', r'<style'),
+    Rule('scoped', r'scoped'),
+    Rule('define_props', r'defineProps'),
+    Rule('props_option', r'props:'),
+])
+
+TEMPLATE_PATTERN = re.compile(r'<template>(.*?)</template>', re.DOTALL)
+
+def _hit_lines(text, hits):
+    """把命中偏移换算成行号 (从 1 开始)"""
+    lines, line, counted = [], 1, 0
+    for pos, _ in hits:
+        line += text.count('\n', counted, pos)
+        counted = pos
+        lines.append(line)
+    return lines
 
 class VueAnalyzer(BaseAnalyzer):
-    def analyze(self, file_path) -> AnalysisResult:
+    # v2: 规则表单次扫描
+    VERSION = 2
+    LANGUAGE = "Vue"
+    LARGE_COMMENT_PATTERN = rb'^[ \t]*(?://|/\*|<!--)'
+
+    def analyze(self, file_path, data=None) -> AnalysisResult:
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
+            content = self.read_text(file_path, data)
         except Exception as e:
-            return AnalysisResult(file_path.name, "Vue", 0, "D", [f"无法展开画卷: {str(e)}"])
+            return AnalysisResult(file_path.name, "Vue", 0, self.calculate_rating(0), [Issue('vue.read_failed', error=str(e))])
 
         issues = []
         score = 100.0
+        hits = RULES.scan(content)
         
         # --- 1. 架构风格 (Composition API vs Options API) ---
-        if '<script setup' in content:
+        if hits['script_setup']:
             # 现代风味，加分项（不扣分）
             pass
-        elif 'defineComponent' in content or 'export default {' in content:
+        elif hits['options_api']:
             # 传统风味，如果混用过多 Options API 可能会扣分
             pass
         
         # --- 2. 模板反模式 (Bad Patterns) ---
         # v-if 和 v-for 同时出现 (Vue 性能杀手)
         # 简单正则：同一行里同时包含 v-if 和 v-for
-        lines = content.splitlines()
-        for i, line in enumerate(lines):
-            if 'v-if=' in line and 'v-for=' in line:
-                score -= 10
-                issues.append(f"⚔️ 冲突的口感: 第 {i+1} 行同时使用了 v-if 和 v-for (性能大忌)")
+        conflict_lines = set(_hit_lines(content, hits['v_if'])) & set(_hit_lines(content, hits['v_for']))
+        for line_no in sorted(conflict_lines):
+            score -= 10
+            issues.append(Issue('vue.if_with_for', line=line_no))
 
         # --- 3. 模板深度 ---
         # 统计 template 标签内的缩进深度
-        template_match = re.search(r'<template>(.*?)</template>', content, re.DOTALL)
+        template_match = TEMPLATE_PATTERN.search(content)
         if template_match:
             template_content = template_match.group(1)
             max_indent = 0
@@ -43,17 +72,17 @@ class VueAnalyzer(BaseAnalyzer):
             # 假设2空格或4空格缩进，超过 40 字符的缩进通常意味着 10-20 层
             if max_indent > 40:
                 score -= 5
-                issues.append(f"🏗️ 摆盘过于繁复: Template 嵌套深度过高 (DOM 树过深)")
+                issues.append(Issue('vue.template_too_deep'))
 
         # --- 4. 样式污染 ---
         # 检查是否使用了 scoped
-        if '<style' in content and 'scoped' not in content:
+        if hits['style_tag'] and not hits['scoped']:
             score -= 5
-            issues.append(f"🎨 味道串味: Style 标签未使用 'scoped'，可能污染全局样式")
+            issues.append(Issue('vue.unscoped_style'))
 
         # --- 5. Props 传递 ---
         # 检查是否透传过多 props (简单的 heuristic)
-        if len(re.findall(r'defineProps', content)) == 0 and 'props:' in content:
+        if not hits['define_props'] and hits['props_option']:
              # Options API props 检查，如果 props 列表过长
              pass 
 
@@ -1,80 +1,127 @@
-import re
 from ..base import BaseAnalyzer, AnalysisResult
+from ..issues import Issue
+from ..lexer import lex_source
+from ..minhash import minhash_signature
+from ..rules import Rule, RuleSet
+
+# 各语言规则表：导入时编译为一条交替正则，每个文件只扫描一遍
+HTML_RULES = RuleSet([
+    Rule('div', r'<div'),
+    Rule('semantic', r'<(?:header|footer|main|article|section)'),
+    Rule('inline_style', r'style="'),
+])
+
+CSS_RULES = RuleSet([
+    Rule('important', r'!important'),
+    Rule('open_brace', r'\{'),
+])
+
+JS_RULES = RuleSet([
+    Rule('var', r'\bvar\s+'),
+    Rule('console_log', r'console\.log'),
+])
 
 class HtmlAnalyzer(BaseAnalyzer):
-    def analyze(self, file_path) -> AnalysisResult:
+    # v2: 规则表单次扫描
+    VERSION = 2
+    LANGUAGE = "HTML"
+    LARGE_COMMENT_PATTERN = rb'^[ \t]*<!--'
+    LARGE_KEYWORD_PATTERN = None
+
+    def analyze(self, file_path, data=None) -> AnalysisResult:
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-        except: return AnalysisResult(file_path.name, "HTML", 0, "D", ["读取失败"])
+            content = self.read_text(file_path, data)
+        except: return AnalysisResult(file_path.name, "HTML", 0, self.calculate_rating(0), [Issue('web.read_failed')])
 
         issues = []
         score = 100.0
 
+        hits = HTML_RULES.scan(content)
+
         # 1. 语义化标签 (Div Soup 检测)
-        div_count = content.count('<div')
-        semantic_count = sum(content.count(tag) for tag in ['<header', '<footer', '<main', '<article', '<section'])
+        div_count = len(hits['div'])
+        semantic_count = len(hits['semantic'])
         
         if div_count > 20 and semantic_count == 0:
             score -= 10
-            issues.append(f"🍲 只有汤底: 代码充满了 <div>，缺乏语义化标签 (Header/Main/Footer)")
+            issues.append(Issue('html.div_soup'))
 
         # 2. 内联样式
-        if 'style="' in content:
-            count = content.count('style="')
+        if hits['inline_style']:
+            count = len(hits['inline_style'])
             score -= 5 * min(count, 4)
-            issues.append(f"🎨 乱涂乱画: 发现 {count} 处内联 style 属性")
+            issues.append(Issue('html.inline_style', count=count))
 
         return AnalysisResult(file_path.name, "HTML", max(0, score), self.calculate_rating(score), issues)
 
 
 class CssAnalyzer(BaseAnalyzer):
-    def analyze(self, file_path) -> AnalysisResult:
+    # v2: 规则表单次扫描，选择器切分不再依赖可回溯的正则
+    VERSION = 2
+    LANGUAGE = "CSS"
+    LARGE_COMMENT_PATTERN = rb'^[ \t]*/\*'
+    LARGE_KEYWORD_PATTERN = None
+
+    def analyze(self, file_path, data=None) -> AnalysisResult:
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-        except: return AnalysisResult(file_path.name, "CSS", 0, "D", ["读取失败"])
+            content = self.read_text(file_path, data)
+        except: return AnalysisResult(file_path.name, "CSS", 0, self.calculate_rating(0), [Issue('web.read_failed')])
 
         issues = []
         score = 100.0
 
+        hits = CSS_RULES.scan(content)
+
         # 1. !important 滥用
-        importants = content.count('!important')
+        importants = len(hits['important'])
         if importants > 2:
             score -= 5 * importants
-            issues.append(f"🌶️ 口感过重: 滥用 !important ({importants}次)，破坏了层叠规则")
+            issues.append(Issue('css.important', count=importants))
 
         # 2. 嵌套过深 (针对 SCSS 或 LESS)
-        selectors = re.findall(r'([^{]+)\{', content)
-        for sel in selectors:
+        # 每个 '{' 之前、上一个 '{' 之后的文本即为一个选择器片段
+        prev = -1
+        for pos, _ in hits['open_brace']:
+            sel = content[prev + 1:pos]
+            prev = pos
+            if not sel:
+                continue
             if len(sel.split()) > 5:
                 score -= 2
-                issues.append(f"🕸️ 选择器过于纠结: '{sel.strip()[:30]}...'")
+                issues.append(Issue('css.tangled_selector', selector=sel.strip()[:30]))
                 break
 
         return AnalysisResult(file_path.name, "CSS", max(0, score), self.calculate_rating(score), issues)
 
 
 class JsAnalyzer(BaseAnalyzer):
-    def analyze(self, file_path) -> AnalysisResult:
+    # v3: 基于共享词法扫描器与规则表，注释与字符串中的 var / console.log 不再计入
+    # v4: 记录 MinHash 签名，用于跨文件近似重复检测
+    VERSION = 4
+    LANGUAGE = "JavaScript"
+
+    def analyze(self, file_path, data=None) -> AnalysisResult:
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-        except: return AnalysisResult(file_path.name, "JS", 0, "D", ["读取失败"])
+            content = self.read_text(file_path, data)
+        except: return AnalysisResult(file_path.name, "JS", 0, self.calculate_rating(0), [Issue('web.read_failed')])
 
         issues = []
         score = 100.0
 
+        # 词法扫描一次得到去注释、去字符串的代码，再用规则表扫描一遍
+        lex = lex_source(content, 'js')
+        hits = JS_RULES.scan(lex.bare)
+
         # 1. 变量声明 (var vs let/const)
-        var_count = len(re.findall(r'\bvar\s+', content))
+        var_count = len(hits['var'])
         if var_count > 0:
             score -= 5 * min(var_count, 5)
-            issues.append(f"🕰️ 陈旧风味: 发现了 {var_count} 处 'var' 声明，建议使用 let/const")
+            issues.append(Issue('js.var', count=var_count))
 
         # 2. Console.log
-        if 'console.log' in content:
+        if hits['console_log']:
             score -= 5
-            issues.append(f"🗑️ 调试残留: 代码中包含 console.log")
+            issues.append(Issue('js.console_log'))
 
         # 3. 回调地狱 (简单的缩进检测)
         lines = content.splitlines()
@@ -85,6 +132,7 @@ class JsAnalyzer(BaseAnalyzer):
         
         if max_indent > 40: # 假设4空格，10层
             score -= 15
-            issues.append(f"🌀 回调漩涡: 缩进过深，疑似回调地狱")
+            issues.append(Issue('js.callback_hell'))
 
-        return AnalysisResult(file_path.name, "JavaScript", max(0, score), self.calculate_rating(score), issues)
\ No newline at end of file
+        return AnalysisResult(file_path.name, "JavaScript", max(0, score), self.calculate_rating(score), issues,
+                              minhash=minhash_signature(lex.bare))
\ No newline at end of file
@@ -1,74 +1,91 @@
 import re
 from .base import BaseAnalyzer, AnalysisResult
+from .issues import Issue
+from .lexer import lex_source
+from .minhash import minhash_signature
+from .rules import Rule, RuleSet
+
+# Go 规则表：导入时编译为一条交替正则，每个文件只扫描一遍
+RULES = RuleSet([
+    # 导出函数声明必须位于行首，且不跨行
+    Rule('exported_func', r'^func[^\S\n]+(?:\([^)\n]+\)[^\S\n]+)?([A-Z][a-zA-Z0-9_]*)'),
+    Rule('empty_interface', r'interface\{\}'),
+    Rule('snake_var', r'\bvar\s+([a-z]+_[a-z]+)\s+'),
+    Rule('keyword', r'\b(?:if|for|switch|select|case|\|\||&&)\b'),
+], re.MULTILINE)
 
 class GoAnalyzer(BaseAnalyzer):
-    def analyze(self, file_path) -> AnalysisResult:
+    # v3: 规则表单次扫描
+    # v4: 记录 MinHash 签名，用于跨文件近似重复检测
+    VERSION = 4
+    LANGUAGE = "Go"
+    LARGE_KEYWORD_PATTERN = rb'\b(?:if|for|switch|select|case)\b|\|\||&&'
+
+    def analyze(self, file_path, data=None) -> AnalysisResult:
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
+            content = self.read_text(file_path, data)
         except Exception as e:
-            return AnalysisResult(file_path.name, "Go", 0, "D", [f"无法开启瓶塞: {str(e)}"])
+            return AnalysisResult(file_path.name, "Go", 0, self.calculate_rating(0), [Issue('go.read_failed', error=str(e))])
 
         issues = []
         score = 100.0
         lines = content.splitlines()
 
         #  1. 注释覆盖率
-        # 简单去除字符串干扰，统计 // 和 /*
-        clean_code = re.sub(r'(".*?"|`.*?`)', '', content, flags=re.DOTALL)
-        comment_matches = re.findall(r'(//[^\n]*|/\*.*?\*/)', content, flags=re.DOTALL)
+        # 词法扫描一次，区分代码 / 注释 / 字符串 (含反引号原始字符串)
+        lex = lex_source(content, 'go')
+        hits = RULES.scan(lex.bare)
         
         # 估算注释行数
-        comment_lines = sum(len(m.splitlines()) for m in comment_matches)
+        comment_lines = lex.comment_lines
         total_lines = len(lines)
         ratio = comment_lines / total_lines if total_lines > 0 else 0
         
         if ratio < 0.1:
             score -= 10
-            issues.append(f"🍷 缺乏陈酿说明: 注释率仅 {ratio*100:.1f}% (Go 标准建议 > 15%)")
+            issues.append(Issue('go.low_comment_ratio', ratio=ratio*100))
 
         #  2. 导出函数文档检查
-        func_pattern = re.compile(r'^func\s+(?:\([^)]+\)\s+)?([A-Z][a-zA-Z0-9_]*)', re.MULTILINE)
-        
-        for i, line in enumerate(lines):
-            match = func_pattern.search(line)
-            if match:
-                func_name = match.group(1)
-                # 检查上一行是否有注释
-                if i > 0 and not lines[i-1].strip().startswith('//'):
-                    score -= 2
-                    issues.append(f"📝 标签缺失: 导出函数 '{func_name}' 缺少文档注释")
+        raw_lines = content.split('\n')
+        i, counted = 0, 0
+        for start, func_name in hits['exported_func']:
+            # 由匹配偏移推算行号 (增量计数，整体只扫描一遍)
+            i += lex.bare.count('\n', counted, start)
+            counted = start
+            # 检查上一行是否有注释
+            if i > 0 and not raw_lines[i-1].strip().startswith('//'):
+                score -= 2
+                issues.append(Issue('go.undocumented_export', func=func_name))
 
         #  3. 复杂度分析 (if err != nil, switch, for) 
-        keywords = re.findall(r'\b(if|for|switch|select|case|\|\||&&)\b', clean_code)
-        complexity = len(keywords)
+        complexity = len(hits['keyword'])
         density = complexity / total_lines if total_lines > 0 else 0
         
         if density > 0.25:
              score -= 15
-             issues.append(f"🕸️ 逻辑纠结: 控制流密度过高 ({density:.2f})")
+             issues.append(Issue('go.control_flow_density', density=density))
 
         #  4. 命名规范
         # 检查是否有 interface{} 滥用 (Empty Interface)
-        empty_interfaces = len(re.findall(r'interface\{\}', clean_code))
+        empty_interfaces = len(hits['empty_interface'])
         if empty_interfaces > 5:
             score -= 5
-            issues.append(f"⚠️ 类型模糊: 过度使用 interface{{}} ({empty_interfaces}处)，建议定义具体接口")
+            issues.append(Issue('go.empty_interface', count=empty_interfaces))
 
         # 检查蛇形命名
-        snake_vars = re.findall(r'\bvar\s+([a-z]+_[a-z]+)\s+', clean_code)
-        for v in snake_vars:
+        for _, v in hits['snake_var']:
             score -= 2
-            issues.append(f"🎨 色泽偏差: 变量 '{v}' 使用了蛇形命名，Go 推荐 CamelCase")
+            issues.append(Issue('go.snake_var', name=v))
 
         #  5. 函数长度 
-        # 简单括号计数法
+        # 括号计数法 (字符串和注释中的括号已被排除)
+        brace_opens, brace_closes = lex.brace_counts()
         current_len = 0
         brace_balance = 0
         in_func = False
         start_line = 0
 
-        for i, line in enumerate(lines):
+        for i, line in enumerate(content.split('\n')):
             if line.startswith('func '):
                 in_func = True
                 start_line = i
@@ -77,13 +94,13 @@ class GoAnalyzer(BaseAnalyzer):
             
             if in_func:
                 current_len += 1
-                brace_balance += line.count('{') - line.count('}')
+                brace_balance += brace_opens[i] - brace_closes[i]
                 
                 if brace_balance == 0 and current_len > 1: # 函数结束
                     in_func = False
                     if current_len > 80: # Go 代码通常较短
                         score -= 5
-                        issues.append(f"📏 酒体过重: 函数 (行{start_line+1}) 长度 {current_len} 行")
+                        issues.append(Issue('go.function_long', line=start_line+1, lines=current_len))
 
         final_score = max(0, min(100, score))
         return AnalysisResult(
@@ -91,5 +108,6 @@ class GoAnalyzer(BaseAnalyzer):
             language="Go",
             score=final_score,
             rating=self.calculate_rating(final_score),
-            issues=issues
+            issues=issues,
+            minhash=minhash_signature(lex.bare)
         )
\ No newline at end of file
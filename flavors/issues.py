@@ -0,0 +1,169 @@
+import sys
+from string import Formatter
+
+# 问题分类：报告按分类选择图标，不再对问题文本做关键字匹配
+COMPLEXITY = 'complexity'
+NAMING = 'naming'
+COMMENT = 'comment'
+LENGTH = 'length'
+DUPLICATION = 'duplication'
+STRUCTURE = 'structure'
+ERROR_HANDLING = 'error_handling'
+OTHER = 'other'
+
+
+class IssueType:
+    """一类问题的定义：规则编号、分类与展示模板 (模板中的字段即该问题携带的参数)"""
+    __slots__ = ('code', 'category', 'template', 'fields')
+
+    def __init__(self, code, category, template):
+        self.code = sys.intern(code)
+        self.category = category
+        self.template = template
+        self.fields = tuple(name for _, name, _, _ in Formatter().parse(template) if name)
+
+
+# 规则编号 -> IssueType。所有语言集中登记，读取缓存时无需导入对应的分析器模块。
+ISSUE_TYPES = {}
+
+
+def _define(code, category, template):
+    ISSUE_TYPES[code] = IssueType(code, category, template)
+
+
+# 通用
+_define('io.read_failed', OTHER, "读取失败: {error}")
+_define('io.unreadable', OTHER, "无法读取: {error}")
+_define('large.oversized', OTHER, "📦 巨型酒桶: 文件大小 {size_mb:.1f} MB，超过阈值，仅进行了流式的部分指标分析")
+_define('large.low_comment_ratio', COMMENT, "🍷 余味不足: 注释率仅 {ratio:.1f}%")
+_define('large.logic_density', COMPLEXITY, "🕸️ 结构纠结: 逻辑密度过高 ({density:.2f})")
+
+# Python
+_define('py.low_comment_ratio', COMMENT, "🍷 余味不足: 注释率仅为 {ratio:.1f}% (建议 > 10%)")
+_define('py.syntax_error', ERROR_HANDLING, "❌ 语法错误: {error}")
+_define('py.function_too_long', LENGTH, "📏 酒体过重: 函数 '{func}' 长达 {lines} 行 (建议拆分)")
+_define('py.function_long', LENGTH, "📏 酒体略重: 函数 '{func}' 长度 {lines} 行")
+_define('py.too_many_args', OTHER, "⚖️ 成分复杂: 函数 '{func}' 参数过多 ({count}个)")
+_define('py.function_case', NAMING, "🎨 色泽偏差: 函数 '{func}' 建议使用 snake_case")
+_define('py.complexity_very_high', COMPLEXITY, "🕸️ 结构极其纠结: 函数 '{func}' 复杂度 {complexity}")
+_define('py.complexity_high', COMPLEXITY, "🕸️ 结构纠结: 函数 '{func}' 复杂度 {complexity}")
+_define('py.nesting_too_deep', STRUCTURE, "🏗️ 嵌套过深: 函数 '{func}' 深度 {depth} 层")
+_define('py.duplicate_logic', COMPLEXITY, "👯‍♀️ 疑似复制粘贴: {funcs} 逻辑结构完全一致")
+_define('py.class_case', NAMING, "🎨 类名色泽不佳: '{name}' 建议使用 PascalCase")
+_define('py.silent_except', ERROR_HANDLING, "🙈 掩耳盗铃: 第 {line} 行捕获了异常却未处理")
+
+# C++
+_define('cpp.low_comment_ratio', COMMENT, "🍷 余味干涩: 注释率仅 {ratio:.1f}%")
+_define('cpp.logic_density', COMPLEXITY, "🕸️ 整体结构纠结: 逻辑密度过高 ({density:.2f})")
+_define('cpp.function_too_long', LENGTH, "📏 极度臃肿: 函数 (约行{line}) 长度 {lines} 行")
+_define('cpp.function_long', LENGTH, "📏 臃肿: 函数 (约行{line}) 长度 {lines} 行")
+_define('cpp.nesting_too_deep', STRUCTURE, "🏗️ 嵌套过深: 函数 (约行{line}) 达到 {depth} 层")
+_define('cpp.class_case', NAMING, "🎨 类名缺乏威严: '{name}' 建议大写开头 (PascalCase)")
+_define('cpp.too_many_macros', OTHER, "⚠️ 预处理依赖: 宏定义过多 ({count}个)，建议使用 const 或 inline")
+
+# Go
+_define('go.read_failed', OTHER, "无法开启瓶塞: {error}")
+_define('go.low_comment_ratio', COMMENT, "🍷 缺乏陈酿说明: 注释率仅 {ratio:.1f}% (Go 标准建议 > 15%)")
+_define('go.undocumented_export', COMMENT, "📝 标签缺失: 导出函数 '{func}' 缺少文档注释")
+_define('go.control_flow_density', COMPLEXITY, "🕸️ 逻辑纠结: 控制流密度过高 ({density:.2f})")
+_define('go.empty_interface', OTHER, "⚠️ 类型模糊: 过度使用 interface{{}} ({count}处)，建议定义具体接口")
+_define('go.snake_var', NAMING, "🎨 色泽偏差: 变量 '{name}' 使用了蛇形命名，Go 推荐 CamelCase")
+_define('go.function_long', LENGTH, "📏 酒体过重: 函数 (行{line}) 长度 {lines} 行")
+
+# Java
+_define('java.println', OTHER, "🗑️ 杂质残留: 发现 {count} 处 System.out.println，建议使用日志框架")
+_define('java.catch_all', ERROR_HANDLING, "🛡️ 掩耳盗铃: 发现 {count} 处捕获所有 Exception，建议捕获具体异常")
+_define('java.print_stack_trace', OTHER, "⚠️ 处理粗糙: 使用了 printStackTrace()，生产环境会导致日志混乱")
+_define('java.class_case', NAMING, "🎨 类名色泽黯淡: '{name}' 必须使用 PascalCase (大写开头)")
+_define('java.constant_case', NAMING, "🎨 常量命名不当: '{name}' 建议使用 UPPER_SNAKE_CASE")
+_define('java.complexity_density', COMPLEXITY, "🕸️ 结构纠结: 代码复杂度密度高 ({density:.2f})")
+_define('java.file_too_long', OTHER, "📏 瓶身过大: 文件包含 {lines} 行，违背了单一职责原则")
+
+# C#
+_define('cs.region', LENGTH, "🙈 视觉欺骗: 使用了 {count} 个 #region，这通常是为了隐藏过长的代码")
+_define('cs.console_write', OTHER, "🗑️ 杂质残留: 包含 Console.Write 输出")
+_define('cs.method_case', NAMING, "🎨 风格不纯: 方法 '{sample}...' 应当使用 PascalCase (大写开头)")
+_define('cs.interface_prefix', ERROR_HANDLING, "🏷️ 标签错误: 接口 '{name}' 建议以 'I' 开头 (如 IService)")
+_define('cs.long_lines', OTHER, "📏 行宽溢出: {count} 行代码超过 120 字符 (建议换行)")
+_define('cs.nesting_too_deep', STRUCTURE, "🏗️ 结构极深: 最大嵌套深度达 {depth} 层 (建议提取方法)")
+
+# 前端
+_define('web.read_failed', OTHER, "读取失败")
+_define('react.class_attr', OTHER, "🏷️ 标签贴错: 在 JSX 中使用了 'class' 而非 'className'")
+_define('react.inline_style', OTHER, "🎨 调味不匀: 发现 {count} 处内联样式 (style={{...}})，建议使用 CSS 类")
+_define('react.any_type', OTHER, "🗑️ 食材不明: 滥用 'any' 类型 ({count}次)，丧失了 TS 的严谨口感")
+_define('vue.read_failed', OTHER, "无法展开画卷: {error}")
+_define('vue.if_with_for', OTHER, "⚔️ 冲突的口感: 第 {line} 行同时使用了 v-if 和 v-for (性能大忌)")
+_define('vue.template_too_deep', STRUCTURE, "🏗️ 摆盘过于繁复: Template 嵌套深度过高 (DOM 树过深)")
+_define('vue.unscoped_style', OTHER, "🎨 味道串味: Style 标签未使用 'scoped'，可能污染全局样式")
+_define('html.div_soup', OTHER, "🍲 只有汤底: 代码充满了 <div>，缺乏语义化标签 (Header/Main/Footer)")
+_define('html.inline_style', OTHER, "🎨 乱涂乱画: 发现 {count} 处内联 style 属性")
+_define('css.important', OTHER, "🌶️ 口感过重: 滥用 !important ({count}次)，破坏了层叠规则")
+_define('css.tangled_selector', COMPLEXITY, "🕸️ 选择器过于纠结: '{selector}...'")
+_define('js.var', OTHER, "🕰️ 陈旧风味: 发现了 {count} 处 'var' 声明，建议使用 let/const")
+_define('js.console_log', OTHER, "🗑️ 调试残留: 代码中包含 console.log")
+_define('js.callback_hell', STRUCTURE, "🌀 回调漩涡: 缩进过深，疑似回调地狱")
+
+# 看门狗 (跳过的文件)
+_define('watchdog.timeout', OTHER, "⏱️ 发酵超时: 分析超过 {seconds:g} 秒仍未完成，已跳过该文件")
+# 同时给出字节数：两者以 MB 取整后可能相同 (例如 0.1 MB 超过上限 0.1 MB)
+_define('watchdog.too_large', OTHER, "📦 超出酒窖容量: 文件大小 {size_mb:.1f} MB ({size} 字节) 超过上限 {limit_mb:g} MB ({limit} 字节)，已跳过该文件")
+_define('watchdog.crashed', OTHER, "💥 酒桶破裂: 分析进程异常退出 ({reason})，已跳过该文件")
+
+# 项目结构
+_define('structure.root_unreadable', OTHER, "无法访问根目录: {error}")
+_define('structure.no_readme', OTHER, "📜 门面缺失: 缺少 README.md，就像一家没有招牌的餐厅")
+_define('structure.no_gitignore', OTHER, "🗑️ 垃圾混入: 缺少 .gitignore，容易上传临时文件")
+_define('structure.root_clutter', OTHER, "📦 仓库杂乱: 根目录下堆积了 {count} 个文件，建议归档到子目录 (src, docs, lib)")
+_define('structure.root_crowded', OTHER, "📦 略显拥挤: 根目录下文件较多，建议整理")
+_define('structure.space_in_name', NAMING, "🏷️ 命名禁忌: '{name}' 包含空格，可能导致脚本错误")
+_define('structure.space_names', NAMING, "🏷️ 命名不规范: 发现 {count} 个文件名包含空格")
+_define('structure.mixed_case', NAMING, "🎨 风格分裂: 混用了 snake_case ({snake}) 和 kebab-case ({kebab}) 命名")
+_define('structure.cross_file_clone', DUPLICATION, "👯‍♀️ 跨文件复制粘贴: {path} 中的函数 '{func}' (行{line}) 与 {orig_path} 中的 '{orig_func}' (行{orig_line}) 逻辑结构完全一致")
+_define('structure.cross_file_clones', DUPLICATION, "👯‍♀️ 重复酿造: 共发现 {count} 个函数是其他文件中函数的复制粘贴，建议提取为公共模块")
+_define('structure.near_duplicate', DUPLICATION, "👯 近似重复: {path} 与 {orig_path} 的代码相似度约 {similarity:.0%}")
+_define('structure.near_duplicates', DUPLICATION, "👯 勾兑痕迹: 共发现 {count} 个文件与其他文件高度相似，疑似整体复制后小幅修改")
+
+
+class Issue:
+    """
+    单个问题的紧凑记录：规则编号 (驻留字符串) + 参数元组。
+    展示文本只在生成报告时按模板渲染。
+    """
+    __slots__ = ('code', 'params')
+
+    def __init__(self, code, **params):
+        issue_type = ISSUE_TYPES[code]
+        self.code = issue_type.code
+        self.params = tuple(params[name] for name in issue_type.fields)
+
+    @property
+    def category(self) -> str:
+        return ISSUE_TYPES[self.code].category
+
+    @property
+    def message(self) -> str:
+        issue_type = ISSUE_TYPES[self.code]
+        return issue_type.template.format(**dict(zip(issue_type.fields, self.params)))
+
+    def __str__(self):
+        return self.message
+
+    def __repr__(self):
+        return f"Issue({self.code!r}, {self.params!r})"
+
+    def __eq__(self, other):
+        return isinstance(other, Issue) and self.code == other.code and self.params == other.params
+
+    def __hash__(self):
+        return hash((self.code, self.params))
+
+    def to_list(self) -> list:
+        return [self.code, *self.params]
+
+    @classmethod
+    def from_list(cls, data: list) -> "Issue":
+        issue = cls.__new__(cls)
+        issue.code = ISSUE_TYPES[data[0]].code
+        issue.params = tuple(data[1:])
+        return issue
@@ -1,62 +1,77 @@
-import re
 from .base import BaseAnalyzer, AnalysisResult
+from .issues import Issue
+from .lexer import lex_source
+from .minhash import minhash_signature
+from .rules import Rule, RuleSet
+
+# Java 规则表：导入时编译为一条交替正则，每个文件只扫描一遍
+RULES = RuleSet([
+    Rule('println', r'System\.out\.println'),
+    Rule('catch_all', r'catch\s*\(\s*Exception\s+[a-z0-9_]+\s*\)', also=('keyword',)),
+    Rule('print_stack_trace', r'e\.printStackTrace\(\)'),
+    Rule('bad_class', r'\bclass\s+([a-z][a-zA-Z0-9_]*)'),
+    Rule('bad_constant', r'static\s+final\s+\w+\s+([a-z][a-zA-Z0-9]*)'),
+    Rule('keyword', r'\b(?:if|for|while|switch|case|catch)\b'),
+])
 
 class JavaAnalyzer(BaseAnalyzer):
-    def analyze(self, file_path) -> AnalysisResult:
+    # v3: 规则表单次扫描，字符串中的内容不再计入
+    # v4: 记录 MinHash 签名，用于跨文件近似重复检测
+    VERSION = 4
+    LANGUAGE = "Java"
+
+    def analyze(self, file_path, data=None) -> AnalysisResult:
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
+            content = self.read_text(file_path, data)
         except Exception as e:
-            return AnalysisResult(file_path.name, "Java", 0, "D", [f"读取失败: {str(e)}"])
+            return AnalysisResult(file_path.name, "Java", 0, self.calculate_rating(0), [Issue('io.read_failed', error=str(e))])
 
         issues = []
         score = 100.0
         lines = content.splitlines()
+        # 词法扫描一次得到去注释、去字符串的代码，再用规则表扫描一遍得到全部命中
+        lex = lex_source(content, 'java')
+        hits = RULES.scan(lex.bare)
  
         # 1. 调试代码残留
-        if "System.out.println" in content:
-            count = content.count("System.out.println")
+        if hits['println']:
+            count = len(hits['println'])
             score -= 2 * count
-            issues.append(f"🗑️ 杂质残留: 发现 {count} 处 System.out.println，建议使用日志框架")
+            issues.append(Issue('java.println', count=count))
 
         # 暴力捕获异常
-        catch_all = len(re.findall(r'catch\s*\(\s*Exception\s+[a-z0-9_]+\s*\)', content))
+        catch_all = len(hits['catch_all'])
         if catch_all > 0:
             score -= 5 * catch_all
-            issues.append(f"🛡️ 掩耳盗铃: 发现 {catch_all} 处捕获所有 Exception，建议捕获具体异常")
+            issues.append(Issue('java.catch_all', count=catch_all))
 
         # e.printStackTrace()
-        if "e.printStackTrace()" in content:
+        if hits['print_stack_trace']:
             score -= 5
-            issues.append(f"⚠️ 处理粗糙: 使用了 printStackTrace()，生产环境会导致日志混乱")
+            issues.append(Issue('java.print_stack_trace'))
 
         #  2. 命名规范 
         # 类名必须大写开头
-        class_decls = re.findall(r'\bclass\s+([a-z][a-zA-Z0-9_]*)', content)
-        for c in class_decls:
+        for _, c in hits['bad_class']:
             score -= 5
-            issues.append(f"🎨 类名色泽黯淡: '{c}' 必须使用 PascalCase (大写开头)")
+            issues.append(Issue('java.class_case', name=c))
             
         # 常量建议大写蛇形
-        bad_constants = re.findall(r'static\s+final\s+\w+\s+([a-z][a-zA-Z0-9]*)', content)
-        for c in bad_constants:
+        for _, c in hits['bad_constant']:
             score -= 2
-            issues.append(f"🎨 常量命名不当: '{c}' 建议使用 UPPER_SNAKE_CASE")
+            issues.append(Issue('java.constant_case', name=c))
 
         #  3. 复杂度分析 
         # Java 很容易写出嵌套很深的 if/else
-        clean_code = re.sub(r'//.*|/\*[\s\S]*?\*/', '', content)
-        keywords = re.findall(r'\b(if|for|while|switch|case|catch)\b', clean_code)
-        
-        complexity_density = len(keywords) / (len(lines) or 1)
+        complexity_density = len(hits['keyword']) / (len(lines) or 1)
         if complexity_density > 0.2:
              score -= 10
-             issues.append(f"🕸️ 结构纠结: 代码复杂度密度高 ({complexity_density:.2f})")
+             issues.append(Issue('java.complexity_density', density=complexity_density))
 
         #  4. 长度检查 
         if len(lines) > 500:
             score -= 5
-            issues.append(f"📏 瓶身过大: 文件包含 {len(lines)} 行，违背了单一职责原则")
+            issues.append(Issue('java.file_too_long', lines=len(lines)))
 
         final_score = max(0, min(100, score))
         return AnalysisResult(
@@ -64,5 +79,6 @@ class JavaAnalyzer(BaseAnalyzer):
             language="Java",
             score=final_score,
             rating=self.calculate_rating(final_score),
-            issues=issues
+            issues=issues,
+            minhash=minhash_signature(lex.bare)
         )
\ No newline at end of file
@@ -0,0 +1,193 @@
+import re
+from .timing import phase
+
+# 各方言支持的字符串形式
+#   quotes    : 以反斜杠转义、不跨行的引号 (未闭合时截止到行尾)
+#   backtick  : 反引号字符串 ('raw' = Go 原始字符串，'template' = JS 模板字符串)
+#   verbatim  : C# 的 @"..." (允许跨行，"" 表示转义的引号)
+#   raw       : C++11 的 R"delim(...)delim"
+DIALECTS = {
+    'cpp':    {'quotes': '"\'', 'backtick': None,       'verbatim': False, 'raw': True},
+    'java':   {'quotes': '"\'', 'backtick': None,       'verbatim': False, 'raw': False},
+    'csharp': {'quotes': '"\'', 'backtick': None,       'verbatim': True,  'raw': False},
+    'go':     {'quotes': '"\'', 'backtick': 'raw',      'verbatim': False, 'raw': False},
+    'js':     {'quotes': '"\'', 'backtick': 'template', 'verbatim': False, 'raw': False},
+}
+
+# 只在这些字符处停下来处理，其余代码整段跳过 (由正则引擎在 C 层完成)
+_SPECIAL = {
+    name: re.compile('[{}/' + re.escape(d['quotes'])
+                     + ('`' if d['backtick'] else '')
+                     + ('@' if d['verbatim'] else '')
+                     + ('R' if d['raw'] else '') + ']')
+    for name, d in DIALECTS.items()
+}
+# 单行字符串内只需在这些字符处停下：结束引号、转义用的反斜杠、换行
+_STRING_STOP = {q: re.compile('[' + re.escape(q) + r'\\\n]') for q in '"\''}
+_RAW_DELIM = re.compile(r'R"([^()\\\s"]{0,16})\(')
+
+
+class LexResult:
+    """
+    一次扫描得到的结果
+    code  : 去掉注释后的源码 (保留字符串与换行，行号与原文一致)
+    bare  : 在 code 基础上清空字符串内容，仅保留一对引号，适合做关键字统计
+    braces: 代码中 (不含字符串与注释) 的花括号事件列表 [(行下标, +1/-1), ...]
+    """
+    __slots__ = ('code', 'bare', 'braces', 'comment_count', 'comment_lines', 'line_count')
+
+    def __init__(self, code, bare, braces, comment_count, comment_lines, line_count):
+        self.code = code
+        self.bare = bare
+        self.braces = braces
+        self.comment_count = comment_count
+        self.comment_lines = comment_lines
+        self.line_count = line_count
+
+    def brace_counts(self):
+        """按行汇总花括号，返回 (每行 '{' 数量, 每行 '}' 数量) 两个列表"""
+        opens = [0] * (self.line_count + 1)
+        closes = [0] * (self.line_count + 1)
+        for line, delta in self.braces:
+            if delta > 0:
+                opens[line] += 1
+            else:
+                closes[line] += 1
+        return opens, closes
+
+
+def _string_end(text, start, quote):
+    """
+    返回以 quote 开头的单行字符串的结束位置 (不含)，遇到换行即截止。
+    只在引号、反斜杠、换行处停下，从上一次停下的位置继续向后扫描，
+    不预先查找行尾，超长单行 (压缩后的 JS 等) 中的大量字符串同样是线性时间。
+    """
+    stop = _STRING_STOP[quote]
+    pos = start + 1
+    while True:
+        m = stop.search(text, pos)
+        if m is None:
+            return len(text)
+        j = m.start()
+        c = text[j]
+        if c == quote:
+            return j + 1
+        if c == '\\' and text[j + 1:j + 2] != '\n':
+            # 跳过被转义的字符
+            pos = j + 2
+            continue
+        # 换行 (包括反斜杠后的换行)：字符串截止到行尾
+        return j + 1 if c == '\\' else j
+
+
+def lex_source(text, dialect):
+    """
+    C 家族源码的线性扫描器：一次遍历区分代码 / 注释 / 字符串，并记录花括号事件。
+    每个字符最多被 find/search 越过常数次，整体为 O(n)，不会出现正则回溯。
+    """
+    with phase('lex'):
+        return _lex(text, dialect)
+
+
+def _lex(text, dialect):
+    d = DIALECTS[dialect]
+    special = _SPECIAL[dialect]
+    quotes = d['quotes']
+    n = len(text)
+
+    code_parts, bare_parts = [], []
+    braces = []
+    comment_count = 0
+    comment_lines = 0
+    line = 0       # 当前处理到的行下标
+    line_pos = 0   # line 对应的偏移位置
+    copied = 0     # 已复制进输出的位置
+    pos = 0
+
+    while True:
+        m = special.search(text, pos)
+        if m is None:
+            break
+        i = m.start()
+        c = text[i]
+        line += text.count('\n', line_pos, i)
+        line_pos = i
+
+        if c == '{' or c == '}':
+            braces.append((line, 1 if c == '{' else -1))
+            pos = i + 1
+            continue
+
+        if c == '/':
+            nxt = text[i + 1:i + 2]
+            if nxt == '/':
+                end = text.find('\n', i)
+                end = n if end == -1 else end
+                newlines = 0
+            elif nxt == '*':
+                end = text.find('*/', i + 2)
+                end = n if end == -1 else end + 2
+                newlines = text.count('\n', i, end)
+            else:
+                pos = i + 1
+                continue
+            comment_count += 1
+            comment_lines += newlines + 1
+            code_parts.append(text[copied:i])
+            bare_parts.append(text[copied:i])
+            if newlines:
+                code_parts.append('\n' * newlines)
+                bare_parts.append('\n' * newlines)
+            copied = pos = end
+            continue
+
+        # 字符串：确定结束位置
+        if c in quotes:
+            end = _string_end(text, i, c)
+        elif c == '`':
+            if d['backtick'] == 'raw':
+                end = text.find('`', i + 1)
+            else:
+                end = i + 1
+                while True:
+                    end = text.find('`', end)
+                    if end == -1 or text[end - 1] != '\\':
+                        break
+                    end += 1
+            end = n if end == -1 else end + 1
+        elif c == '@' and text.startswith('@"', i):
+            end = i + 2
+            while True:
+                end = text.find('"', end)
+                if end == -1:
+                    end = n
+                    break
+                if text.startswith('""', end):
+                    end += 2
+                    continue
+                end += 1
+                break
+        elif c == 'R' and (i == 0 or not (text[i - 1].isalnum() or text[i - 1] == '_')):
+            raw = _RAW_DELIM.match(text, i)
+            if raw is None:
+                pos = i + 1
+                continue
+            closing = ')' + raw.group(1) + '"'
+            end = text.find(closing, raw.end())
+            end = n if end == -1 else end + len(closing)
+        else:
+            pos = i + 1
+            continue
+
+        # 字符串在 code 中原样保留；在 bare 中只保留引号和换行
+        code_parts.append(text[copied:end])
+        bare_parts.append(text[copied:i])
+        quote = c if c in '\'`' else '"'
+        bare_parts.append(quote + '\n' * text.count('\n', i, end) + quote)
+        copied = pos = end
+
+    code_parts.append(text[copied:])
+    bare_parts.append(text[copied:])
+    line_count = text.count('\n') + (1 if text and not text.endswith('\n') else 0)
+    return LexResult(''.join(code_parts), ''.join(bare_parts), braces,
+                     comment_count, comment_lines, line_count)
@@ -1,18 +1,187 @@
 import ast
+import hashlib
 import re
 import tokenize
-from io import BytesIO
+from io import StringIO
 from collections import defaultdict
 from .base import BaseAnalyzer, AnalysisResult
+from .issues import Issue
+from .timing import phase
+
+# 计入循环复杂度 (同时作为结构指纹) 的节点
+_COMPLEXITY_NODES = (ast.If, ast.For, ast.AsyncFor, ast.While, ast.ExceptHandler, ast.With, ast.AsyncWith)
+
+# 跨文件克隆检测：节点数少于该值的函数 (getter、简单包装等) 不计算结构哈希
+CLONE_MIN_NODES = 60
+# 结构哈希的字节数 (64 位，百万级函数时碰撞概率仍可忽略)
+CLONE_DIGEST_SIZE = 8
+
+
+class _FunctionFrame:
+    """单个函数在遍历过程中累积的指标"""
+    __slots__ = ('name', 'lineno', 'level', 'order', 'length', 'args_count', 'base_depth',
+                 'complexity', 'max_depth', 'fingerprint', 'clone_digest')
+
+    def __init__(self, node, level, order, base_depth):
+        self.name = node.name
+        self.lineno = node.lineno
+        self.level = level
+        self.order = order
+        self.length = node.end_lineno - node.lineno
+        self.args_count = len(node.args.args)
+        self.base_depth = base_depth
+        self.complexity = 1
+        self.max_depth = 0
+        # (层级, 遍历序号, 节点类型)，按层级排序后即为广度优先顺序
+        self.fingerprint = []
+        # 规范化结构哈希 (仅顶层函数与方法，且足够大时才计算)
+        self.clone_digest = None
+
+    def absorb(self, inner):
+        """内层函数结束时，把它的复杂度、深度与指纹累加到外层函数"""
+        self.complexity += inner.complexity - 1
+        self.max_depth = max(self.max_depth, inner.max_depth + inner.base_depth - self.base_depth)
+        self.fingerprint.extend(inner.fingerprint)
+
+    def fingerprint_names(self):
+        return [name for _, _, name in sorted(self.fingerprint, key=lambda item: item[0])]
+
+
+class _PythonVisitor(ast.NodeVisitor):
+    """
+    单次遍历 AST：每个节点只访问一次，同时统计函数长度、参数、命名、复杂度、
+    真实嵌套深度、结构指纹，以及类命名和空异常处理。
+    顶层函数与方法还会在同一次遍历中记录规范化的前序节点序列 (忽略函数名、变量名、
+    常量值与位置)，用于计算跨文件克隆检测的结构哈希。
+    记录每个节点的 (层级, 遍历序号)，输出时排序还原为 ast.walk 的广度优先顺序，
+    使问题列表的先后顺序与逐项 ast.walk 的实现保持一致。
+    """
+
+    def __init__(self):
+        self.functions = []
+        self.classes = []
+        self.silent_excepts = []
+        self._frames = []
+        self._level = 0
+        self._order = 0
+        # 当前所在语句的嵌套深度 (按语句块而非缩进计算)
+        self._stmt_depth = 0
+        self._elif_node = None
+        # 当前顶层函数的规范化节点序列，不在函数内时为 None
+        self._clone_tokens = None
+        # 不参与结构哈希的文档字符串语句
+        self._clone_skip = None
+
+    def visit(self, node):
+        order = self._order
+        self._order += 1
+        level = self._level
+        frame = self._frames[-1] if self._frames else None
+
+        saved_depth = self._stmt_depth
+        if isinstance(node, (ast.stmt, ast.match_case)) and node is not self._elif_node:
+            self._stmt_depth += 1
+        if frame is not None:
+            if isinstance(node, _COMPLEXITY_NODES):
+                frame.complexity += 1
+                frame.fingerprint.append((level, order, type(node).__name__))
+            elif isinstance(node, ast.BoolOp):
+                frame.complexity += len(node.values) - 1
+            if isinstance(node, ast.stmt):
+                frame.max_depth = max(frame.max_depth, self._stmt_depth - frame.base_depth)
+
+        clone_tokens = tokens = self._clone_tokens
+        if tokens is not None and node is self._clone_skip:
+            self._clone_tokens = tokens = None
+        if tokens is not None:
+            # 变量名、参数名与常量值不参与哈希，改名后的复制粘贴同样能够识别
+            if isinstance(node, ast.Attribute):
+                tokens.append('.' + node.attr)
+            elif isinstance(node, ast.Constant):
+                tokens.append('=' + type(node.value).__name__)
+            else:
+                tokens.append(type(node).__name__)
+
+        self._level += 1
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            self._visit_function(node, level, order)
+        else:
+            if isinstance(node, ast.ClassDef):
+                self._check_class(node, level, order)
+            elif isinstance(node, ast.ExceptHandler):
+                self._check_except(node, level, order)
+            self.generic_visit(node)
+        self._level -= 1
+        self._stmt_depth = saved_depth
+        if tokens is not None:
+            # 子树结束标记，保证不同的树形不会得到相同的序列
+            tokens.append(')')
+        self._clone_tokens = clone_tokens
+
+    def generic_visit(self, node):
+        # elif 在 AST 中表现为嵌套在 orelse 里的 If，但并不增加嵌套层级
+        elif_node = None
+        if isinstance(node, ast.If) and len(node.orelse) == 1:
+            child = node.orelse[0]
+            if isinstance(child, ast.If) and child.col_offset == node.col_offset:
+                elif_node = child
+        for child in ast.iter_child_nodes(node):
+            self._elif_node = elif_node
+            self.visit(child)
+
+    def _visit_function(self, node, level, order):
+        frame = _FunctionFrame(node, level, order, self._stmt_depth)
+        top_level = self._clone_tokens is None
+        if top_level:
+            self._clone_tokens = []
+        if ast.get_docstring(node, clean=False) is not None:
+            self._clone_skip = node.body[0]
+        self._frames.append(frame)
+        self.generic_visit(node)
+        self._frames.pop()
+        if top_level:
+            tokens, self._clone_tokens = self._clone_tokens, None
+            if len(tokens) >= CLONE_MIN_NODES * 2:  # 每个节点对应一个类型标记和一个结束标记
+                frame.clone_digest = hashlib.blake2b(
+                    '\x1f'.join(tokens).encode('utf-8'), digest_size=CLONE_DIGEST_SIZE).hexdigest()
+        if self._frames:
+            self._frames[-1].absorb(frame)
+        self.functions.append(frame)
+
+    def _check_class(self, node, level, order):
+        self.classes.append((level, order, node.name))
+
+    def _check_except(self, node, level, order):
+        # 检查 body 是否只有 pass 或 ...
+        if len(node.body) == 1:
+            stmt = node.body[0]
+            if isinstance(stmt, ast.Pass) or (isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Constant) and stmt.value.value is Ellipsis):
+                self.silent_excepts.append((level, order, node.lineno))
+
+    def sorted_functions(self):
+        return sorted(self.functions, key=lambda f: (f.level, f.order))
+
+    def sorted_classes(self):
+        return [name for _, _, name in sorted(self.classes)]
+
+    def sorted_silent_excepts(self):
+        return [lineno for _, _, lineno in sorted(self.silent_excepts)]
+
 
 class PythonAnalyzer(BaseAnalyzer):
-    def analyze(self, file_path) -> AnalysisResult:
+    # v2: 单次遍历 AST，嵌套深度改为按语句块计算
+    # v3: 记录函数的规范化结构哈希，用于跨文件克隆检测
+    VERSION = 3
+    LANGUAGE = "Python"
+    LARGE_COMMENT_PATTERN = rb'^[ \t]*#'
+    LARGE_KEYWORD_PATTERN = rb'\b(?:if|elif|for|while|except|with|and|or)\b'
+
+    def analyze(self, file_path, data=None) -> AnalysisResult:
         try:
-            with open(file_path, 'rb') as f:
-                content_bytes = f.read()
-            content_str = content_bytes.decode('utf-8')
+            # 严格按 UTF-8 解码，并保留原始换行符 (与 tokenize / ast 按字节处理的结果一致)
+            content_str = self.read_text(file_path, data, errors='strict', newline='')
         except Exception as e:
-            return AnalysisResult(file_path.name, "Python", 0, "D", [f"无法读取: {str(e)}"])
+            return AnalysisResult(file_path.name, "Python", 0, self.calculate_rating(0), [Issue('io.unreadable', error=str(e))])
 
         issues = []
         score = 100.0
@@ -22,13 +191,14 @@ class PythonAnalyzer(BaseAnalyzer):
         total_lines = 0
         comment_lines = 0
         try:
-            tokens = tokenize.tokenize(BytesIO(content_bytes).readline)
-            for tok in tokens:
-                if tok.type == tokenize.COMMENT:
-                    comment_lines += 1
-                elif tok.type not in (tokenize.NL, tokenize.NEWLINE, tokenize.INDENT, tokenize.DEDENT, tokenize.ENCODING):
-                    # 粗略估算代码行（非空行）
-                    pass
+            with phase('tokenize'):
+                tokens = tokenize.generate_tokens(StringIO(content_str).readline)
+                for tok in tokens:
+                    if tok.type == tokenize.COMMENT:
+                        comment_lines += 1
+                    elif tok.type not in (tokenize.NL, tokenize.NEWLINE, tokenize.INDENT, tokenize.DEDENT, tokenize.ENCODING):
+                        # 粗略估算代码行（非空行）
+                        pass
             total_lines = len(content_str.splitlines())
         except:
             # Tokenize 失败降级处理
@@ -38,112 +208,88 @@ class PythonAnalyzer(BaseAnalyzer):
         ratio = comment_lines / total_lines if total_lines > 0 else 0
         if ratio < 0.1:
             score -= 10
-            issues.append(f"🍷 余味不足: 注释率仅为 {ratio*100:.1f}% (建议 > 10%)")
+            issues.append(Issue('py.low_comment_ratio', ratio=ratio*100))
 
         #  AST 解析 
         try:
-            tree = ast.parse(content_str)
+            with phase('parse'):
+                tree = ast.parse(content_str)
         except SyntaxError as e:
-            return AnalysisResult(file_path.name, "Python", 0, "D", [f"❌ 语法错误: {e}"])
+            return AnalysisResult(file_path.name, "Python", 0, self.calculate_rating(0), [Issue('py.syntax_error', error=str(e))])
 
-        #  2. 函数分析 (长度、复杂度、参数、嵌套) 
-        func_count = 0
-        total_complexity = 0
+        #  2~5. 单次遍历 AST，同时收集函数、类、异常处理的指标
+        visitor = _PythonVisitor()
+        with phase('rules'):
+            visitor.visit(tree)
+
+        #  2. 函数分析 (长度、复杂度、参数、嵌套)
         structure_fingerprints = defaultdict(list) # 用于查重
+        clone_hashes = []  # 跨文件克隆检测: [结构哈希, 函数名, 行号]
+
+        for func in visitor.sorted_functions():
+            func_name = func.name
+            if func.clone_digest:
+                clone_hashes.append([func.clone_digest, func_name, func.lineno])
+
+            # A. 长度 (Function Length) -> Go: >40, >70, >120
+            length = func.length
+            if length > 120:
+                score -= 5
+                issues.append(Issue('py.function_too_long', func=func_name, lines=length))
+            elif length > 70:
+                score -= 2
+                issues.append(Issue('py.function_long', func=func_name, lines=length))
+
+            # B. 参数数量 -> Go: >6, >8
+            args_count = func.args_count
+            if args_count > 6:
+                score -= 2
+                issues.append(Issue('py.too_many_args', func=func_name, count=args_count))
 
-        for node in ast.walk(tree):
-            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
-                func_count += 1
-                func_name = node.name
-                
-                # A. 长度 (Function Length) -> Go: >40, >70, >120
-                length = node.end_lineno - node.lineno
-                if length > 120:
-                    score -= 5
-                    issues.append(f"📏 酒体过重: 函数 '{func_name}' 长达 {length} 行 (建议拆分)")
-                elif length > 70:
-                    score -= 2
-                    issues.append(f"📏 酒体略重: 函数 '{func_name}' 长度 {length} 行")
-
-                # B. 参数数量 -> Go: >6, >8
-                args_count = len(node.args.args)
-                if args_count > 6:
-                    score -= 2
-                    issues.append(f"⚖️ 成分复杂: 函数 '{func_name}' 参数过多 ({args_count}个)")
-
-                # C. 命名规范 (Naming) -> Python: snake_case
-                if not re.match(r'^[a-z_][a-z0-9_]*$', func_name) and not (func_name.startswith('__') and func_name.endswith('__')):
-                    score -= 1
-                    issues.append(f"🎨 色泽偏差: 函数 '{func_name}' 建议使用 snake_case")
-
-                # D. 循环复杂度 (Cyclomatic Complexity) -> Go: >10, >15
-                # & E. 嵌套深度 (Nesting) -> Go: >3, >5
-                complexity = 1
-                max_depth = 0
-                
-                # 生成结构指纹 (Duplication Check)
-                fingerprint = []
-
-                for child in ast.walk(node):
-                    # 复杂度计算
-                    if isinstance(child, (ast.If, ast.For, ast.AsyncFor, ast.While, ast.ExceptHandler, ast.With, ast.AsyncWith)):
-                        complexity += 1
-                        fingerprint.append(type(child).__name__)
-                    elif isinstance(child, ast.BoolOp):
-                         complexity += len(child.values) - 1
-                    
-                    # 深度计算 (简单估算：节点层级)
-                    # 准确计算需要递归 visitor，这里简化为 indent level 估算可能不准，
-                    # 但在 AST walk 中很难直接拿 depth。
-                    # 我们用一种 tricky 的方法：统计 col_offset
-                    if hasattr(child, 'col_offset'):
-                        depth = child.col_offset // 4 # 假设 4 空格缩进
-                        max_depth = max(max_depth, depth)
-
-                total_complexity += complexity
-                
-                if complexity > 15:
-                    score -= 5
-                    issues.append(f"🕸️ 结构极其纠结: 函数 '{func_name}' 复杂度 {complexity}")
-                elif complexity > 10:
-                    score -= 2
-                    issues.append(f"🕸️ 结构纠结: 函数 '{func_name}' 复杂度 {complexity}")
-
-                # 减去函数本身的缩进
-                base_depth = node.col_offset // 4
-                real_depth = max_depth - base_depth
-                if real_depth > 5:
-                    score -= 3
-                    issues.append(f"🏗️ 嵌套过深: 函数 '{func_name}' 深度 {real_depth} 层")
-
-                # F. 查重指纹记录
-                if len(fingerprint) > 5: # 只有包含一定逻辑的才查重
-                    sig = "-".join(fingerprint)
-                    structure_fingerprints[sig].append(func_name)
+            # C. 命名规范 (Naming) -> Python: snake_case
+            if not re.match(r'^[a-z_][a-z0-9_]*$', func_name) and not (func_name.startswith('__') and func_name.endswith('__')):
+                score -= 1
+                issues.append(Issue('py.function_case', func=func_name))
+
+            # D. 循环复杂度 (Cyclomatic Complexity) -> Go: >10, >15
+            complexity = func.complexity
+            if complexity > 15:
+                score -= 5
+                issues.append(Issue('py.complexity_very_high', func=func_name, complexity=complexity))
+            elif complexity > 10:
+                score -= 2
+                issues.append(Issue('py.complexity_high', func=func_name, complexity=complexity))
+
+            # E. 嵌套深度 (Nesting) -> Go: >3, >5
+            real_depth = func.max_depth
+            if real_depth > 5:
+                score -= 3
+                issues.append(Issue('py.nesting_too_deep', func=func_name, depth=real_depth))
+
+            # F. 查重指纹记录
+            fingerprint = func.fingerprint_names()
+            if len(fingerprint) > 5: # 只有包含一定逻辑的才查重
+                sig = "-".join(fingerprint)
+                structure_fingerprints[sig].append(func_name)
 
         #  3. 重复代码检测 (Duplication) 
         for sig, funcs in structure_fingerprints.items():
             if len(funcs) > 1:
                 score -= 5 * (len(funcs) - 1)
-                issues.append(f"👯‍♀️ 疑似复制粘贴: {', '.join(funcs)} 逻辑结构完全一致")
+                issues.append(Issue('py.duplicate_logic', funcs=', '.join(funcs)))
 
         #  4. 类命名规范 
-        for node in ast.walk(tree):
-            if isinstance(node, ast.ClassDef):
-                # Class 应该是 PascalCase
-                if not re.match(r'^[A-Z][a-zA-Z0-9]*$', node.name):
-                    score -= 1
-                    issues.append(f"🎨 类名色泽不佳: '{node.name}' 建议使用 PascalCase")
+        for class_name in visitor.sorted_classes():
+            # Class 应该是 PascalCase
+            if not re.match(r'^[A-Z][a-zA-Z0-9]*$', class_name):
+                score -= 1
+                issues.append(Issue('py.class_case', name=class_name))
 
         #  5. 错误处理检测 (Error Handling) 
         # Python 特有: try: ... except: pass
-        for node in ast.walk(tree):
-            if isinstance(node, ast.ExceptHandler):
-                # 检查 body 是否只有 pass 或 ...
-                if len(node.body) == 1 and isinstance(node.body[0], (ast.Pass, ast.Expr)):
-                    if isinstance(node.body[0], ast.Pass) or (isinstance(node.body[0], ast.Expr) and isinstance(node.body[0].value, ast.Constant) and node.body[0].value.value is Ellipsis):
-                         score -= 5
-                         issues.append(f"🙈 掩耳盗铃: 第 {node.lineno} 行捕获了异常却未处理")
+        for lineno in visitor.sorted_silent_excepts():
+            score -= 5
+            issues.append(Issue('py.silent_except', line=lineno))
 
         final_score = max(0, min(100, score))
         return AnalysisResult(
@@ -151,5 +297,6 @@ class PythonAnalyzer(BaseAnalyzer):
             language="Python",
             score=final_score,
             rating=self.calculate_rating(final_score),
-            issues=issues
+            issues=issues,
+            clone_hashes=clone_hashes
         )
\ No newline at end of file
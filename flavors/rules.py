@@ -0,0 +1,58 @@
+import re
+from .timing import phase
+
+
+class Rule:
+    """
+    单条匹配规则
+    pattern 中最多包含一个捕获组，用于提取名称等信息；没有捕获组时记录整段匹配文本。
+    also    : 命中本规则时同时计入的其他规则 (用于处理交替匹配中重叠的模式，
+              例如 `catch (Exception e)` 既是暴力捕获，也是一个 catch 关键字)。
+    """
+    __slots__ = ('name', 'pattern', 'also')
+
+    def __init__(self, name, pattern, also=()):
+        self.name = name
+        self.pattern = pattern
+        self.also = also
+
+
+class RuleSet:
+    """
+    多规则单次扫描匹配器
+    把一门语言的全部规则合并成一条交替正则，在模块导入时编译一次；
+    每个文件只需 finditer 一遍即可得到所有规则的命中结果。
+    规则按声明顺序优先匹配，重叠时靠前的规则胜出。
+    """
+
+    def __init__(self, rules, flags=0):
+        self.rules = rules
+        parts = []
+        # 组号 -> (规则, 捕获组号或 None)
+        self._groups = {}
+        group = 1
+        for rule in rules:
+            inner = re.compile(rule.pattern, flags).groups
+            if inner > 1:
+                raise ValueError(f"规则 {rule.name} 只能包含一个捕获组")
+            parts.append(f"({rule.pattern})")
+            self._groups[group] = (rule, group + 1 if inner else None)
+            group += 1 + inner
+        self.regex = re.compile('|'.join(parts), flags)
+
+    def scan(self, text):
+        """
+        扫描文本，返回 {规则名: [(起始偏移, 捕获值), ...]}。
+        所有规则名都会出现在结果中 (未命中时为空列表)。
+        """
+        hits = {rule.name: [] for rule in self.rules}
+        groups = self._groups
+        with phase('rules'):
+            for m in self.regex.finditer(text):
+                # 外层分组最后闭合，因此 lastindex 即为命中规则的外层组号
+                rule, capture = groups[m.lastindex]
+                hit = (m.start(), m.group(capture) if capture else m.group())
+                hits[rule.name].append(hit)
+                for other in rule.also:
+                    hits[other].append(hit)
+        return hits
@@ -1,12 +1,12 @@
-import os
-import re
-from pathlib import Path
 from .base import AnalysisResult
+from .issues import Issue
 
 class ProjectStructureAnalyzer:
     """
     项目整体结构品鉴师
-    不针对单一文件，而是评价整个项目的组织架构
+    不针对单一文件，而是评价整个项目的组织架构。
+    以流式聚合的方式工作：遍历目录时逐个登记根目录条目与文件 (add_root_entry / add_file)，
+    只保存计数与少量示例，最后由 finish() 给出评分。
     """
     
     # 标准化文档清单 (加分项/扣分项)
@@ -23,15 +23,68 @@ class ProjectStructureAnalyzer:
         'build.gradle': 5      # Java/Android 依赖
     }
 
-    def analyze(self, project_root: Path, all_file_paths: list) -> AnalysisResult:
+    # 文件名中含空格时逐条列出的上限，避免刷屏
+    MAX_SPACE_NAME_ISSUES = 5
+
+    def __init__(self):
+        # 根目录的全部条目 (含隐藏与被忽略的条目): 名称 -> 是否为文件
+        self.root_items = {}
+        self.root_error = None
+        # 以下统计只针对遍历到的文件，每个文件累加一次，不保留文件列表
+        self.space_names = []
+        self.space_naming_count = 0
+        self.snake_case = 0  # my_file.py
+        self.kebab_case = 0  # my-file.py
+
+    def add_root_entry(self, name: str, is_file: bool):
+        """登记根目录下的一个条目 (由遍历在列出根目录时调用，不额外访问文件系统)"""
+        self.root_items[name] = is_file
+
+    def set_root_error(self, error):
+        self.root_error = str(error)
+
+    def add_file(self, filename: str):
+        """登记遍历到的一个文件，只累加计数，状态大小与文件数量无关"""
+        # 检查空格 (大忌)
+        if ' ' in filename:
+            self.space_naming_count += 1
+            if len(self.space_names) < self.MAX_SPACE_NAME_ISSUES:
+                self.space_names.append(filename)
+        # 统计 _ 和 - 的使用比例
+        if '_' in filename: self.snake_case += 1
+        if '-' in filename: self.kebab_case += 1
+
+    def to_dict(self) -> dict:
+        """聚合状态的 JSON 表示 (分片结果文件中保存，合并时还原)"""
+        return {
+            'root_items': self.root_items,
+            'root_error': self.root_error,
+            'space_names': self.space_names,
+            'space_naming_count': self.space_naming_count,
+            'snake_case': self.snake_case,
+            'kebab_case': self.kebab_case,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ProjectStructureAnalyzer":
+        structure = cls()
+        for key, value in data.items():
+            setattr(structure, key, value)
+        return structure
+
+    def finish(self, clone_findings: list = None, near_duplicates: list = None) -> AnalysisResult:
+        """
+        根据已登记的条目给出项目结构评分 (不修改内部状态，可以重复调用)
+        clone_findings: 跨文件克隆检测的结果 (见 flavors/clones.py 的 CloneIndex.findings)
+        near_duplicates: 近似重复文件检测的结果 (见 flavors/clones.py 的 NearDuplicateIndex.findings)
+        """
         score = 60.0 # 基础分，只要项目存在给60
         issues = []
         
-        # 获取根目录下的文件和文件夹
-        try:
-            root_items = os.listdir(project_root)
-        except Exception as e:
-            return AnalysisResult("项目结构", "Structure", 0, "D", [f"无法访问根目录: {str(e)}"])
+        # 根目录下的文件和文件夹
+        if self.root_error is not None:
+            return AnalysisResult("项目结构", "Structure", 0, "D (杂乱无章)", [Issue('structure.root_unreadable', error=self.root_error)])
+        root_items = list(self.root_items)
 
         #  1. 文档规范性检查 (Documentation) 
         found_docs = []
@@ -50,11 +103,11 @@ class ProjectStructureAnalyzer:
             score += 10
         else:
             score -= 10
-            issues.append("📜 门面缺失: 缺少 README.md，就像一家没有招牌的餐厅")
+            issues.append(Issue('structure.no_readme'))
 
         if '.gitignore' not in root_items_lower:
             score -= 10
-            issues.append("🗑️ 垃圾混入: 缺少 .gitignore，容易上传临时文件")
+            issues.append(Issue('structure.no_gitignore'))
         else:
             score += 5
 
@@ -64,61 +117,46 @@ class ProjectStructureAnalyzer:
         
         #  2. 根目录堆积检测 (Root Clutter) 
         # 统计根目录下的"文件"数量（排除文件夹）
-        root_files = [f for f in root_items if (project_root / f).is_file()]
+        root_files = [f for f in root_items if self.root_items[f]]
         # 排除掉标准文档后，剩下的杂乱文件
         clutter_files = [f for f in root_files if f.lower() not in root_items_lower]
         
         # 如果根目录下非文档类文件超过 15 个，视为堆积
         if len(clutter_files) > 15:
             score -= 15
-            issues.append(f"📦 仓库杂乱: 根目录下堆积了 {len(clutter_files)} 个文件，建议归档到子目录 (src, docs, lib)")
+            issues.append(Issue('structure.root_clutter', count=len(clutter_files)))
         elif len(clutter_files) > 8:
             score -= 5
-            issues.append(f"📦 略显拥挤: 根目录下文件较多，建议整理")
+            issues.append(Issue('structure.root_crowded'))
 
         #  3. 文件命名规范 (Naming Conventions) 
-        # 检查所有扫描到的文件
-        bad_naming_count = 0
-        space_naming_count = 0
-        
-        for file_path in all_file_paths:
-            filename = file_path.name
-            
-            # 检查空格 (大忌)
-            if ' ' in filename:
-                space_naming_count += 1
-                if space_naming_count <= 5: # 避免刷屏
-                    issues.append(f"🏷️ 命名禁忌: '{filename}' 包含空格，可能导致脚本错误")
-            
-            # 检查特殊字符 (只允许 字母 数字 . - _)
-            # 排除掉像 .gitignore 这种以.开头的文件
-            if not re.match(r'^[a-zA-Z0-9._-]+$', filename) and not filename.startswith('.'):
-                 # 简单放宽一点，允许中文但给警告? 这里先严格一点
-                 # 如果包含中文
-                 if re.search(r'[\u4e00-\u9fa5]', filename):
-                     # 中文文件名在某些系统兼容性不好，提示但不重扣
-                     pass 
-                 else:
-                     # 其他怪异字符
-                     pass
-
-        if space_naming_count > 0:
+        for filename in self.space_names:
+            issues.append(Issue('structure.space_in_name', name=filename))
+
+        if self.space_naming_count > 0:
             score -= 10
-            issues.append(f"🏷️ 命名不规范: 发现 {space_naming_count} 个文件名包含空格")
+            issues.append(Issue('structure.space_names', count=self.space_naming_count))
 
         #  4. 命名风格一致性 (Consistency) 
-        # 统计 _ 和 - 的使用比例
-        snake_case = 0 # my_file.py
-        kebab_case = 0 # my-file.py
-        
-        for file_path in all_file_paths:
-            if '_' in file_path.name: snake_case += 1
-            if '-' in file_path.name: kebab_case += 1
-            
         # 如果两者都大量存在，说明风格分裂
-        if snake_case > 5 and kebab_case > 5:
+        if self.snake_case > 5 and self.kebab_case > 5:
             score -= 5
-            issues.append(f"🎨 风格分裂: 混用了 snake_case ({snake_case}) 和 kebab-case ({kebab_case}) 命名")
+            issues.append(Issue('structure.mixed_case', snake=self.snake_case, kebab=self.kebab_case))
+
+        #  5. 跨文件重复代码 (Duplication) 
+        # 只列出前几处，避免大型项目中刷屏
+        if clone_findings:
+            score -= min(10, 2 * len(clone_findings))
+            for path, func, line, orig_path, orig_func, orig_line in clone_findings[:5]:
+                issues.append(Issue('structure.cross_file_clone', path=path, func=func, line=line,
+                                    orig_path=orig_path, orig_func=orig_func, orig_line=orig_line))
+            issues.append(Issue('structure.cross_file_clones', count=len(clone_findings)))
+        if near_duplicates:
+            score -= min(10, 2 * len(near_duplicates))
+            for path, orig_path, similarity in near_duplicates[:5]:
+                issues.append(Issue('structure.near_duplicate', path=path, orig_path=orig_path,
+                                    similarity=similarity))
+            issues.append(Issue('structure.near_duplicates', count=len(near_duplicates)))
 
         # 最终算分
         final_score = max(0, min(100, score))
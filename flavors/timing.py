@@ -0,0 +1,57 @@
+import time
+
+# 分析器内部的分阶段计时 (读取 / 词法 / 解析 / 规则匹配)。
+# 只有在 begin_file() 与 end_file() 之间才会真正计时；未开启性能分析时，
+# phase() 返回一个共享的空上下文，每次调用只多一次函数调用的开销。
+# 状态是进程内的全局变量，因此在工作进程中同样有效。
+
+_current = None
+
+
+class _NullPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class _Phase:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if _current is not None:
+            _current[self.name] = _current.get(self.name, 0.0) + time.perf_counter() - self.start
+        return False
+
+
+def phase(name):
+    """记录一个阶段的耗时: with phase('parse'): ..."""
+    if _current is None:
+        return _NULL_PHASE
+    return _Phase(name)
+
+
+def begin_file():
+    """开始记录一个文件的各阶段耗时"""
+    global _current
+    _current = {}
+
+
+def end_file():
+    """结束记录，返回 {阶段: 秒}"""
+    global _current
+    phases, _current = _current or {}, None
+    return phases
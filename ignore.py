@@ -0,0 +1,139 @@
+import os
+import re
+import fnmatch
+
+# 含有这些字符的模式才需要通配匹配，其余按字面量直接查集合
+_GLOB_CHARS = frozenset('*?[')
+
+# 每个目录下会被读取的忽略规则文件
+IGNORE_FILES = ('.gitignore', '.ignore')
+
+
+class IgnoreMatcher:
+    """
+    名称忽略匹配器 (一次编译，多次匹配)
+    字面量名称放进集合做 O(1) 查找，通配模式合并成一条正则，
+    避免对每个条目逐个调用 fnmatch。
+    """
+
+    def __init__(self, patterns):
+        self.literals = set()
+        globs = []
+        for pattern in patterns:
+            pattern = os.path.normcase(pattern)
+            if _GLOB_CHARS.intersection(pattern):
+                globs.append(fnmatch.translate(pattern))
+            else:
+                self.literals.add(pattern)
+        self.regex = re.compile('|'.join(globs)) if globs else None
+
+    def matches(self, name):
+        name = os.path.normcase(name)
+        if name in self.literals:
+            return True
+        return bool(self.regex and self.regex.match(name))
+
+
+def _translate_gitignore(pattern):
+    """把一条 gitignore 通配模式翻译为正则 (不含锚点处理)"""
+    i, n = 0, len(pattern)
+    out = []
+    while i < n:
+        c = pattern[i]
+        if c == '*':
+            if pattern.startswith('**/', i):
+                out.append('(?:.*/)?')
+                i += 3
+                continue
+            if pattern.startswith('**', i) and i + 2 == n:
+                out.append('.*')
+                i += 2
+                continue
+            out.append('[^/]*')
+        elif c == '?':
+            out.append('[^/]')
+        elif c == '[':
+            j = pattern.find(']', i + 2)
+            if j == -1:
+                out.append('\\[')
+            else:
+                body = pattern[i + 1:j]
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                out.append('[' + body.replace('\\', '\\\\') + ']')
+                i = j
+        elif c == '\\' and i + 1 < n:
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return ''.join(out)
+
+
+class GitIgnoreRules:
+    """
+    单个 .gitignore / .ignore 文件 (或 --exclude 参数) 编译后的规则集
+    支持注释、`!` 取反、以 `/` 结尾的仅目录规则、带 `/` 的锚定规则以及 `**`。
+    """
+
+    def __init__(self, lines, base=""):
+        # base: 规则文件所在目录相对于项目根目录的路径 (posix 风格，根目录为空串)
+        self.base = base
+        self.rules = []  # (正则, 是否取反, 是否仅匹配目录, 是否按路径匹配)
+        for line in lines:
+            line = line.rstrip('\n').rstrip('\r')
+            if not line.strip() or line.startswith('#'):
+                continue
+            # 未转义的尾随空格会被 git 忽略
+            if not line.endswith('\\ '):
+                line = line.rstrip()
+            negate = line.startswith('!')
+            if negate:
+                line = line[1:]
+            elif line.startswith('\\!') or line.startswith('\\#'):
+                line = line[1:]
+            dir_only = line.endswith('/')
+            line = line.rstrip('/')
+            if not line:
+                continue
+            # 模式中间出现 `/` 时相对规则文件所在目录锚定，否则匹配任意层级的名称
+            anchored = '/' in line
+            line = line.lstrip('/')
+            regex = re.compile(_translate_gitignore(line) + r'\Z')
+            self.rules.append((regex, negate, dir_only, anchored))
+
+    @classmethod
+    def from_file(cls, file_path, base=""):
+        try:
+            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                return cls(f.readlines(), base)
+        except OSError:
+            return None
+
+    def match(self, rel_path, name, is_dir):
+        """
+        返回 True (忽略) / False (显式取反保留) / None (没有规则命中)。
+        rel_path 为条目相对于项目根目录的 posix 路径。
+        """
+        if self.base:
+            if not rel_path.startswith(self.base + '/'):
+                return None
+            rel_path = rel_path[len(self.base) + 1:]
+        # 后出现的规则优先级更高
+        for regex, negate, dir_only, anchored in reversed(self.rules):
+            if dir_only and not is_dir:
+                continue
+            if regex.match(rel_path if anchored else name):
+                return not negate
+        return None
+
+
+def is_path_ignored(rule_sets, rel_path, name, is_dir):
+    """按从浅到深的顺序应用规则集，越深的规则文件优先级越高"""
+    ignored = False
+    for rules in rule_sets:
+        decision = rules.match(rel_path, name, is_dir)
+        if decision is not None:
+            ignored = decision
+    return ignored
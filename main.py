@@ -1,10 +1,29 @@
 import argparse
 import sys
 from analyzer import CodeSommelier
-from reporter import MarkdownReporter
+from reporter import MarkdownReporter, StreamingMarkdownReporter, JsonLinesReporter
 
 def main():
-    parser = argparse.ArgumentParser(description="Code Sommelier - 代码优雅度评分工具 🍷")
+    # 子命令: main.py serve ... 启动常驻评分服务
+    # (服务、监听相关模块只在需要时导入，保持普通调用的启动速度)
+    if len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        import server
+        server.main(sys.argv[2:])
+        return
+    # 子命令: main.py batch ... 按清单批量品鉴多个项目
+    if len(sys.argv) > 1 and sys.argv[1] == 'batch':
+        import batch
+        batch.main(sys.argv[2:])
+        return
+    # 子命令: main.py merge ... 合并 --shard 产生的分片结果
+    if len(sys.argv) > 1 and sys.argv[1] == 'merge':
+        import shard
+        shard.main(sys.argv[2:])
+        return
+
+    parser = argparse.ArgumentParser(description="Code Sommelier - 代码优雅度评分工具 🍷",
+                                     epilog="常驻评分服务: python main.py serve --help；批量品鉴: python main.py batch --help；"
+                                            "合并分片结果: python main.py merge --help")
     
     parser.add_argument(
         '--project_path', 
@@ -21,19 +40,233 @@ def main():
         help='指定评判语言 (如 python, cpp)。不指定则分析所有支持的语言。'
     )
 
+    parser.add_argument(
+        '--jobs', 
+        type=int, 
+        default=1, 
+        help='并行分析的进程数，默认 1 (串行)；传入 0 则使用全部 CPU 核心。'
+    )
+
+    parser.add_argument(
+        '--exclude', 
+        action='append', 
+        default=[], 
+        metavar='PATTERN',
+        help='额外排除的路径模式 (gitignore 语法，相对项目根目录)，可重复指定，如 --exclude vendor/ --exclude "*.pb.go"'
+    )
+
+    parser.add_argument(
+        '--no_gitignore', 
+        action='store_true', 
+        help='不读取项目中的 .gitignore / .ignore 文件'
+    )
+
+    parser.add_argument(
+        '--no_cache', 
+        action='store_true', 
+        help='禁用增量分析缓存，强制重新分析所有文件'
+    )
+
+    parser.add_argument(
+        '--cache_dir', 
+        type=str, 
+        default=None, 
+        help='缓存目录，默认为 <project_path>/.sommelier_cache'
+    )
+
+    parser.add_argument(
+        '--since', 
+        type=str, 
+        default=None, 
+        metavar='REF',
+        help='仅品鉴相对该 git 引用新增或修改的文件 (如 origin/main)；若有缓存，未变更文件沿用缓存评分'
+    )
+
+    parser.add_argument(
+        '--shard', 
+        type=str, 
+        default=None, 
+        metavar='i/N',
+        help='分片品鉴：按相对路径的稳定哈希把文件分为 N 片，只分析第 i 片 (1 <= i <= N)，'
+             '输出分片结果文件 (默认: CODE_RATING.shard-i-of-N.json)，再用 main.py merge 合并为完整报告'
+    )
+
+    parser.add_argument(
+        '--large_file_mb', 
+        type=float, 
+        default=20, 
+        help='超过该大小 (MB) 的文件改用流式分析，只统计部分指标 (默认: 20，0 表示不限制)'
+    )
+
+    parser.add_argument(
+        '--file_timeout', 
+        type=float, 
+        default=None, 
+        metavar='SECONDS',
+        help='单个文件的分析时限 (秒)。开启后每个文件在受看门狗监控的子进程中分析，超时的文件记为跳过'
+    )
+
+    parser.add_argument(
+        '--max_file_mb', 
+        type=float, 
+        default=None, 
+        help='单个文件的大小上限 (MB)，超出的文件不做分析，在报告中记为跳过'
+    )
+
+    parser.add_argument(
+        '--prefetch', 
+        type=int, 
+        default=0, 
+        metavar='N',
+        help='使用 N 个线程提前读取后续文件，使读取与分析重叠进行，适用于网络文件系统 (默认: 0，不预读；与 --jobs 相互独立)'
+    )
+
+    parser.add_argument(
+        '--report_top', 
+        type=int, 
+        default=None, 
+        metavar='K',
+        help='流式生成报告，只列出得分最低的 K 个文件，适用于超大项目 (内存占用与文件数量无关)'
+    )
+
+    parser.add_argument(
+        '--format', 
+        type=str, 
+        default='markdown', 
+        choices=['markdown', 'jsonl'],
+        help='报告格式：markdown (默认) 或 jsonl (每个文件一行 JSON，边扫描边写出，末尾附汇总记录)'
+    )
+
+    parser.add_argument(
+        '--output', 
+        type=str, 
+        default=None, 
+        help='报告输出路径 (默认: CODE_RATING.md 或 CODE_RATING.jsonl)'
+    )
+
+    parser.add_argument(
+        '--watch', 
+        action='store_true', 
+        help='品鉴完成后常驻运行，监听项目中的文件变化，只重新分析变化的文件并即时更新报告 (Ctrl+C 退出)'
+    )
+
+    parser.add_argument(
+        '--profile', 
+        type=str, 
+        nargs='?', 
+        const='sommelier_profile.json', 
+        default=None, 
+        metavar='PATH',
+        help='输出各阶段、各语言的耗时与最慢的文件，并保存为 JSON (默认: sommelier_profile.json)'
+    )
+
+    parser.add_argument(
+        '--profile_top', 
+        type=int, 
+        default=10, 
+        help='性能剖析中列出的最慢文件数量 (默认: 10)'
+    )
+
+    parser.add_argument(
+        '--profile_memory', 
+        action='store_true', 
+        help='性能剖析时使用 tracemalloc 记录各阶段的内存峰值 (开销较大，仅统计主进程)'
+    )
+
     args = parser.parse_args()
 
-    sommelier = CodeSommelier(args.project_path, args.language)
+    if args.watch and (args.since or args.report_top or args.format != 'markdown'):
+        print("❌ --watch 需要完整的 Markdown 报告，不能与 --since、--report_top 或 --format jsonl 同时使用。")
+        sys.exit(1)
 
-    success, message = sommelier.taste()
+    shard = None
+    if args.shard:
+        if args.since or args.watch or args.report_top or args.format != 'markdown':
+            print("❌ --shard 不能与 --since、--watch、--report_top 或 --format jsonl 同时使用 (报告在 merge 时生成)。")
+            sys.exit(1)
+        from shard import parse_shard
+        try:
+            shard = parse_shard(args.shard)
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+
+    profiler = None
+    if args.profile:
+        from profiler import Profiler
+        profiler = Profiler(top_n=args.profile_top, trace_memory=args.profile_memory)
+        profiler.start()
+
+    sommelier = CodeSommelier(
+        args.project_path, 
+        args.language, 
+        jobs=args.jobs,
+        exclude_patterns=args.exclude,
+        use_gitignore=not args.no_gitignore,
+        cache_dir=args.cache_dir,
+        use_cache=not args.no_cache,
+        since=args.since,
+        large_file_mb=args.large_file_mb,
+        file_timeout=args.file_timeout,
+        max_file_mb=args.max_file_mb,
+        prefetch=args.prefetch,
+        watch=args.watch,
+        shard=shard,
+        profiler=profiler
+    )
+
+    if args.format == 'jsonl':
+        output_path = args.output or "CODE_RATING.jsonl"
+        try:
+            reporter = JsonLinesReporter(output_path)
+        except IOError as e:
+            print(f"❌ 报告导出失败: {e}")
+            sys.exit(1)
+    elif shard:
+        output_path = args.output or f"CODE_RATING.shard-{shard[0]}-of-{shard[1]}.json"
+        reporter = None
+    else:
+        output_path = args.output or "CODE_RATING.md"
+        # 流式模式：结果产生后立即汇总，不保留完整列表
+        reporter = StreamingMarkdownReporter(top_k=args.report_top) if args.report_top else None
+
+    if reporter:
+        success, message = sommelier.taste(sink=reporter)
+    else:
+        success, message = sommelier.taste()
     
     if not success:
         print(message)
         sys.exit(1)
 
     # 生成报告
-    reporter = MarkdownReporter()
-    reporter.generate(sommelier.results, sommelier.get_file_tree_str())
+    with sommelier._phase('report'):
+        if args.format == 'jsonl':
+            reporter.finish()
+        elif shard:
+            from shard import write_partial
+            write_partial(sommelier, output_path)
+        elif args.report_top:
+            reporter.finish(sommelier.file_tree, output_path)
+        else:
+            reporter = MarkdownReporter()
+            reporter.generate(sommelier.results, sommelier.get_file_tree_str(), output_path)
+
+    if profiler:
+        profiler.stop()
+        profiler.print_summary()
+        profiler.save(args.profile)
+
+    if args.watch:
+        from watcher import watch
+
+        def regenerate():
+            MarkdownReporter().generate(sommelier.results, sommelier.get_file_tree_str(), output_path)
+
+        ignore_paths = [output_path]
+        if sommelier.cache:
+            ignore_paths.append(sommelier.cache.cache_dir)
+        watch(sommelier, regenerate, ignore_paths)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,184 @@
+import heapq
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# 分析器内部阶段的展示顺序 (见 flavors/timing.py)，未列出的阶段排在后面
+ANALYZER_PHASES = ('read', 'decode', 'tokenize', 'parse', 'lex', 'rules', 'minhash', 'stream')
+
+
+class Profiler:
+    """
+    品鉴流程的性能剖析器
+    - 主进程中的各阶段 (遍历、缓存、分析、结构、报告等) 按"独占时间"统计，嵌套阶段不会重复计入
+    - 每个被分析的文件记录总耗时与分析器内部各阶段耗时，按语言汇总，并保留最慢的 N 个文件
+    - 可选使用 tracemalloc 记录每个主进程阶段的内存峰值 (开销较大，仅在需要时开启)
+    """
+
+    def __init__(self, top_n=10, trace_memory=False):
+        self.top_n = top_n
+        self.trace_memory = trace_memory
+        self.phases = {}         # 阶段 -> 独占秒数
+        self.memory_peaks = {}   # 阶段 -> 峰值字节数
+        self.languages = {}      # 语言 -> {'files', 'bytes', 'seconds', 'phases'}
+        self.total = 0.0
+        self._slowest = []       # 小顶堆 (秒数, 序号, 记录)，只保留最慢的 top_n 个
+        self._seq = 0
+        self._stack = []         # [阶段名, 开始时间, 子阶段耗时]
+        self._started = None
+
+    def start(self):
+        if self.trace_memory:
+            tracemalloc.start()
+        self._started = time.perf_counter()
+
+    def stop(self):
+        if self._started is not None:
+            self.total = time.perf_counter() - self._started
+            self._started = None
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    #  主进程阶段计时
+
+    def push(self, name):
+        if self.trace_memory and self._stack:
+            # 进入子阶段前先结算父阶段到目前为止的内存峰值
+            self._record_peak(self._stack[-1][0])
+        self._stack.append([name, time.perf_counter(), 0.0])
+
+    def pop(self):
+        name, start, children = self._stack.pop()
+        elapsed = time.perf_counter() - start
+        self.phases[name] = self.phases.get(name, 0.0) + elapsed - children
+        if self._stack:
+            self._stack[-1][2] += elapsed
+        if self.trace_memory:
+            self._record_peak(name)
+
+    def _record_peak(self, name):
+        if not tracemalloc.is_tracing():
+            return
+        peak = tracemalloc.get_traced_memory()[1]
+        self.memory_peaks[name] = max(self.memory_peaks.get(name, 0), peak)
+        tracemalloc.reset_peak()
+
+    @contextmanager
+    def phase(self, name):
+        self.push(name)
+        try:
+            yield
+        finally:
+            self.pop()
+
+    def timed_iter(self, name, iterable):
+        """包装一个迭代器，把每次取下一个元素所花的时间计入 name 阶段"""
+        iterator = iter(iterable)
+        while True:
+            self.push(name)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.pop()
+            yield item
+
+    #  单文件记录
+
+    def add_file(self, record):
+        """
+        record: {'path', 'language', 'size', 'seconds', 'phases': {阶段: 秒}}
+        (由 analyzer._profile_file 在主进程或工作进程中生成)
+        """
+        stats = self.languages.get(record['language'])
+        if stats is None:
+            stats = self.languages[record['language']] = {'files': 0, 'bytes': 0, 'seconds': 0.0, 'phases': {}}
+        stats['files'] += 1
+        stats['bytes'] += record['size']
+        stats['seconds'] += record['seconds']
+        for name, seconds in record['phases'].items():
+            stats['phases'][name] = stats['phases'].get(name, 0.0) + seconds
+
+        self._seq += 1
+        item = (record['seconds'], self._seq, record)
+        if len(self._slowest) < self.top_n:
+            heapq.heappush(self._slowest, item)
+        elif item[0] > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, item)
+
+    #  输出
+
+    def to_dict(self):
+        total = self.total or sum(self.phases.values())
+        phases = {}
+        for name, seconds in self.phases.items():
+            phases[name] = {'seconds': round(seconds, 6)}
+            if name in self.memory_peaks:
+                phases[name]['peak_mb'] = round(self.memory_peaks[name] / (1024 * 1024), 3)
+        languages = {}
+        for lang, stats in self.languages.items():
+            known = sum(stats['phases'].values())
+            lang_phases = dict(stats['phases'])
+            lang_phases['other'] = max(0.0, stats['seconds'] - known)
+            languages[lang] = {
+                'files': stats['files'],
+                'bytes': stats['bytes'],
+                'seconds': round(stats['seconds'], 6),
+                'phases': {name: round(seconds, 6) for name, seconds in lang_phases.items()},
+            }
+        slowest = [record for _, _, record in sorted(self._slowest, reverse=True)]
+        return {
+            'total_seconds': round(total, 6),
+            'phases': phases,
+            'languages': languages,
+            'slowest_files': [
+                {**record, 'seconds': round(record['seconds'], 6),
+                 'phases': {k: round(v, 6) for k, v in record['phases'].items()}}
+                for record in slowest
+            ],
+        }
+
+    def save(self, output_path):
+        try:
+            with open(output_path, "w", encoding="utf-8") as f:
+                json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+            print(f"⏱️ 性能剖析结果已保存: {output_path}")
+        except IOError as e:
+            print(f"❌ 性能剖析结果导出失败: {e}")
+
+    def print_summary(self):
+        data = self.to_dict()
+        total = data['total_seconds'] or 1e-9
+
+        print()
+        print(f"⏱️ 性能剖析 (总耗时 {data['total_seconds']:.3f}s)")
+        print(f"  {'阶段':<20}{'耗时(s)':>10}{'占比':>8}{'峰值内存(MB)':>14}")
+        accounted = 0.0
+        for name, info in sorted(data['phases'].items(), key=lambda kv: -kv[1]['seconds']):
+            accounted += info['seconds']
+            peak = f"{info['peak_mb']:.1f}" if 'peak_mb' in info else '-'
+            print(f"  {name:<20}{info['seconds']:>10.3f}{info['seconds'] / total:>8.1%}{peak:>14}")
+        if data['total_seconds'] > accounted:
+            rest = data['total_seconds'] - accounted
+            print(f"  {'(其他)':<20}{rest:>10.3f}{rest / total:>8.1%}{'-':>14}")
+
+        if data['languages']:
+            names = [p for p in ANALYZER_PHASES
+                     if any(p in stats['phases'] for stats in data['languages'].values())]
+            extra = sorted({p for stats in data['languages'].values() for p in stats['phases']}
+                           - set(names) - {'other'})
+            names += extra + ['other']
+            print()
+            print(f"  {'语言':<12}{'文件数':>8}{'大小(KB)':>12}{'耗时(s)':>10}" + ''.join(f"{n:>10}" for n in names))
+            for lang, stats in sorted(data['languages'].items(), key=lambda kv: -kv[1]['seconds']):
+                cells = ''.join(f"{stats['phases'].get(n, 0.0):>10.3f}" for n in names)
+                print(f"  {lang:<12}{stats['files']:>8}{stats['bytes'] / 1024:>12.1f}{stats['seconds']:>10.3f}{cells}")
+
+        if data['slowest_files']:
+            print()
+            print(f"  最慢的 {len(data['slowest_files'])} 个文件:")
+            for record in data['slowest_files']:
+                print(f"  {record['seconds'] * 1000:>10.1f} ms {record['size'] / 1024:>10.1f} KB  "
+                      f"{record['language']:<10} {record['path']}")
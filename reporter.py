@@ -1,97 +1,169 @@
 import datetime
+import heapq
+import json
 from typing import List
+from flavors.base import grade_of
+from flavors.issues import (
+    COMPLEXITY, NAMING, COMMENT, LENGTH, DUPLICATION, STRUCTURE, ERROR_HANDLING, OTHER
+)
+
+# 被跳过文件在报告中显示的等级
+SKIPPED_RANK = "跳过"
+
+
+def result_record(result) -> dict:
+    """单个 AnalysisResult 的 JSON 表示 (JSON Lines 报告与评分服务共用)，问题附带渲染后的文本"""
+    return {
+        "path": result.path,
+        "file_name": result.file_name,
+        "language": result.language,
+        "score": result.score,
+        "rating": result.rating,
+        "skipped": result.skipped,
+        "issues": [
+            {"code": issue.code, "category": issue.category, "message": issue.message}
+            for issue in result.issues
+        ],
+    }
+
+
+def summarize(results) -> dict:
+    """一组结果的汇总：文件数、跳过数、平均分 (不含跳过的文件) 与总体等级"""
+    scored = [r.score for r in results if not r.skipped]
+    avg_score = sum(scored) / len(scored) if scored else 0
+    return {
+        "file_count": len(results),
+        "skipped_count": len(results) - len(scored),
+        "avg_score": round(avg_score, 2),
+        "rank": MarkdownReporter()._get_rank(avg_score).split(' ')[0],
+    }
+
 
 class MarkdownReporter:
-    def generate(self, results: List, file_tree_str: str, output_path: str = "CODE_RATING.md"):
+    def generate(self, results: List, file_tree_str: str, output_path: str = "CODE_RATING.md", top_k: int = None):
         """
         生成代码品鉴报告
+        top_k: 只在评分表和建议中列出得分最低的 K 个文件 (堆选择，无需整体排序)
         """
         if not results:
             print("🍷 本次采摘未发现符合年份的代码果实 (No Code Found)。")
             return
 
         # 1. 计算总体指标
-        total_score = sum(r.score for r in results)
-        avg_score = total_score / len(results) if results else 0
+        # 被看门狗跳过的文件没有真实评分，不计入平均分
+        scored = [r.score for r in results if not r.skipped]
+        avg_score = sum(scored) / len(scored) if scored else 0
+
+        # 按分数从低到高排序 (与 sorted 一样是稳定的)
+        if top_k:
+            sorted_results = heapq.nsmallest(top_k, results, key=lambda x: x.score)
+        else:
+            sorted_results = sorted(results, key=lambda x: x.score)
+
+        self._write(output_path, self._render(len(results), avg_score, file_tree_str, sorted_results, top_k), avg_score)
+
+    def _write(self, output_path, lines, avg_score):
+        """逐行写入文件，不在内存中拼接整份文档"""
+        try:
+            with open(output_path, "w", encoding="utf-8") as f:
+                first = True
+                for line in lines:
+                    if not first:
+                        f.write("\n")
+                    f.write(line)
+                    first = False
+            print(f"✨ 报告已装瓶: {output_path} (得分: {avg_score:.2f})")
+        except IOError as e:
+            print(f"❌ 报告导出失败: {e}")
+
+    def _render(self, count, avg_score, file_tree, sorted_results, top_k=None):
+        """
+        按章节逐行产出 Markdown 内容
+        file_tree: 文件树字符串，或逐行产出文件树的可迭代对象
+        """
         overall_rank = self._get_rank(avg_score)
         flavor_text = self._get_flavor_text(avg_score)
-        
-        # 按分数从低到高排序 
-        sorted_results = sorted(results, key=lambda x: x.score)
+        # 每个文件的等级只计算一次 (提取 S/A/B 等级字符)
+        short_ranks = [SKIPPED_RANK if res.skipped else self._get_rank(res.score).split(' ')[0]
+                       for res in sorted_results]
 
-        # 2. 构建 Markdown 内容
-        md = []
-        
         #  头部信息 
-        md.append(f"# 🍷 Code Sommelier 品鉴报告")
-        md.append(f"> **生成时间**: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        md.append(f"")
-        md.append(f"## 1. 庄园综合评级 (Overall Assessment)")
-        md.append(f"- **综合评分**: `{avg_score:.2f} / 100`")
-        md.append(f"- **品质等级**: **{overall_rank}**")
-        md.append(f"- **品鉴结论**: *{flavor_text}*")
-        md.append(f"- **样本数量**: {len(results)} 个文件")
-        md.append(f"")
+        yield f"# 🍷 Code Sommelier 品鉴报告"
+        yield f"> **生成时间**: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+        yield f""
+        yield f"## 1. 庄园综合评级 (Overall Assessment)"
+        yield f"- **综合评分**: `{avg_score:.2f} / 100`"
+        yield f"- **品质等级**: **{overall_rank}**"
+        yield f"- **品鉴结论**: *{flavor_text}*"
+        yield f"- **样本数量**: {count} 个文件"
+        yield f""
 
         #  项目结构
-        md.append(f"## 2. 葡萄园地图 (Vineyard Map)")
-        md.append(f"```text")
-        md.append(file_tree_str if file_tree_str else "(空目录)")
-        md.append(f"```")
-        md.append(f"")
+        yield f"## 2. 葡萄园地图 (Vineyard Map)"
+        yield f"```text"
+        if isinstance(file_tree, str):
+            yield file_tree if file_tree else "(空目录)"
+        else:
+            empty = True
+            for line in file_tree:
+                empty = False
+                yield line
+            if empty:
+                yield "(空目录)"
+        yield f"```"
+        yield f""
 
         #  详细评分表 
-        md.append(f"## 3. 详细风味分析 (Detailed Notes)")
-        md.append(f"| 文件名 | 语言 | 得分 | 等级 | 状态 |")
-        md.append(f"| :--- | :---: | :---: | :---: | :---: |")
+        yield f"## 3. 详细风味分析 (Detailed Notes)"
+        if top_k and count > len(sorted_results):
+            yield f"> 样本较多，仅列出得分最低的 {len(sorted_results)} 个文件。"
+            yield f""
+        yield f"| 文件名 | 语言 | 得分 | 等级 | 状态 |"
+        yield f"| :--- | :---: | :---: | :---: | :---: |"
         
-        for res in sorted_results:
+        for res, short_rank in zip(sorted_results, short_ranks):
             status_icon = self._get_status_icon(res.score)
             display_name = res.file_name
-            # 提取 S/A/B 等级字符
-            short_rank = self._get_rank(res.score).split(' ')[0]
             
-            md.append(f"| `{display_name}` | {res.language} | {res.score:.1f} | **{short_rank}** | {status_icon} |")
+            if res.skipped:
+                yield f"| `{display_name}` | {res.language} | - | **{short_rank}** | ⏭️ |"
+                continue
+            yield f"| `{display_name}` | {res.language} | {res.score:.1f} | **{short_rank}** | {status_icon} |"
         
-        md.append(f"")
+        yield f""
 
         # 改进建议
-        md.append(f"## 4. 酿造师建议 (Winemaker's Suggestions)")
+        yield f"## 4. 酿造师建议 (Winemaker's Suggestions)"
         
         has_issues = False
-        for res in sorted_results:
+        for res, rank_str in zip(sorted_results, short_ranks):
             if res.issues:
                 has_issues = True
-                rank_str = self._get_rank(res.score).split(' ')[0]
-                md.append(f"### 📄 `{res.file_name}` (等级: {rank_str})")
+                yield f"### 📄 `{res.file_name}` (等级: {rank_str})"
                 for issue in res.issues:
                     # 自动添加分类图标
                     icon = self._get_issue_category_icon(issue)
-                    md.append(f"- {icon} {issue}")
-                md.append(f"")
+                    yield f"- {icon} {issue}"
+                yield f""
         
         if not has_issues:
-            md.append(f"✨ 完美年份！这批代码口感纯净，结构平衡，无需额外的修饰。")
+            yield f"✨ 完美年份！这批代码口感纯净，结构平衡，无需额外的修饰。"
 
         # 底部建议 
-        md.append(f"---")
-        md.append(f"**优化指南**: {self._get_advice(avg_score)}")
+        yield f"---"
+        yield f"**优化指南**: {self._get_advice(avg_score)}"
 
-        # 3. 写入文件
-        try:
-            with open(output_path, "w", encoding="utf-8") as f:
-                f.write("\n".join(md))
-            print(f"✨ 报告已装瓶: {output_path} (得分: {avg_score:.2f})")
-        except IOError as e:
-            print(f"❌ 报告导出失败: {e}")
+    # S-D 等级定义 (优雅版)，分界与分析器的 rating 相同 (flavors.base.GRADES)
+    RANK_LABELS = {
+        'S': "S (Grand Cru / 特级园)",
+        'A': "A (Premier Cru / 一级园)",
+        'B': "B (Village / 村庄级)",
+        'C': "C (Regional / 大区级)",
+        'D': "D (Vin de Table / 日常餐酒)",
+    }
 
     def _get_rank(self, score: float) -> str:
-        """S-D 等级定义 (优雅版)"""
-        if score >= 95: return "S (Grand Cru / 特级园)"
-        if score >= 85: return "A (Premier Cru / 一级园)"
-        if score >= 75: return "B (Village / 村庄级)"
-        if score >= 60: return "C (Regional / 大区级)"
-        return "D (Vin de Table / 日常餐酒)"
+        return self.RANK_LABELS[grade_of(score)]
 
     def _get_flavor_text(self, score: float) -> str:
         """根据分数生成的优雅评语"""
@@ -116,21 +188,100 @@ class MarkdownReporter:
         if score >= 60: return "⚠️"
         return "🛑"
 
-    def _get_issue_category_icon(self, issue_text: str) -> str:
-        """根据问题文本自动匹配图标"""
-        text = issue_text.lower()
-        if any(x in text for x in ["复杂度", "complexity", "纠结", "迷宫", "逻辑"]):
-            return "🔄" # 复杂度
-        if any(x in text for x in ["命名", "naming", "snake_case", "pascal", "色泽"]):
-            return "🏷️"  # 命名
-        if any(x in text for x in ["注释", "comment", "docstring", "余味"]):
-            return "📝" # 注释
-        if any(x in text for x in ["长", "length", "臃肿", "酒体", "拆分"]):
-            return "📏" # 长度
-        if any(x in text for x in ["重复", "duplication", "copy", "paste", "粘贴"]):
-            return "👯‍♀️" # 重复
-        if any(x in text for x in ["嵌套", "nest", "depth", "深"]):
-            return "🏗️" # 结构
-        if any(x in text for x in ["error", "except", "try", "异常", "错误"]):
-            return "🛡️" # 错误处理
-        return "⚠️"    # 其他
\ No newline at end of file
+    # 问题分类 -> 图标
+    CATEGORY_ICONS = {
+        COMPLEXITY: "🔄",
+        NAMING: "🏷️",
+        COMMENT: "📝",
+        LENGTH: "📏",
+        DUPLICATION: "👯‍♀️",
+        STRUCTURE: "🏗️",
+        ERROR_HANDLING: "🛡️",
+        OTHER: "⚠️",
+    }
+
+    def _get_issue_category_icon(self, issue) -> str:
+        """根据问题的分类匹配图标"""
+        return self.CATEGORY_ICONS.get(issue.category, "⚠️")
+
+
+class StreamingMarkdownReporter(MarkdownReporter):
+    """
+    流式报告：作为 CodeSommelier.taste 的 sink 逐个接收结果，
+    只累计总分与数量，并用大小为 K 的堆保留得分最低的文件，内存占用与文件总数无关。
+    """
+
+    def __init__(self, top_k: int = 100):
+        self.top_k = top_k
+        self.count = 0
+        self.scored = 0
+        self.total_score = 0.0
+        # 大顶堆 (取负数)，堆顶是当前保留的文件中得分最高、最晚到达的一个
+        self._heap = []
+
+    def add(self, result):
+        self.count += 1
+        if not result.skipped:
+            self.scored += 1
+            self.total_score += result.score
+        item = (-result.score, -self.count, result)
+        if len(self._heap) < self.top_k:
+            heapq.heappush(self._heap, item)
+        elif item > self._heap[0]:
+            heapq.heapreplace(self._heap, item)
+
+    def finish(self, file_tree, output_path: str = "CODE_RATING.md"):
+        """写出报告；file_tree 可以是字符串或逐行产出的可迭代对象"""
+        if not self.count:
+            print("🍷 本次采摘未发现符合年份的代码果实 (No Code Found)。")
+            return
+        avg_score = self.total_score / self.scored if self.scored else 0
+        # 按 (得分, 到达顺序) 升序，与对完整列表稳定排序后截取前 K 个一致
+        worst = [result for _, _, result in sorted(self._heap, reverse=True)]
+        self._write(output_path, self._render(self.count, avg_score, file_tree, worst, self.top_k), avg_score)
+
+
+class JsonLinesReporter(MarkdownReporter):
+    """
+    JSON Lines 输出：每个结果产生后立即写出一行 JSON 并刷新，最后追加一条汇总记录。
+    下游工具可以在扫描进行中就开始读取 (例如 tail -f)。
+    """
+
+    def __init__(self, output_path: str = "CODE_RATING.jsonl"):
+        self.output_path = output_path
+        self.count = 0
+        self.scored = 0
+        self.total_score = 0.0
+        self.rank_counts = {}
+        # 打开失败时抛出 IOError，由调用方在扫描开始前处理
+        self._file = open(output_path, "w", encoding="utf-8")
+
+    def add(self, result):
+        self.count += 1
+        if result.skipped:
+            short_rank = SKIPPED_RANK
+        else:
+            self.scored += 1
+            self.total_score += result.score
+            short_rank = self._get_rank(result.score).split(' ')[0]
+        self.rank_counts[short_rank] = self.rank_counts.get(short_rank, 0) + 1
+        self._write_record({"type": "result", **result_record(result)})
+
+    def finish(self, file_tree=None):
+        """写出汇总记录并关闭文件 (JSON Lines 不包含文件树)"""
+        avg_score = self.total_score / self.scored if self.scored else 0
+        self._write_record({
+            "type": "summary",
+            "generated_at": datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            "file_count": self.count,
+            "skipped_count": self.count - self.scored,
+            "avg_score": round(avg_score, 2),
+            "rank": self._get_rank(avg_score).split(' ')[0],
+            "rank_counts": self.rank_counts,
+        })
+        self._file.close()
+        print(f"✨ 报告已装瓶: {self.output_path} (得分: {avg_score:.2f})")
+
+    def _write_record(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
@@ -0,0 +1,254 @@
+import argparse
+import json
+import os
+import socketserver
+import threading
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from analyzer import CodeSommelier, _analyze_task, warm_analyzers, warm_pool
+from reporter import result_record, summarize
+from watchdog_pool import WatchdogPool
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+# 请求体大小上限，防止误传的超大请求占满内存
+MAX_BODY_BYTES = 16 * 1024 * 1024
+# 请求中 "language" 的可选值，与 main.py 的 --language 一致 (null 表示全部语言)
+LANGUAGE_CHOICES = ('python', 'cpp')
+
+
+class SommelierService:
+    """
+    常驻的品鉴服务：分析器实例与工作进程池在服务启动时创建并一直保持，
+    省去每次调用的解释器启动、模块导入与进程创建开销。
+    每个请求使用独立的 CodeSommelier 实例，results / file_tree 互不影响；
+    同一项目的请求在读写缓存时串行执行，避免相互覆盖缓存文件。
+    开启 file_timeout 时改用常驻的看门狗进程池：同一组工作进程依次为各请求分析文件
+    (看门狗需要逐个文件计时，不能与其他请求的任务混在同一进程中)。
+    """
+
+    def __init__(self, jobs=1, use_cache=True, large_file_mb=None, max_file_mb=None,
+                 file_timeout=None, prefetch=0):
+        self.jobs = jobs if jobs and jobs > 0 else (os.cpu_count() or 1)
+        self.use_cache = use_cache
+        self.options = {
+            'large_file_mb': large_file_mb,
+            'max_file_mb': max_file_mb,
+            'file_timeout': file_timeout,
+            'prefetch': prefetch,
+        }
+        self.executor = None
+        self.watchdog = None
+        if file_timeout and file_timeout > 0:
+            self.watchdog = WatchdogPool(_analyze_task, workers=self.jobs, timeout=file_timeout)
+        elif self.jobs > 1:
+            self.executor = ProcessPoolExecutor(max_workers=self.jobs)
+        self._project_locks = {}
+        self._guard = threading.Lock()
+
+    def warm_up(self):
+        warm_analyzers()
+        if self.executor:
+            warm_pool(self.executor, self.jobs)
+        if self.watchdog:
+            # 在主进程预热之后再拉起看门狗进程，子进程继承已加载的分析器
+            self.watchdog.start()
+
+    def close(self):
+        if self.executor:
+            self.executor.shutdown()
+        if self.watchdog:
+            self.watchdog.close()
+
+    def score_project(self, params):
+        """品鉴整个项目：{"project_path", "language"?, "exclude"?, "use_gitignore"?, "use_cache"?}"""
+        sommelier = self._sommelier(params)
+        with self._project_lock(sommelier):
+            success, message = sommelier.taste()
+        if not success:
+            raise ValueError(message)
+        return {
+            'project_path': str(sommelier.root),
+            'summary': summarize(sommelier.results),
+            'results': [result_record(r) for r in sommelier.results],
+            'file_tree': sommelier.get_file_tree_str(),
+        }
+
+    def score_paths(self, params):
+        """品鉴指定的文件：{"project_path", "paths": [相对项目根目录或绝对路径], ...}"""
+        paths = params.get('paths')
+        if not isinstance(paths, list) or not all(isinstance(p, str) for p in paths):
+            raise ValueError("'paths' 必须是字符串列表")
+        sommelier = self._sommelier(params)
+        root = sommelier.root.resolve()
+        file_paths, missing = [], []
+        for raw in paths:
+            path = Path(raw)
+            if not path.is_absolute():
+                path = sommelier.root / path
+            try:
+                rel = path.resolve().relative_to(root)
+            except ValueError:
+                raise ValueError(f"路径不在项目目录中: {raw}")
+            if not path.is_file():
+                missing.append(raw)
+                continue
+            file_paths.append(sommelier.root / rel)
+
+        with self._project_lock(sommelier):
+            results = sommelier.score_files(file_paths)
+        return {
+            'project_path': str(sommelier.root),
+            'summary': summarize(results),
+            'results': [result_record(r) for r in results],
+            'missing': missing,
+        }
+
+    def _sommelier(self, params):
+        project_path = params.get('project_path')
+        if not isinstance(project_path, str) or not project_path:
+            raise ValueError("缺少 'project_path'")
+        if not Path(project_path).is_dir():
+            raise ValueError(f"❌ 庄园入口未找到，请检查路径: {project_path}")
+        language = params.get('language')
+        if language is not None and language not in LANGUAGE_CHOICES:
+            raise ValueError(f"'language' 必须是 {' / '.join(LANGUAGE_CHOICES)} 或 null")
+        exclude = params.get('exclude')
+        if exclude is not None and not (isinstance(exclude, list) and all(isinstance(p, str) for p in exclude)):
+            raise ValueError("'exclude' 必须是字符串列表")
+        for key in ('use_gitignore', 'use_cache'):
+            if not isinstance(params.get(key, True), bool):
+                raise ValueError(f"'{key}' 必须是布尔值")
+        return CodeSommelier(
+            project_path,
+            language,
+            jobs=self.jobs,
+            exclude_patterns=exclude or None,
+            use_gitignore=params.get('use_gitignore', True),
+            use_cache=self.use_cache and params.get('use_cache', True),
+            executor=self.executor,
+            watchdog=self.watchdog,
+            **self.options,
+        )
+
+    def _project_lock(self, sommelier):
+        if not sommelier.cache:
+            return nullcontext()
+        key = str(sommelier.root.resolve())
+        with self._guard:
+            lock = self._project_locks.get(key)
+            if lock is None:
+                lock = self._project_locks[key] = threading.Lock()
+        return lock
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """
+    GET  /health   -> {"status": "ok"}
+    POST /score    -> 品鉴指定文件
+    POST /project  -> 品鉴整个项目
+    请求与响应均为 JSON，出错时返回 {"error": 描述}。
+    """
+    server_version = 'CodeSommelier'
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send(200, {'status': 'ok', 'jobs': self.server.service.jobs})
+        else:
+            self._send(404, {'error': f"未知路径: {self.path}"})
+
+    def do_POST(self):
+        service = self.server.service
+        routes = {'/score': service.score_paths, '/project': service.score_project}
+        handler = routes.get(self.path)
+        if handler is None:
+            self._send(404, {'error': f"未知路径: {self.path}"})
+            return
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            length = -1
+        if length < 0 or length > MAX_BODY_BYTES:
+            self._send(400, {'error': "请求体长度无效"})
+            return
+        try:
+            params = json.loads(self.rfile.read(length) or b'{}')
+            if not isinstance(params, dict):
+                raise ValueError("请求体必须是 JSON 对象")
+            self._send(200, handler(params))
+        except ValueError as e:
+            self._send(400, {'error': str(e)})
+        except Exception as e:
+            self._send(500, {'error': f"{type(e).__name__}: {e}"})
+
+    def _send(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        # Unix socket 的客户端地址为空
+        return self.client_address[0] if self.client_address else 'unix'
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def create_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None):
+    """创建多线程 HTTP 服务 (指定 socket_path 时监听 Unix socket)，每个连接由独立线程处理"""
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = _UnixHTTPServer(socket_path, _Handler)
+    else:
+        server = ThreadingHTTPServer((host, port), _Handler)
+        server.daemon_threads = True
+    server.service = service
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='main.py serve', description="Code Sommelier 常驻评分服务 🛎️")
+    parser.add_argument('--host', type=str, default=DEFAULT_HOST, help=f'监听地址 (默认: {DEFAULT_HOST})')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'监听端口 (默认: {DEFAULT_PORT})')
+    parser.add_argument('--socket', type=str, default=None, metavar='PATH',
+                        help='改为监听该 Unix socket (优先于 --host/--port)')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='常驻工作进程数，所有请求共享；传入 0 则使用全部 CPU 核心 (默认: 1，在请求线程内分析)')
+    parser.add_argument('--no_cache', action='store_true', help='禁用增量分析缓存')
+    parser.add_argument('--large_file_mb', type=float, default=20,
+                        help='超过该大小 (MB) 的文件改用流式分析 (默认: 20，0 表示不限制)')
+    parser.add_argument('--max_file_mb', type=float, default=None, help='单个文件的大小上限 (MB)，超出的文件记为跳过')
+    parser.add_argument('--file_timeout', type=float, default=None, metavar='SECONDS',
+                        help='单个文件的分析时限 (秒)，超时的文件记为跳过')
+    parser.add_argument('--prefetch', type=int, default=0, metavar='N', help='预读线程数 (默认: 0)')
+    args = parser.parse_args(argv)
+
+    service = SommelierService(
+        jobs=args.jobs,
+        use_cache=not args.no_cache,
+        large_file_mb=args.large_file_mb,
+        max_file_mb=args.max_file_mb,
+        file_timeout=args.file_timeout,
+        prefetch=args.prefetch,
+    )
+    service.warm_up()
+    server = create_server(service, args.host, args.port, args.socket)
+    where = args.socket or f"http://{args.host}:{server.server_address[1]}"
+    print(f"🛎️ 品鉴服务已就绪: {where} (工作进程: {service.jobs})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🍷 品鉴服务已打烊。")
+    finally:
+        server.server_close()
+        service.close()
+        if args.socket and os.path.exists(args.socket):
+            os.unlink(args.socket)
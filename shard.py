@@ -0,0 +1,127 @@
+import argparse
+import json
+import sys
+import zlib
+from flavors.base import AnalysisResult
+from flavors.clones import CloneIndex, NearDuplicateIndex
+from flavors.structure_flavor import ProjectStructureAnalyzer
+from reporter import MarkdownReporter
+
+# 分片结果文件格式版本，字段变化时递增
+PARTIAL_FORMAT = 1
+
+
+def parse_shard(text):
+    """解析 "i/N" (1 <= i <= N)，返回 (i, N)；格式错误时抛出 ValueError"""
+    index, sep, count = text.partition('/')
+    if not (sep and index.strip().isdigit() and count.strip().isdigit()):
+        raise ValueError(f"分片格式应为 i/N: {text}")
+    index, count = int(index), int(count)
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"分片编号应满足 1 <= i <= N: {text}")
+    return index, count
+
+
+def shard_of(rel_path, count):
+    """
+    文件所属的分片 (1..count)。
+    按相对路径 (POSIX 风格) 的 crc32 取模，与机器、进程、PYTHONHASHSEED 无关，
+    同一份代码在任何机器上都得到相同的划分。
+    """
+    return zlib.crc32(rel_path.encode('utf-8')) % count + 1
+
+
+def write_partial(sommelier, output_path):
+    """
+    写出分片结果文件：本分片的文件评分，以及完整遍历得到的文件树与项目结构统计
+    (每个分片都会遍历整棵目录树，这两部分在各分片中相同，合并时用于校验与生成报告)。
+    """
+    index, count = sommelier.shard
+    data = {
+        'format': PARTIAL_FORMAT,
+        'shard': [index, count],
+        'project': str(sommelier.root),
+        'language': sommelier.target_language,
+        'file_tree': sommelier.file_tree,
+        'structure': sommelier.structure.to_dict(),
+        'results': [result.to_dict() for result in sommelier.results],
+    }
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    print(f"🧩 分片 {index}/{count} 的结果已封存: {output_path} ({len(sommelier.results)} 个文件)")
+
+
+def load_partials(paths):
+    """读取并校验一组分片结果文件，必须恰好覆盖同一次划分的全部分片"""
+    partials = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('format') != PARTIAL_FORMAT:
+            raise ValueError(f"不支持的分片结果格式: {path}")
+        partials.append(data)
+
+    count = partials[0]['shard'][1]
+    first = _fingerprint(partials[0])
+    seen = {}
+    for path, data in zip(paths, partials):
+        index, n = data['shard']
+        if n != count:
+            raise ValueError(f"分片总数不一致: {path} 为 {index}/{n}，其他分片为 N={count}")
+        if index in seen:
+            raise ValueError(f"分片 {index}/{count} 重复出现: {seen[index]} 与 {path}")
+        seen[index] = path
+        for key, value in _fingerprint(data).items():
+            if value != first[key]:
+                raise ValueError(f"{path} 与 {paths[0]} 的 {key} 不一致，分片应来自同一份代码与相同的参数")
+    missing = sorted(set(range(1, count + 1)) - set(seen))
+    if missing:
+        raise ValueError(f"缺少分片: {', '.join(f'{i}/{count}' for i in missing)}")
+    return partials
+
+
+def _fingerprint(data):
+    """
+    各分片必须一致的部分。项目结构比较评分结果而非原始统计：
+    先完成的分片可能已在根目录下创建了缓存目录，这类不影响评分的差异不应阻止合并。
+    """
+    structure = ProjectStructureAnalyzer.from_dict(data['structure']).finish()
+    return {
+        'language': data['language'],
+        'file_tree': data['file_tree'],
+        'structure': (structure.score, [issue.to_list() for issue in structure.issues]),
+    }
+
+
+def merge(partials):
+    """
+    合并分片结果，返回 (results, file_tree_str)，与单机完整品鉴的 results / 文件树一致：
+    文件按遍历顺序排列 (目录内按名称排序的深度优先顺序，即按路径各段排序)，
+    跨文件克隆与近似重复在合并后的全部结果上按同样的顺序重新检测，项目结构评分位于最前。
+    """
+    results = [AnalysisResult.from_dict(record) for data in partials for record in data['results']]
+    results.sort(key=lambda r: r.path.split('/'))
+
+    structure = ProjectStructureAnalyzer.from_dict(partials[0]['structure'])
+    clone_index = CloneIndex.from_results(results)
+    near_duplicate_index = NearDuplicateIndex.from_results(results)
+    structure_result = structure.finish(clone_index.findings, near_duplicate_index.findings)
+    structure_result.path = "."
+    return [structure_result] + results, "\n".join(partials[0]['file_tree'])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='main.py merge', description="合并 --shard 产生的分片结果，生成完整报告 🧩")
+    parser.add_argument('partials', nargs='+', metavar='PARTIAL', help='各分片的结果文件 (main.py --shard i/N 的输出)')
+    parser.add_argument('--output', type=str, default='CODE_RATING.md', help='报告输出路径 (默认: CODE_RATING.md)')
+    args = parser.parse_args(argv)
+
+    try:
+        partials = load_partials(args.partials)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"❌ 无法合并分片结果: {e}")
+        sys.exit(1)
+    count = partials[0]['shard'][1]
+    print(f"🧩 正在合并 {count} 个分片的品鉴结果... (项目: {partials[0]['project']})")
+    results, file_tree = merge(partials)
+    MarkdownReporter().generate(results, file_tree, args.output)
@@ -0,0 +1,51 @@
+import contextlib
+import io
+from pathlib import Path
+from batch import LEADERBOARD_NAME, BatchRunner, report_names, write_leaderboard
+
+
+def test_report_names_avoid_leaderboard():
+    projects = [Path('/a/LEADERBOARD'), Path('/b/leaderboard'), Path('/c/app'), Path('/d/app')]
+    assert report_names(projects) == ['LEADERBOARD-2', 'leaderboard-3', 'app', 'app-2']
+
+
+def test_project_named_leaderboard_keeps_its_report(tmp_path):
+    project = tmp_path / 'LEADERBOARD'
+    project.mkdir()
+    (project / 'main.py').write_text("def main():\n    return 0\n", encoding='utf-8')
+    output_dir = tmp_path / 'reports'
+
+    runner = BatchRunner(output_dir, use_cache=False)
+    with contextlib.redirect_stdout(io.StringIO()):
+        entries = runner.run([project])
+    write_leaderboard(entries, output_dir / LEADERBOARD_NAME)
+
+    assert entries[0]['success']
+    assert entries[0]['report'] == 'LEADERBOARD-2.md'
+    assert '品鉴报告' in (output_dir / 'LEADERBOARD-2.md').read_text(encoding='utf-8')
+    assert '排行榜' in (output_dir / LEADERBOARD_NAME).read_text(encoding='utf-8')
+
+
+def test_file_timeout_shares_one_watchdog_pool(tmp_path, monkeypatch):
+    import watchdog_pool
+    started = []
+    original_start = watchdog_pool.WatchdogPool.start
+
+    def start(pool):
+        started.append(pool)
+        return original_start(pool)
+
+    monkeypatch.setattr(watchdog_pool.WatchdogPool, 'start', start)
+    projects = []
+    for name in ('one', 'two', 'three'):
+        project = tmp_path / name
+        project.mkdir()
+        (project / 'main.py').write_text("def main():\n    return 0\n", encoding='utf-8')
+        projects.append(project)
+
+    runner = BatchRunner(tmp_path / 'reports', jobs=2, concurrent_projects=2, use_cache=False, file_timeout=30)
+    with contextlib.redirect_stdout(io.StringIO()):
+        entries = runner.run(projects)
+
+    assert [e['success'] for e in entries] == [True, True, True]
+    assert len(started) == 1
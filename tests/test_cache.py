@@ -0,0 +1,50 @@
+import contextlib
+import io
+from analyzer import CodeSommelier
+
+PY_SOURCE = "def add(a, b):\n    return a + b\n"
+CPP_SOURCE = "int add(int a, int b) {\n    return a + b;\n}\n"
+
+
+def _taste(project, **options):
+    sommelier = CodeSommelier(project, **options)
+    with contextlib.redirect_stdout(io.StringIO()):
+        success, message = sommelier.taste()
+    assert success, message
+    return sommelier.cache
+
+
+def _make_project(tmp_path):
+    project = tmp_path / 'project'
+    (project / 'vendor').mkdir(parents=True)
+    (project / 'a.py').write_text(PY_SOURCE, encoding='utf-8')
+    (project / 'b.cpp').write_text(CPP_SOURCE, encoding='utf-8')
+    (project / 'vendor' / 'c.py').write_text(PY_SOURCE, encoding='utf-8')
+    return project
+
+
+def test_language_filter_keeps_other_entries(tmp_path):
+    project = _make_project(tmp_path)
+    assert _taste(project).misses == 3
+    assert _taste(project, target_language='python').hits == 2
+
+    cache = _taste(project)
+    assert (cache.hits, cache.misses) == (3, 0)
+
+
+def test_exclude_keeps_excluded_entries(tmp_path):
+    project = _make_project(tmp_path)
+    _taste(project)
+    assert _taste(project, exclude_patterns=['vendor/']).hits == 2
+
+    cache = _taste(project)
+    assert (cache.hits, cache.misses) == (3, 0)
+
+
+def test_full_run_prunes_deleted_files(tmp_path):
+    project = _make_project(tmp_path)
+    _taste(project)
+    (project / 'b.cpp').unlink()
+
+    cache = _taste(project)
+    assert set(cache.entries) == {'a.py', 'vendor/c.py'}
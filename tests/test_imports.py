@@ -0,0 +1,13 @@
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def test_main_does_not_import_optional_modules():
+    code = ("import sys, main; "
+            "print(sorted(m for m in ('profiler', 'tracemalloc', 'server', 'batch', 'shard', 'watcher') "
+            "if m in sys.modules))")
+    out = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == '[]'
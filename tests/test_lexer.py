@@ -0,0 +1,21 @@
+import time
+from flavors.lexer import lex_source
+
+
+def test_string_escapes_and_line_end():
+    result = lex_source('a = "x\\"y"; b = \'c\nd = "open\n', 'js')
+    assert result.bare == 'a = ""; b = \'\'\nd = ""\n'
+    assert result.code == 'a = "x\\"y"; b = \'c\nd = "open\n'
+
+
+def test_long_single_line_is_linear():
+    # 压缩后的 JS：一整行、数十万个字符串字面量
+    text = 'var a=[' + ','.join('"s%06d"' % i for i in range(400000)) + '];'
+    assert len(text) > 4_000_000
+    start = time.perf_counter()
+    result = lex_source(text, 'js')
+    elapsed = time.perf_counter() - start
+    assert result.line_count == 1
+    assert result.bare.count('""') == 400000
+    # 按行尾截断的逐字符串扫描在这里需要数十秒
+    assert elapsed < 5
@@ -0,0 +1,20 @@
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from analyzer import _init_worker
+from watchdog_pool import OK, WatchdogPool
+
+
+def _is_tracing(_item=None):
+    return tracemalloc.is_tracing()
+
+
+def test_workers_do_not_inherit_memory_tracing():
+    tracemalloc.start()
+    try:
+        with ProcessPoolExecutor(max_workers=1, initializer=_init_worker) as pool:
+            assert pool.submit(_is_tracing).result() is False
+        with WatchdogPool(_is_tracing, initializer=_init_worker) as pool:
+            assert list(pool.map([None])) == [(None, OK, False)]
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
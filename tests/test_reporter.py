@@ -0,0 +1,13 @@
+from flavors.base import BaseAnalyzer
+from reporter import MarkdownReporter
+
+
+class _Analyzer(BaseAnalyzer):
+    def analyze(self, file_path, data=None):
+        raise NotImplementedError
+
+
+def test_rating_and_rank_share_thresholds():
+    analyzer, reporter = _Analyzer(), MarkdownReporter()
+    for score in (0, 49, 50, 59.9, 60, 69, 70, 72, 74.9, 75, 84.9, 85, 94.9, 95, 100):
+        assert analyzer.calculate_rating(score)[0] == reporter._get_rank(score)[0], score
@@ -0,0 +1,64 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+import pytest
+from server import SommelierService, create_server
+
+SOURCE = "def add(a, b):\n    return a + b\n"
+
+
+@pytest.fixture
+def project(tmp_path):
+    (tmp_path / 'a.py').write_text(SOURCE, encoding='utf-8')
+    (tmp_path / 'b.py').write_text(SOURCE, encoding='utf-8')
+    return tmp_path
+
+
+def _post(server, path, payload):
+    url = f"http://127.0.0.1:{server.server_address[1]}{path}"
+    request = urllib.request.Request(url, data=json.dumps(payload).encode('utf-8'), method='POST')
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+@pytest.mark.parametrize('params, message', [
+    ({'language': 5}, "'language'"),
+    ({'language': 'rust'}, "'language'"),
+    ({'exclude': 'vendor/'}, "'exclude'"),
+    ({'exclude': ['vendor/', 3]}, "'exclude'"),
+    ({'use_cache': 'no'}, "'use_cache'"),
+])
+def test_invalid_parameters_are_rejected(project, params, message):
+    service = SommelierService(use_cache=False)
+    server = create_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        status, body = _post(server, '/project', {'project_path': str(project), **params})
+        assert status == 400
+        assert message in body['error']
+        status, body = _post(server, '/project', {'project_path': str(project), 'exclude': ['b.py']})
+        assert status == 200
+        assert [r['path'] for r in body['results']] == ['.', 'a.py']
+    finally:
+        server.shutdown()
+        server.server_close()
+        service.close()
+
+
+def test_file_timeout_reuses_watchdog_workers(project):
+    service = SommelierService(jobs=2, use_cache=False, file_timeout=30)
+    service.warm_up()
+    try:
+        pids = sorted(worker.process.pid for worker in service.watchdog._pool)
+        for language in (None, 'python', 'cpp'):
+            body = service.score_paths({'project_path': str(project), 'paths': ['a.py', 'b.py'],
+                                        'language': language})
+            assert len(body['results']) == (0 if language == 'cpp' else 2)
+        assert sorted(worker.process.pid for worker in service.watchdog._pool) == pids
+    finally:
+        service.close()
@@ -0,0 +1,45 @@
+import contextlib
+import io
+import subprocess
+import pytest
+from analyzer import CodeSommelier
+
+SOURCE = "def add(a, b):\n    return a + b\n"
+
+
+def _git(project, *args):
+    subprocess.run(['git', *args], cwd=project, check=True, capture_output=True)
+
+
+def _taste(project, **options):
+    sommelier = CodeSommelier(project, **options)
+    with contextlib.redirect_stdout(io.StringIO()):
+        success, message = sommelier.taste()
+    assert success, message
+    return sommelier
+
+
+@pytest.fixture
+def project(tmp_path):
+    for name in ('a.py', 'b.py', 'c.py'):
+        (tmp_path / name).write_text(SOURCE, encoding='utf-8')
+    _git(tmp_path, 'init', '-q')
+    _git(tmp_path, 'add', '.')
+    _git(tmp_path, '-c', 'user.name=t', '-c', 'user.email=t@t', 'commit', '-q', '-m', 'init')
+    # 完整品鉴一次，建立缓存
+    _taste(tmp_path)
+    return tmp_path
+
+
+def test_deleted_file_is_not_reported(project):
+    _git(project, 'rm', '-q', 'b.py')
+    sommelier = _taste(project, since='HEAD')
+    assert [r.path for r in sommelier.results] == ['a.py', 'c.py']
+    assert 'b.py' not in sommelier.cache.entries
+    assert 'b.py' not in sommelier.get_file_tree_str()
+
+
+def test_renamed_file_is_reported_once(project):
+    _git(project, 'mv', 'b.py', 'd.py')
+    sommelier = _taste(project, since='HEAD')
+    assert [r.path for r in sommelier.results] == ['a.py', 'c.py', 'd.py']
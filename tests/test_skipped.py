@@ -0,0 +1,20 @@
+import contextlib
+import io
+from analyzer import CodeSommelier
+from reporter import result_record
+
+
+def test_skipped_file_rating_and_message(tmp_path):
+    (tmp_path / 'big.py').write_text('x = 1\n' * 20000, encoding='utf-8')
+    (tmp_path / 'ok.py').write_text('x = 1\n', encoding='utf-8')
+    sommelier = CodeSommelier(tmp_path, use_cache=False, max_file_mb=0.1)
+    with contextlib.redirect_stdout(io.StringIO()):
+        sommelier.taste()
+    records = {r.path: result_record(r) for r in sommelier.results[1:]}
+
+    skipped = records['big.py']
+    assert skipped['skipped']
+    # 与普通结果使用同一套评级文本
+    assert skipped['rating'] == 'D (劣质)'
+    message = skipped['issues'][0]['message']
+    assert '(120000 字节)' in message and '(104857 字节)' in message
@@ -0,0 +1,54 @@
+import contextlib
+import io
+import pathlib
+import tracemalloc
+import analyzer
+from analyzer import CodeSommelier
+from reporter import StreamingMarkdownReporter
+
+
+def _make_project(root, package_count):
+    # 每个目录的条目数固定，只有目录总数随规模增长
+    for p in range(package_count):
+        for m in range(10):
+            directory = root / f"pkg_{p:03d}" / f"mod_{m:02d}"
+            directory.mkdir(parents=True)
+            for f in range(100):
+                (directory / f"notes_{f:04d}.txt").write_text('', encoding='utf-8')
+    (root / 'main.py').write_text("def main():\n    return 0\n", encoding='utf-8')
+
+
+def _retained_memory(project, output_path):
+    """
+    品鉴结束、报告写出之前仍被占用的内存 (此时文件树必须已经全部记录下来)。
+    pathlib 的字符串驻留表属于解释器，扩容时机取决于之前的运行，不计入。
+    """
+    reporter = StreamingMarkdownReporter(top_k=10)
+    sommelier = CodeSommelier(project, use_cache=False)
+    tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            success, message = sommelier.taste(sink=reporter)
+            snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, pathlib.__file__)])
+            retained = sum(stat.size for stat in snapshot.statistics('filename'))
+            reporter.finish(sommelier.file_tree, str(output_path))
+    finally:
+        tracemalloc.stop()
+    assert success, message
+    return retained
+
+
+def test_report_top_memory_does_not_grow_with_file_count(tmp_path, monkeypatch):
+    monkeypatch.setattr(analyzer, 'FILE_TREE_SPOOL_BYTES', 16 * 1024)
+    _make_project(tmp_path / 'small', 1)
+    _make_project(tmp_path / 'large', 10)
+
+    small = _retained_memory(tmp_path / 'small', tmp_path / 'small.md')
+    large = _retained_memory(tmp_path / 'large', tmp_path / 'large.md')
+
+    # 文件数相差 10 倍 (1 千 / 1 万)；文件树留在内存中时两者相差 1MB 左右
+    assert large - small < 128 * 1024
+
+    report = (tmp_path / 'large.md').read_text(encoding='utf-8')
+    assert report.count('notes_') == 10 * 10 * 100
+    assert '│       └── notes_0099.txt' in report
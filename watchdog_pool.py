@@ -0,0 +1,187 @@
+import multiprocessing
+import threading
+import time
+from multiprocessing.connection import wait
+
+# 任务结果的状态
+OK = 'ok'
+TIMEOUT = 'timeout'
+CRASHED = 'crashed'
+ERROR = 'error'
+
+
+def _worker_main(conn, func, args, initializer=None):
+    """看门狗工作进程：逐个接收任务并回传结果，直到收到 None 或连接关闭"""
+    if initializer is not None:
+        initializer()
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            return
+        if task is None:
+            return
+        seq, item, task_args = task
+        try:
+            conn.send((seq, OK, func(item, *(args if task_args is None else task_args))))
+        except Exception as e:
+            conn.send((seq, ERROR, f"{type(e).__name__}: {e}"))
+
+
+class _Worker:
+    __slots__ = ('process', 'conn', 'seq', 'started')
+
+    def __init__(self, context, func, args, initializer=None):
+        parent_conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, func, args, initializer), daemon=True)
+        self.process.start()
+        # 父进程关闭子端，子进程退出时父端才能读到 EOF
+        child_conn.close()
+        self.conn = parent_conn
+        self.seq = None
+        self.started = 0.0
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class WatchdogPool:
+    """
+    带看门狗的进程池：每个任务都有运行时限，超时的工作进程会被直接杀掉并替换，
+    不会因为单个病态文件 (例如卡在正则回溯中) 阻塞整个流程。
+    与 ProcessPoolExecutor 不同，这里一次只给每个工作进程派发一个任务，以便精确计时。
+
+    func 必须定义在模块顶层 (需要能被 pickle 到子进程)，调用形式为 func(item, *args)；
+    initializer 同 ProcessPoolExecutor，在每个工作进程启动时调用一次。
+    常驻使用 (评分服务) 时先调用 start()，之后可以多次 map，结束时调用 close()。
+    """
+
+    def __init__(self, func, args=(), workers=1, timeout=None, max_pending=None, initializer=None):
+        self.func = func
+        self.args = args
+        self.initializer = initializer
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        # 已派发但尚未按顺序产出的任务上限，限制乱序完成时缓冲的结果数量
+        self.max_pending = max_pending or self.workers * 4
+        self._context = multiprocessing.get_context()
+        self._pool = []
+        # 同一组工作进程一次只服务一个 map，多个线程同时调用时依次执行
+        self._lock = threading.Lock()
+
+    def start(self):
+        """拉起全部工作进程"""
+        self._pool = [self._spawn() for _ in range(self.workers)]
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def _spawn(self):
+        return _Worker(self._context, self.func, self.args, self.initializer)
+
+    def close(self):
+        for worker in self._pool:
+            try:
+                worker.conn.send(None)
+            except (OSError, ValueError):
+                pass
+        for worker in self._pool:
+            worker.process.join(timeout=1)
+            if worker.process.is_alive():
+                worker.process.kill()
+                worker.process.join()
+            worker.conn.close()
+        self._pool = []
+
+    def map(self, items, args=None):
+        """
+        按输入顺序逐个产出 (item, 状态, 值)：
+          OK      -> 值为 func 的返回值
+          TIMEOUT -> 值为已运行的秒数
+          CRASHED -> 值为工作进程的退出码
+          ERROR   -> 值为异常描述
+        args 不为 None 时，本次 map 的任务以它代替创建时的 args 调用 func。
+        """
+        with self._lock:
+            idle, busy = list(self._pool), []
+            try:
+                yield from self._run(iter(items), args, idle, busy)
+            finally:
+                # 调用方中途放弃 (例如请求出错) 时，仍在运行的任务的结果不能留给下一次 map
+                for worker in list(busy):
+                    worker.kill()
+                    self._replace(worker, busy, idle)
+
+    def _run(self, items, args, idle, busy):
+        exhausted = False
+        seq = 0              # 下一个派发的序号
+        next_out = 0         # 下一个应当产出的序号
+        pending = {}         # 序号 -> item (已派发、未产出)
+        done = {}            # 序号 -> (状态, 值) (已完成、等待按顺序产出)
+
+        while True:
+            # 1. 尽可能派发新任务
+            while idle and not exhausted and len(pending) < self.max_pending:
+                try:
+                    item = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                worker = idle.pop()
+                worker.seq, worker.started = seq, time.monotonic()
+                worker.conn.send((seq, item, args))
+                pending[seq] = item
+                busy.append(worker)
+                seq += 1
+
+            # 2. 按顺序产出已完成的结果
+            while next_out in done:
+                status, value = done.pop(next_out)
+                yield pending.pop(next_out), status, value
+                next_out += 1
+
+            if not busy:
+                if exhausted and not pending:
+                    return
+                continue
+
+            # 3. 等待任意一个工作进程完成，最多等到最早的任务超时
+            wait_for = None
+            if self.timeout:
+                earliest = min(worker.started for worker in busy)
+                wait_for = max(0.0, earliest + self.timeout - time.monotonic())
+            ready = wait([worker.conn for worker in busy], timeout=wait_for)
+
+            for worker in list(busy):
+                if worker.conn in ready:
+                    try:
+                        result_seq, status, value = worker.conn.recv()
+                    except (EOFError, OSError):
+                        # 工作进程意外退出 (例如被系统杀掉或解释器崩溃)
+                        worker.process.join()
+                        worker.conn.close()
+                        done[worker.seq] = (CRASHED, worker.process.exitcode)
+                        self._replace(worker, busy, idle)
+                        continue
+                    done[result_seq] = (status, value)
+                    busy.remove(worker)
+                    idle.append(worker)
+                elif self.timeout and time.monotonic() - worker.started >= self.timeout:
+                    done[worker.seq] = (TIMEOUT, time.monotonic() - worker.started)
+                    worker.kill()
+                    self._replace(worker, busy, idle)
+
+    def _replace(self, worker, busy, idle):
+        """用新的工作进程替换已失效的进程"""
+        busy.remove(worker)
+        self._pool.remove(worker)
+        fresh = self._spawn()
+        self._pool.append(fresh)
+        idle.append(fresh)
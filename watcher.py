@@ -0,0 +1,236 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+from pathlib import Path
+
+# inotify 事件掩码 (见 <sys/inotify.h>)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+# 关心的事件：写入完成、新建、删除与移动 (编辑器常用"写临时文件再改名"的方式保存)
+WATCH_MASK = (IN_CLOSE_WRITE | IN_ATTRIB | IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO
+              | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+
+_EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, len
+
+# 连续保存时合并事件的等待时间 (秒)，保证在保存后一秒内完成刷新
+DEBOUNCE_SECONDS = 0.2
+# 轮询模式的扫描间隔 (秒)
+POLL_INTERVAL = 0.5
+
+
+class InotifyObserver:
+    """
+    基于 Linux inotify (通过 ctypes 调用 libc) 的目录监听器。
+    每个目录一个 watch；read() 返回发生变化的路径集合，事件队列溢出时返回 None (需要完整重扫)。
+    """
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library('c') or 'libc.so.6'
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self._libc.inotify_add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        self._dirs = {}  # watch 描述符 -> 目录路径
+
+    def add_dir(self, dir_path):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(dir_path), WATCH_MASK)
+        if wd >= 0:
+            self._dirs[wd] = Path(dir_path)
+
+    def read(self, timeout=None):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            buffer = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        changed = set()
+        offset = 0
+        while offset < len(buffer):
+            wd, mask, _, name_len = _EVENT_HEADER.unpack_from(buffer, offset)
+            offset += _EVENT_HEADER.size
+            name = buffer[offset:offset + name_len].rstrip(b'\0')
+            offset += name_len
+            if mask & IN_Q_OVERFLOW:
+                return None
+            dir_path = self._dirs.get(wd)
+            if dir_path is None:
+                continue
+            if mask & IN_IGNORED:
+                # 目录已删除或被移走，内核自动移除了 watch
+                del self._dirs[wd]
+                continue
+            changed.add(dir_path / os.fsdecode(name) if name else dir_path)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingObserver:
+    """
+    轮询监听器 (inotify 不可用时的后备方案)：定期 stat 已登记的目录与其中的文件，
+    目录的 mtime 变化时重新列出该目录以发现新建或删除的条目。不做任何分析，开销仅为 stat。
+    """
+
+    def __init__(self, interval=POLL_INTERVAL):
+        self.interval = interval
+        self._dirs = {}   # 目录 -> (mtime_ns, 子条目名称集合)
+        self._files = {}  # 文件 -> (mtime_ns, 大小)
+        self._last_scan = time.monotonic()
+
+    def add_dir(self, dir_path):
+        dir_path = Path(dir_path)
+        try:
+            mtime_ns = os.stat(dir_path).st_mtime_ns
+            with os.scandir(dir_path) as it:
+                entries = list(it)
+        except OSError:
+            return
+        self._dirs[dir_path] = (mtime_ns, {e.name for e in entries})
+        for e in entries:
+            try:
+                if e.is_file():
+                    st = e.stat()
+                    self._files[Path(e.path)] = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                continue
+
+    def read(self, timeout=None):
+        # 与 inotify 一致：timeout 为 None 时一直等到有变化为止
+        while True:
+            wait = self._last_scan + self.interval - time.monotonic()
+            if timeout is not None and wait > timeout:
+                time.sleep(timeout)
+                return set()
+            if wait > 0:
+                time.sleep(wait)
+            self._last_scan = time.monotonic()
+            changed = self._scan()
+            if changed or timeout is not None:
+                return changed
+
+    def _scan(self):
+        changed = set()
+        for dir_path, (mtime_ns, names) in list(self._dirs.items()):
+            try:
+                current = os.stat(dir_path).st_mtime_ns
+            except OSError:
+                del self._dirs[dir_path]
+                changed.add(dir_path)
+                continue
+            if current == mtime_ns:
+                continue
+            try:
+                with os.scandir(dir_path) as it:
+                    now = {e.name for e in it}
+            except OSError:
+                now = set()
+            self._dirs[dir_path] = (current, now)
+            for name in names ^ now:
+                path = dir_path / name
+                changed.add(path)
+                if name not in now:
+                    self._files.pop(path, None)
+                elif path.is_file():
+                    self._stat_file(path)
+
+        for file_path, state in list(self._files.items()):
+            try:
+                st = os.stat(file_path)
+            except OSError:
+                del self._files[file_path]
+                changed.add(file_path)
+                continue
+            if (st.st_mtime_ns, st.st_size) != state:
+                self._files[file_path] = (st.st_mtime_ns, st.st_size)
+                changed.add(file_path)
+        return changed
+
+    def _stat_file(self, file_path):
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            return
+        self._files[file_path] = (st.st_mtime_ns, st.st_size)
+
+    def close(self):
+        self._dirs.clear()
+        self._files.clear()
+
+
+def create_observer():
+    """优先使用 inotify，不可用时 (非 Linux、inotify 配额耗尽等) 退回轮询"""
+    try:
+        return InotifyObserver()
+    except (OSError, AttributeError):
+        return PollingObserver()
+
+
+def watch(sommelier, on_change, ignore_paths=()):
+    """
+    watch 模式主循环：CodeSommelier 常驻内存，只对发生变化的文件重新分析，
+    并在每次刷新后调用 on_change() 重新生成报告。Ctrl+C 退出。
+    ignore_paths: 不触发刷新的路径 (报告文件、缓存目录等)，避免写出报告后再次触发自身。
+    """
+    observer = create_observer()
+    ignored = [os.path.abspath(p) for p in ignore_paths]
+    for dir_path in sommelier.watched_dirs():
+        observer.add_dir(dir_path)
+    kind = "inotify" if isinstance(observer, InotifyObserver) else "轮询"
+    print(f"👀 正在守候庄园的变化 ({kind})，按 Ctrl+C 结束品鉴...")
+
+    try:
+        while True:
+            changed = observer.read()
+            if changed == set():
+                continue
+            # 合并短时间内连续到来的事件 (一次保存往往产生多个事件)；None 表示需要完整重扫
+            while changed is not None:
+                more = observer.read(DEBOUNCE_SECONDS)
+                if more is None:
+                    changed = None
+                elif more:
+                    changed |= more
+                    continue
+                break
+            if changed is not None:
+                changed = {p for p in changed if not _is_under(os.path.abspath(p), ignored)}
+                if not changed:
+                    continue
+
+            start = time.perf_counter()
+            updated, new_dirs = sommelier.refresh(changed)
+            for dir_path in new_dirs:
+                observer.add_dir(dir_path)
+            if updated:
+                on_change()
+                print(f"🔄 已更新 ({time.perf_counter() - start:.2f}s)")
+    except KeyboardInterrupt:
+        print("\n🍷 品鉴结束，酒窖已封存。")
+    finally:
+        observer.close()
+
+
+def _is_under(path, roots):
+    return any(path == root or path.startswith(root + os.sep) for root in roots)